@@ -0,0 +1,316 @@
+"""
+Importación y exportación masiva de la agenda en iCalendar (.ics) y CSV.
+
+Lectores y escritores son generadores que procesan el archivo línea a línea,
+así que su memoria no depende del tamaño del archivo. La importación se hace en
+una única transacción y descarta los eventos que ya están en la agenda.
+
+Uso:
+    python agenda_io.py importar eventos.ics [--agenda data/agenda.json | --usuario ana]
+    python agenda_io.py exportar copia.csv [--desde 01/01/2025] [--hasta 31/12/2025]
+"""
+import argparse
+import csv
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from evento import DURACION_POR_DEFECTO, Evento, parsear_fecha, regla_recurrencia
+
+COLUMNAS_CSV = ('id', 'descripcion', 'fecha', 'duracion', 'regla')
+FORMATO_ICS = "%Y%m%dT%H%M%S"
+# Las líneas de iCalendar no deben superar 75 octetos (RFC 5545, 3.1)
+MAX_OCTETOS_ICS = 75
+
+_RE_DURACION_ICS = re.compile(r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+_ESCAPES_ICS = {'\\n': '\n', '\\N': '\n', '\\,': ',', '\\;': ';', '\\\\': '\\'}
+_RE_ESCAPE_ICS = re.compile(r'\\[nN,;\\]')
+_PROPIEDADES_ICS = frozenset(('UID', 'SUMMARY', 'DTSTART', 'DTEND', 'DURATION', 'RRULE'))
+
+
+# --- CSV ----------------------------------------------------------------------
+
+def leer_csv(ruta, errores=None):
+    """
+    Eventos de un CSV con cabecera (descripcion, fecha y opcionalmente duracion y regla)
+    Args:
+        errores (list): Si se indica, recibe los números de fila que no se pudieron interpretar
+    Yields:
+        Evento: sin id
+    """
+    with open(ruta, newline='', encoding='utf-8-sig') as f:
+        for numero, fila in enumerate(csv.DictReader(f), start=2):
+            evento = _evento(fila.get('descripcion'), parsear_fecha(fila.get('fecha')),
+                             fila.get('duracion'), fila.get('regla'))
+            if evento is None:
+                if errores is not None:
+                    errores.append(numero)
+                continue
+            yield evento
+
+
+def escribir_csv(eventos, ruta):
+    """
+    Returns:
+        int: eventos escritos
+    """
+    n = 0
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS_CSV)
+        for n, e in enumerate(eventos, start=1):
+            escritor.writerow((e.id, e.descripcion, e.fecha_str, e.duracion, e.regla or ''))
+    return n
+
+
+# --- iCalendar ----------------------------------------------------------------
+
+def _lineas_desplegadas(f):
+    """Une las líneas continuadas (las que empiezan por espacio o tabulador)"""
+    actual = None
+    for linea in f:
+        linea = linea.rstrip('\r\n')
+        if linea[:1] in (' ', '\t') and actual is not None:
+            actual += linea[1:]
+            continue
+        if actual is not None:
+            yield actual
+        actual = linea
+    if actual:
+        yield actual
+
+
+def _fecha_ics(valor, parametros):
+    """DTSTART/DTEND en hora local sin zona, como el resto de la agenda"""
+    parametros = dict(p.partition('=')[::2] for p in parametros.split(';')) if parametros else {}
+    if parametros.get('VALUE') == 'DATE' or len(valor) == 8:
+        return datetime(int(valor[:4]), int(valor[4:6]), int(valor[6:8])), True
+    if len(valor) < 15 or valor[8] != 'T':
+        raise ValueError(f"Fecha iCalendar no válida: {valor}")
+    # AAAAMMDDTHHMMSS de ancho fijo: cortar es varias veces más rápido que strptime
+    fecha = datetime(int(valor[:4]), int(valor[4:6]), int(valor[6:8]),
+                     int(valor[9:11]), int(valor[11:13]), int(valor[13:15]))
+    if valor.endswith('Z'):
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    elif 'TZID' in parametros:
+        try:
+            fecha = fecha.replace(tzinfo=ZoneInfo(parametros['TZID'].strip('"')))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone().replace(tzinfo=None)
+    return fecha, False
+
+
+def _duracion_ics(valor):
+    """Minutos de una duración ISO 8601 (PT1H30M, P1D...)"""
+    match = _RE_DURACION_ICS.match(valor)
+    if match is None or match.group(1) == '-':
+        return None
+    semanas, dias, horas, minutos, segundos = (int(g or 0) for g in match.groups()[1:])
+    return ((semanas * 7 + dias) * 24 + horas) * 60 + minutos + segundos // 60
+
+
+def _evento(descripcion, fecha, duracion=None, regla=None):
+    """Evento validado o None si falta la fecha o la regla no es válida"""
+    if fecha is None:
+        return None
+    try:
+        duracion = int(duracion) if duracion else DURACION_POR_DEFECTO
+    except ValueError:
+        duracion = DURACION_POR_DEFECTO
+    regla = (regla or '').strip() or None
+    if regla is not None:
+        # UNTIL en UTC ('Z') no es compatible con fechas locales sin zona
+        regla = re.sub(r'(UNTIL=\d{8}(?:T\d{6})?)Z', r'\1', regla.removeprefix('RRULE:'))
+        try:
+            regla_recurrencia(regla, fecha)
+        except (ValueError, TypeError):
+            return None
+    return Evento(id=None, descripcion=(descripcion or '').strip() or "Evento sin descripción",
+                  fecha=fecha, creado_en=datetime.now(), duracion=max(duracion, 1), regla=regla)
+
+
+def leer_ics(ruta, errores=None):
+    """
+    Eventos (VEVENT) de un archivo iCalendar: SUMMARY, DTSTART, DTEND o DURATION y RRULE
+    Args:
+        errores (list): Si se indica, recibe el UID (o la posición) de los VEVENT descartados
+    Yields:
+        Evento: sin id
+    """
+    with open(ruta, encoding='utf-8-sig') as f:
+        propiedades = None
+        posicion = 0
+        for linea in _lineas_desplegadas(f):
+            if linea == 'BEGIN:VEVENT':
+                propiedades = {}
+                posicion += 1
+                continue
+            if propiedades is None:
+                continue
+            if linea == 'END:VEVENT':
+                evento = _evento_ics(propiedades)
+                if evento is None and errores is not None:
+                    errores.append(propiedades.get('UID', ('', ''))[0] or posicion)
+                elif evento is not None:
+                    yield evento
+                propiedades = None
+                continue
+            nombre, _, valor = linea.partition(':')
+            nombre, _, parametros = nombre.partition(';')
+            nombre = nombre.upper()
+            # Solo se guardan las propiedades que se usan; los parámetros se interpretan después
+            if nombre in _PROPIEDADES_ICS and nombre not in propiedades:
+                propiedades[nombre] = (valor, parametros)
+
+
+def _evento_ics(propiedades):
+    if 'DTSTART' not in propiedades:
+        return None
+    try:
+        inicio, dia_completo = _fecha_ics(*propiedades['DTSTART'])
+        if 'DURATION' in propiedades:
+            duracion = _duracion_ics(propiedades['DURATION'][0])
+        elif 'DTEND' in propiedades:
+            fin, _ = _fecha_ics(*propiedades['DTEND'])
+            duracion = int((fin - inicio).total_seconds() // 60)
+        else:
+            duracion = 24 * 60 if dia_completo else None
+    except ValueError:
+        return None
+    resumen = _RE_ESCAPE_ICS.sub(lambda m: _ESCAPES_ICS[m.group()], propiedades.get('SUMMARY', ('', ''))[0])
+    return _evento(resumen, inicio, duracion, propiedades.get('RRULE', ('', ''))[0])
+
+
+def _escapar_ics(texto):
+    return (texto.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\n', '\\n'))
+
+
+def _plegar(linea):
+    """Parte una línea en tramos de como mucho 75 octetos sin cortar caracteres UTF-8"""
+    datos = linea.encode('utf-8')
+    if len(datos) <= MAX_OCTETOS_ICS:
+        return linea + '\r\n'
+    partes = []
+    inicio, limite = 0, MAX_OCTETOS_ICS
+    while inicio < len(datos):
+        fin = min(inicio + limite, len(datos))
+        # No se corta en mitad de un carácter multibyte (bytes de continuación 10xxxxxx)
+        while fin < len(datos) and datos[fin] & 0xC0 == 0x80:
+            fin -= 1
+        partes.append(datos[inicio:fin].decode('utf-8'))
+        inicio, limite = fin, MAX_OCTETOS_ICS - 1
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def escribir_ics(eventos, ruta):
+    """
+    Returns:
+        int: eventos escritos
+    """
+    sello = datetime.now(timezone.utc).strftime(FORMATO_ICS) + 'Z'
+    n = 0
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//chatbot_agenda//ES\r\n")
+        for n, e in enumerate(eventos, start=1):
+            lineas = [
+                "BEGIN:VEVENT",
+                f"UID:{e.id}-{e.fecha:%Y%m%dT%H%M}@chatbot-agenda",
+                f"DTSTAMP:{sello}",
+                f"DTSTART:{e.fecha.strftime(FORMATO_ICS)}",
+                f"DURATION:PT{e.duracion}M",
+                f"SUMMARY:{_escapar_ics(e.descripcion)}",
+            ]
+            if e.regla:
+                lineas.append(f"RRULE:{e.regla}")
+            lineas.append("END:VEVENT")
+            f.write(''.join(map(_plegar, lineas)))
+        f.write("END:VCALENDAR\r\n")
+    return n
+
+
+# --- Entrada/salida por formato -----------------------------------------------
+
+LECTORES = {'.ics': leer_ics, '.csv': leer_csv}
+ESCRITORES = {'.ics': escribir_ics, '.csv': escribir_csv}
+
+
+def _formato(ruta, tabla):
+    sufijo = Path(ruta).suffix.lower()
+    if sufijo not in tabla:
+        raise ValueError(f"Formato no soportado: {sufijo or ruta} (usa {', '.join(tabla)})")
+    return tabla[sufijo]
+
+
+def importar(agenda, ruta):
+    """
+    Importa un .ics o .csv en una única escritura, sin duplicar eventos existentes
+    Returns:
+        dict: leidos, importados, duplicados y descartados (entradas no interpretables)
+    """
+    errores = []
+    leidos = 0
+
+    def contar(eventos):
+        nonlocal leidos
+        for leidos, evento in enumerate(eventos, start=1):
+            yield evento
+
+    añadidos = agenda.agregar_eventos(contar(_formato(ruta, LECTORES)(ruta, errores)))
+    return {'leidos': leidos, 'importados': len(añadidos),
+            'duplicados': leidos - len(añadidos), 'descartados': len(errores)}
+
+
+def exportar(agenda, ruta, desde=None, hasta=None):
+    """
+    Exporta la agenda (o los eventos con fecha en [desde, hasta)) a .ics o .csv.
+    Las series recurrentes se exportan una vez, con su regla.
+    Returns:
+        int: eventos escritos
+    """
+    # Orden de creación: se recorre la agenda sin copiarla
+    eventos = iter(agenda)
+    if desde is not None or hasta is not None:
+        eventos = (e for e in eventos if (desde is None or e.fecha >= desde) and (hasta is None or e.fecha < hasta))
+    return _formato(ruta, ESCRITORES)(eventos, ruta)
+
+
+def main(argv=None):
+    from agenda_manager import AgendaManager
+    from agendas import ruta_agenda
+
+    parser = argparse.ArgumentParser(description="Importa y exporta la agenda en .ics o .csv",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument('accion', choices=('importar', 'exportar'))
+    parser.add_argument('archivo')
+    destino = parser.add_mutually_exclusive_group()
+    destino.add_argument('--agenda', default='./data/agenda.json', help="agenda compartida (por defecto)")
+    destino.add_argument('--usuario', help="agenda de un usuario en data/usuarios/")
+    parser.add_argument('--desde', help="exportar solo desde esta fecha (dd/mm/aaaa)")
+    parser.add_argument('--hasta', help="exportar solo hasta esta fecha, excluida (dd/mm/aaaa)")
+    args = parser.parse_args(argv)
+
+    ruta = args.agenda
+    if args.usuario:
+        ruta = ruta_agenda(args.usuario)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+    agenda = AgendaManager(str(ruta))
+    inicio = time.perf_counter()
+    try:
+        if args.accion == 'importar':
+            resultado = importar(agenda, args.archivo)
+            print(f"Importados {resultado['importados']} de {resultado['leidos']} eventos "
+                  f"({resultado['duplicados']} duplicados, {resultado['descartados']} descartados) "
+                  f"en {time.perf_counter() - inicio:.2f} s")
+        else:
+            n = exportar(agenda, args.archivo, parsear_fecha(args.desde), parsear_fecha(args.hasta))
+            print(f"Exportados {n} eventos a {args.archivo} en {time.perf_counter() - inicio:.2f} s")
+    finally:
+        agenda.cerrar()
+
+
+if __name__ == "__main__":
+    main()
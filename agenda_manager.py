@@ -1,29 +1,354 @@
-import json
-from datetime import datetime
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from itertools import islice
+from operator import attrgetter
+from agenda_store import crear_store
+from utils import metrics
+from evento import DURACION_POR_DEFECTO, Evento, parsear_fecha, primera_ocurrencia
+
+_por_fecha = attrgetter('fecha')
+# Límite de siguiente_hueco() sin `hasta` cuando hay series: una serie sin fin nunca deja de ocupar
+HORIZONTE_HUECOS = timedelta(days=365)
+
+def _normalizar_texto(texto):
+    """Minúsculas y sin tildes, para búsquedas de texto libre"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+_REPETICIONES = {'DAILY': ('cada día', 'cada {} días'), 'WEEKLY': ('cada semana', 'cada {} semanas'),
+                 'MONTHLY': ('cada mes', 'cada {} meses'), 'YEARLY': ('cada año', 'cada {} años')}
+_NOMBRES_DIA = {'MO': 'lunes', 'TU': 'martes', 'WE': 'miércoles', 'TH': 'jueves',
+                'FR': 'viernes', 'SA': 'sábado', 'SU': 'domingo'}
+
+def describir_regla(regla):
+    """Texto breve de una regla RRULE ("se repite cada semana: lunes, jueves")"""
+    campos = dict(parte.split('=', 1) for parte in regla.split(';') if '=' in parte)
+    una, varias = _REPETICIONES.get(campos.get('FREQ'), ('periódicamente', 'periódicamente'))
+    intervalo = int(campos.get('INTERVAL', 1))
+    texto = 'se repite ' + (varias.format(intervalo) if intervalo > 1 else una)
+    if 'BYDAY' in campos:
+        texto += ': ' + ', '.join(_NOMBRES_DIA.get(d[-2:], d) for d in campos['BYDAY'].split(','))
+    if 'COUNT' in campos:
+        texto += f", {campos['COUNT']} veces"
+    elif 'UNTIL' in campos:
+        texto += f", hasta el {campos['UNTIL'][6:8]}/{campos['UNTIL'][4:6]}/{campos['UNTIL'][:4]}"
+    return texto
+
+def formatear_eventos(eventos):
+    """Lista legible de eventos para las respuestas del bot"""
+    return "\n".join(f"- {e.fecha_str}: {e.descripcion}" + (" (se repite)" if e.regla else "")
+                     for e in eventos)
 
 class AgendaManager:
-    def __init__(self, filepath='./data/agenda.json'):
+    def __init__(self, filepath='./data/agenda.json', backend='sqlite'):
         self.filepath = filepath
+        self.store = crear_store(filepath, backend)
+        # Protege índice y store cuando la agenda se comparte entre hilos (servidor, GUI)
+        self._lock = threading.RLock()
+        # Funciones observador(accion, evento) avisadas de cada alta ('agregado') y baja ('eliminado')
+        self.observadores = []
         self.cargar_agenda()
 
+    def __len__(self):
+        return len(self.eventos)
+
+    def __iter__(self):
+        """Eventos en orden de creación"""
+        return iter(self.eventos.values())
+
+    def cerrar(self):
+        """Libera el almacenamiento (conexión SQLite)"""
+        with self._lock:
+            self.store.cerrar()
+
+    def _notificar(self, accion, evento):
+        for observador in self.observadores:
+            observador(accion, evento)
+
     def cargar_agenda(self):
-        try:
-            with open(self.filepath, 'r') as f:
-                self.agenda = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.agenda = {"eventos": []}
+        with self._lock, metrics.medir('agenda.cargar'):
+            # id -> Evento; el dict conserva el orden de inserción
+            self.eventos = {e.id: e for e in self.store.cargar()}
+            self._reconstruir_indice()
+
+    def _reconstruir_indice(self):
+        """Índice ordenado (fecha, id) para consultas por rango en O(log N + k)"""
+        # Las series recurrentes se guardan una vez y se expanden solo sobre la ventana consultada
+        self._series = {e.id: e for e in self.eventos.values() if e.regla is not None}
+        unicos = [e for e in self.eventos.values() if e.regla is None]
+        self._indice = sorted((e.fecha, e.id) for e in unicos)
+        # Cota de la duración: un evento que solapa [inicio, fin) empieza en
+        # [inicio - duración máxima, fin), así que el mismo índice sirve de índice de intervalos
+        self._duracion_max = max((e.fin - e.fecha for e in unicos), default=timedelta(0))
+        # Bloques ocupados (unión de los eventos); se reconstruyen al pedirlos tras un borrado
+        self._bloques = None
+
+    def _bloques_ocupados(self):
+        """
+        Inicios y fines de los bloques ocupados, disjuntos y ordenados (con el lock tomado).
+        Los eventos seguidos o solapados forman un único bloque, de modo que la
+        búsqueda de huecos salta una mañana completa de reuniones en un solo paso.
+        """
+        if self._bloques is None:
+            inicios, fines = [], []
+            for fecha, evento_id in self._indice:
+                fin = self.eventos[evento_id].fin
+                if fines and fecha <= fines[-1]:
+                    fines[-1] = max(fines[-1], fin)
+                else:
+                    inicios.append(fecha)
+                    fines.append(fin)
+            self._bloques = (inicios, fines)
+        return self._bloques
+
+    def _ocupar(self, inicio, fin):
+        """Fusiona [inicio, fin) con los bloques que toca (O(log N) + desplazamiento de la lista)"""
+        if self._bloques is None:
+            return
+        inicios, fines = self._bloques
+        i = bisect_left(fines, inicio)
+        j = bisect_right(inicios, fin)
+        if i < j:
+            inicio, fin = min(inicio, inicios[i]), max(fin, fines[j - 1])
+        inicios[i:j] = [inicio]
+        fines[i:j] = [fin]
+
+    def _desde_solapes(self, inicio):
+        """Posición en el índice del primer evento que podría seguir en curso en `inicio`"""
+        return bisect_left(self._indice, (inicio - self._duracion_max, 0))
+
+    def _ocurrencias_series(self, desde, hasta=None, en_curso=False):
+        """
+        Un generador por serie con sus ocurrencias desde `desde` (con en_curso, también
+        las que empezaron antes y aún no han terminado)
+        """
+        return [serie.ocurrencias(desde - (serie.fin - serie.fecha) if en_curso else desde, hasta)
+                for serie in self._series.values()]
+
+    def _intervalos_ocupados(self, desde, hasta=None):
+        """
+        (inicio, fin) ocupados que terminan después de `desde` (y empiezan antes de `hasta`),
+        por orden de inicio (con el lock tomado)
+        """
+        inicios, fines = self._bloques_ocupados()
+        bloques = ((inicios[i], fines[i]) for i in range(bisect_right(fines, desde), len(inicios)))
+        series = (((o.fecha, o.fin) for o in ocurrencias)
+                  for ocurrencias in self._ocurrencias_series(desde, hasta, en_curso=True))
+        return heapq.merge(bloques, *series)
 
     def guardar_agenda(self):
-        with open(self.filepath, 'w') as f:
-            json.dump(self.agenda, f, indent=2)
-
-    def agregar_evento(self, descripcion, fecha):
-        nuevo_evento = {
-            "id": len(self.agenda["eventos"]) + 1,
-            "descripcion": descripcion,
-            "fecha": fecha,
-            "creado_en": datetime.now().isoformat()
-        }
-        self.agenda["eventos"].append(nuevo_evento)
-        self.guardar_agenda()
-        return True
\ No newline at end of file
+        """Vuelca la agenda completa (solo necesario tras modificar self.eventos a mano)"""
+        with self._lock, metrics.medir('agenda.guardar'):
+            self.store.guardar(self.eventos.values())
+            self._reconstruir_indice()
+
+    def agregar_evento(self, descripcion, fecha, duracion=None, regla=None):
+        """
+        Añade un evento (aunque se solape con otros; ver conflictos())
+        Args:
+            descripcion (str): Texto del evento
+            fecha (datetime | str): Fecha del evento ('dd/mm/aaaa HH:MM' si es texto)
+            duracion (int): Minutos; por defecto DURACION_POR_DEFECTO
+            regla (str): Regla RRULE si el evento se repite ("FREQ=WEEKLY;BYDAY=MO;COUNT=10");
+                         la serie empieza en la primera ocurrencia desde `fecha`
+        Returns:
+            Evento: el evento creado, con su id definitivo
+        """
+        with self._lock, metrics.medir('agenda.agregar'):
+            fecha_obj = parsear_fecha(fecha)
+            if fecha_obj is None:
+                raise ValueError(f"Fecha no reconocida: {fecha}")
+            if regla is not None:
+                fecha_obj = primera_ocurrencia(regla, fecha_obj)
+                if fecha_obj is None:
+                    raise ValueError(f"La regla no genera ninguna fecha: {regla}")
+            nuevo_evento = Evento(
+                id=None,
+                descripcion=descripcion,
+                fecha=fecha_obj,
+                creado_en=datetime.now(),
+                duracion=duracion or DURACION_POR_DEFECTO,
+                regla=regla,
+            )
+            # Inserción incremental: el store asigna el id y no reescribe los eventos existentes
+            self.store.insertar(nuevo_evento)
+            self.eventos[nuevo_evento.id] = nuevo_evento
+            if regla is not None:
+                self._series[nuevo_evento.id] = nuevo_evento
+            else:
+                insort(self._indice, (nuevo_evento.fecha, nuevo_evento.id))
+                self._duracion_max = max(self._duracion_max, nuevo_evento.fin - nuevo_evento.fecha)
+                self._ocupar(nuevo_evento.fecha, nuevo_evento.fin)
+            self._notificar('agregado', nuevo_evento)
+            return nuevo_evento
+
+    def clave_duplicado(self, evento):
+        """Dos eventos a la misma hora con la misma descripción (sin tildes ni mayúsculas) son el mismo"""
+        return evento.fecha, _normalizar_texto(evento.descripcion)
+
+    def agregar_eventos(self, eventos, omitir_duplicados=True):
+        """
+        Añade muchos eventos en una sola escritura del store (importaciones)
+        Args:
+            eventos (iterable[Evento]): Eventos sin id; se consumen una sola vez
+            omitir_duplicados (bool): Descarta los que ya están en la agenda o se repiten en el lote
+        Returns:
+            list[Evento]: los eventos añadidos, con su id definitivo
+        """
+        with self._lock, metrics.medir('agenda.agregar_lote'):
+            vistos = {self.clave_duplicado(e) for e in self.eventos.values()} if omitir_duplicados else None
+            nuevos = []
+            for evento in eventos:
+                if omitir_duplicados:
+                    clave = self.clave_duplicado(evento)
+                    if clave in vistos:
+                        continue
+                    vistos.add(clave)
+                nuevos.append(evento)
+            if not nuevos:
+                return nuevos
+            self.store.insertar_lote(nuevos)
+            unicos = []
+            for evento in nuevos:
+                self.eventos[evento.id] = evento
+                if evento.regla is not None:
+                    self._series[evento.id] = evento
+                else:
+                    unicos.append(evento)
+                    self._duracion_max = max(self._duracion_max, evento.fin - evento.fecha)
+            # Timsort fusiona en O(N) los dos tramos ya ordenados; insort uno a uno sería O(N·k)
+            self._indice.extend(sorted((e.fecha, e.id) for e in unicos))
+            self._indice.sort()
+            self._bloques = None
+            if self.observadores:
+                for evento in nuevos:
+                    self._notificar('agregado', evento)
+            return nuevos
+
+    def eliminar_evento(self, evento_id):
+        with self._lock:
+            if not self.store.eliminar(evento_id):
+                return False
+            evento = self.eventos.pop(evento_id, None)
+            if evento is not None and evento.regla is not None:
+                # Se elimina la serie completa
+                del self._series[evento_id]
+            elif evento is not None:
+                pos = bisect_left(self._indice, (evento.fecha, evento_id))
+                if pos < len(self._indice) and self._indice[pos] == (evento.fecha, evento_id):
+                    del self._indice[pos]
+                # Un borrado puede partir un bloque: se recalculan en la siguiente búsqueda
+                self._bloques = None
+            if evento is not None:
+                self._notificar('eliminado', evento)
+            return True
+
+    def eventos_entre(self, inicio, fin):
+        """Eventos con fecha en [inicio, fin), ordenados por fecha (cada ocurrencia de una serie por separado)"""
+        with self._lock:
+            desde = bisect_left(self._indice, (inicio, 0))
+            hasta = bisect_left(self._indice, (fin, 0), lo=desde)
+            eventos = [self.eventos[evento_id] for _, evento_id in self._indice[desde:hasta]]
+            if not self._series:
+                return eventos
+            return list(heapq.merge(eventos, *self._ocurrencias_series(inicio, fin), key=_por_fecha))
+
+    def conflictos(self, fecha, duracion=None, excluir=None):
+        """
+        Eventos que se solapan con el intervalo [fecha, fecha + duracion)
+        Args:
+            duracion (int): Minutos; por defecto DURACION_POR_DEFECTO
+            excluir (int): Id a ignorar (el propio evento recién añadido)
+        Returns:
+            list[Evento]: ordenados por fecha
+        """
+        fin = fecha + timedelta(minutes=duracion or DURACION_POR_DEFECTO)
+        with self._lock:
+            hasta = bisect_left(self._indice, (fin, 0))
+            candidatos = [self.eventos[self._indice[i][1]] for i in range(self._desde_solapes(fecha), hasta)]
+            if self._series:
+                candidatos = heapq.merge(candidatos, *self._ocurrencias_series(fecha, fin, en_curso=True),
+                                         key=_por_fecha)
+            return [e for e in candidatos if e.fin > fecha and e.id != excluir]
+
+    def huecos_libres(self, inicio, fin, minimo=30):
+        """
+        Intervalos libres de al menos `minimo` minutos dentro de [inicio, fin)
+        Returns:
+            list[tuple]: (inicio, fin) de cada hueco, en orden
+        """
+        minimo = timedelta(minutes=minimo)
+        huecos = []
+        with self._lock:
+            cursor = inicio
+            for ocupado_inicio, ocupado_fin in self._intervalos_ocupados(inicio, fin):
+                if ocupado_inicio >= fin:
+                    break
+                if ocupado_inicio - cursor >= minimo:
+                    huecos.append((cursor, ocupado_inicio))
+                cursor = max(cursor, ocupado_fin)
+        if fin - cursor >= minimo:
+            huecos.append((cursor, fin))
+        return huecos
+
+    def siguiente_hueco(self, duracion, desde=None, hasta=None):
+        """
+        Primer instante a partir de `desde` con `duracion` minutos libres seguidos
+        Args:
+            hasta (datetime): Fin de la búsqueda; con series, por defecto desde + HORIZONTE_HUECOS
+        Returns:
+            datetime o None si no hay hueco antes de `hasta`
+        """
+        desde = desde or datetime.now()
+        duracion = timedelta(minutes=duracion)
+        with self._lock:
+            if hasta is None and self._series:
+                hasta = desde + HORIZONTE_HUECOS
+            cursor = desde
+            # Bloques y ocurrencias llegan por orden de inicio: el primer hueco suficiente es la respuesta
+            for ocupado_inicio, ocupado_fin in self._intervalos_ocupados(desde, hasta):
+                if ocupado_inicio - cursor >= duracion or (hasta is not None and ocupado_inicio >= hasta):
+                    break
+                cursor = max(cursor, ocupado_fin)
+        if hasta is not None and cursor + duracion > hasta:
+            return None
+        return cursor
+
+    def eventos_del_dia(self, fecha):
+        inicio = datetime(fecha.year, fecha.month, fecha.day)
+        return self.eventos_entre(inicio, inicio + timedelta(days=1))
+
+    def eventos_de_la_semana(self, fecha):
+        """Eventos de la semana (lunes a domingo) que contiene la fecha"""
+        lunes = datetime(fecha.year, fecha.month, fecha.day) - timedelta(days=fecha.weekday())
+        return self.eventos_entre(lunes, lunes + timedelta(days=7))
+
+    def eventos_futuros(self, desde=None):
+        """
+        Eventos únicos con fecha desde `desde` más las series completas (sin expandir)
+        Returns:
+            list[Evento]
+        """
+        with self._lock:
+            pos = bisect_left(self._indice, (desde or datetime.now(), 0))
+            return [self.eventos[evento_id] for _, evento_id in self._indice[pos:]] + list(self._series.values())
+
+    def proximos_eventos(self, n=5, desde=None):
+        with self._lock:
+            desde = desde or datetime.now()
+            pos = bisect_left(self._indice, (desde, 0))
+            eventos = [self.eventos[evento_id] for _, evento_id in self._indice[pos:pos + n]]
+            if not self._series:
+                return eventos
+            # Las series sin fin solo se expanden hasta completar n eventos
+            return list(islice(heapq.merge(eventos, *self._ocurrencias_series(desde), key=_por_fecha), n))
+
+    def buscar(self, texto):
+        """Eventos cuya descripción contiene el texto (sin distinguir mayúsculas ni tildes)"""
+        texto = _normalizar_texto(texto)
+        with self._lock:
+            eventos = list(self.eventos.values())
+        return [e for e in eventos if texto in _normalizar_texto(e.descripcion)]
@@ -0,0 +1,285 @@
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from evento import DURACION_POR_DEFECTO, Evento
+
+
+def escribir_json_atomico(filepath, datos):
+    """Escribe en un temporal del mismo directorio y lo renombra (os.replace es atómico)"""
+    directorio = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(dir=directorio, prefix='.agenda-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class JSONAgendaStore:
+    """Almacenamiento clásico {"eventos": [...]}; cada cambio reescribe el archivo de forma atómica"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.eventos = []
+        self.siguiente_id = 1
+
+    def cargar(self):
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            datos = {}
+        entradas = datos.get("eventos", [])
+        # El contador persiste para que un id nunca se reutilice tras eliminar
+        self.siguiente_id = max(
+            [datos.get("siguiente_id", 1)] + [e["id"] + 1 for e in entradas if "id" in e]
+        )
+        self.eventos = []
+        for entrada in entradas:
+            evento = Evento.from_dict(entrada, evento_id=self.siguiente_id)
+            if evento is None:
+                continue
+            if evento.id == self.siguiente_id:
+                self.siguiente_id += 1
+            self.eventos.append(evento)
+        return list(self.eventos)
+
+    def _escribir(self):
+        escribir_json_atomico(self.filepath, {
+            "siguiente_id": self.siguiente_id,
+            "eventos": [e.to_dict() for e in self.eventos],
+        })
+
+    def insertar(self, evento):
+        evento.id = self.siguiente_id
+        self.siguiente_id += 1
+        self.eventos.append(evento)
+        self._escribir()
+        return evento.id
+
+    def insertar_lote(self, eventos):
+        """Asigna ids consecutivos y escribe el archivo una sola vez"""
+        for evento in eventos:
+            evento.id = self.siguiente_id
+            self.siguiente_id += 1
+        self.eventos.extend(eventos)
+        self._escribir()
+
+    def eliminar(self, evento_id):
+        restantes = [e for e in self.eventos if e.id != evento_id]
+        if len(restantes) == len(self.eventos):
+            return False
+        self.eventos = restantes
+        self._escribir()
+        return True
+
+    def guardar(self, eventos):
+        self.eventos = list(eventos)
+        self.siguiente_id = max([self.siguiente_id] + [e.id + 1 for e in self.eventos])
+        self._escribir()
+
+    def cerrar(self):
+        pass
+
+
+class SQLiteAgendaStore:
+    """
+    Almacenamiento en SQLite con índices por id y por fecha.
+    Cada inserción es una transacción independiente (O(log N), sin reescribir
+    el resto de la agenda) y el modo WAL permite varios procesos a la vez.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS eventos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            descripcion TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            fecha_orden TEXT,
+            creado_en TEXT,
+            duracion INTEGER,
+            regla TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_eventos_fecha ON eventos (fecha_orden);
+        CREATE TABLE IF NOT EXISTS meta (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        );
+    """
+    COLUMNAS = "id, descripcion, fecha, fecha_orden, creado_en, duracion, regla"
+    # Columnas añadidas después de la primera versión del esquema
+    COLUMNAS_NUEVAS = {'duracion': 'INTEGER', 'regla': 'TEXT'}
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.ESQUEMA)
+        self._migrar_esquema()
+
+    def _migrar_esquema(self):
+        """Añade las columnas que faltan en bases creadas por versiones anteriores"""
+        columnas = {fila[1] for fila in self.conn.execute("PRAGMA table_info(eventos)")}
+        with self.conn:
+            for columna, tipo in self.COLUMNAS_NUEVAS.items():
+                if columna not in columnas:
+                    self.conn.execute(f"ALTER TABLE eventos ADD COLUMN {columna} {tipo}")
+
+    @staticmethod
+    def _fila(evento):
+        # AUTOINCREMENT garantiza ids monótonos: un id eliminado no se reutiliza
+        return (
+            evento.id,
+            evento.descripcion,
+            evento.fecha_str,
+            evento.fecha.isoformat(timespec='minutes'),
+            evento.creado_en.isoformat() if evento.creado_en else None,
+            evento.duracion,
+            evento.regla,
+        )
+
+    @staticmethod
+    def _evento(fila):
+        evento_id, descripcion, fecha, fecha_orden, creado_en, duracion, regla = fila
+        if fecha_orden is None:
+            # Fila antigua sin fecha normalizada
+            return Evento.from_dict({"id": evento_id, "descripcion": descripcion, "fecha": fecha,
+                                     "creado_en": creado_en, "duracion": duracion, "regla": regla})
+        return Evento(
+            id=evento_id,
+            descripcion=descripcion,
+            fecha=datetime.fromisoformat(fecha_orden),
+            creado_en=datetime.fromisoformat(creado_en) if creado_en else None,
+            duracion=duracion or DURACION_POR_DEFECTO,
+            regla=regla,
+        )
+
+    def _consultar(self, sql, parametros=()):
+        eventos = (self._evento(fila) for fila in self.conn.execute(sql, parametros))
+        return [e for e in eventos if e is not None]
+
+    def cargar(self):
+        return self._consultar(f"SELECT {self.COLUMNAS} FROM eventos ORDER BY id")
+
+    def obtener(self, evento_id):
+        eventos = self._consultar(f"SELECT {self.COLUMNAS} FROM eventos WHERE id = ?", (evento_id,))
+        return eventos[0] if eventos else None
+
+    def entre(self, inicio, fin):
+        """Eventos con fecha en [inicio, fin) usando el índice por fecha (las series, por su primera ocurrencia)"""
+        return self._consultar(
+            f"SELECT {self.COLUMNAS} FROM eventos "
+            "WHERE fecha_orden >= ? AND fecha_orden < ? ORDER BY fecha_orden",
+            (inicio.isoformat(timespec='minutes'), fin.isoformat(timespec='minutes')),
+        )
+
+    def insertar(self, evento):
+        with self.conn:
+            cursor = self.conn.execute(
+                f"INSERT INTO eventos ({self.COLUMNAS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._fila(evento),
+            )
+        evento.id = cursor.lastrowid
+        return evento.id
+
+    def insertar_lote(self, eventos):
+        """
+        Inserta muchos eventos en una única transacción. Los ids se reservan a partir
+        del contador de AUTOINCREMENT con la base bloqueada para escritura (BEGIN IMMEDIATE),
+        así que otro proceso no puede asignar los mismos entretanto.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            fila = self.conn.execute(
+                "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'eventos'), 0),"
+                " COALESCE((SELECT MAX(id) FROM eventos), 0))"
+            ).fetchone()
+            for siguiente, evento in enumerate(eventos, start=fila[0] + 1):
+                evento.id = siguiente
+            self.conn.executemany(
+                f"INSERT INTO eventos ({self.COLUMNAS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                map(self._fila, eventos),
+            )
+
+    def eliminar(self, evento_id):
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM eventos WHERE id = ?", (evento_id,))
+        return cursor.rowcount > 0
+
+    def guardar(self, eventos):
+        """Reemplaza todo el contenido en una sola transacción"""
+        with self.conn:
+            self.conn.execute("DELETE FROM eventos")
+            self.conn.executemany(
+                f"INSERT INTO eventos ({self.COLUMNAS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._fila(e) for e in eventos],
+            )
+
+    def leer_meta(self, clave):
+        fila = self.conn.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def escribir_meta(self, clave, valor):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, valor))
+
+    def migrar_desde_json(self, json_path):
+        """
+        Importa una agenda {"eventos": [...]} una única vez, normalizando las entradas antiguas
+        Returns:
+            int: número de eventos migrados (0 si ya se había migrado)
+        """
+        json_path = str(json_path)
+        if not os.path.exists(json_path):
+            return 0
+        with self.conn:
+            if self.conn.execute("SELECT 1 FROM meta WHERE clave = 'migrado_desde'").fetchone():
+                return 0
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    entradas = json.load(f).get("eventos", [])
+            except json.JSONDecodeError:
+                entradas = []
+            # Se conservan los ids existentes; None hace que SQLite asigne uno nuevo
+            eventos = [e for e in map(Evento.from_dict, entradas) if e is not None]
+            if len(eventos) < len(entradas):
+                print(f"Aviso: {len(entradas) - len(eventos)} eventos con fecha no reconocible no se migraron")
+            self.conn.executemany(
+                f"INSERT INTO eventos ({self.COLUMNAS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._fila(e) for e in eventos],
+            )
+            self.conn.execute(
+                "INSERT INTO meta (clave, valor) VALUES ('migrado_desde', ?)", (json_path,)
+            )
+        return len(eventos)
+
+    def cerrar(self):
+        self.conn.close()
+
+
+def crear_store(filepath, backend='sqlite'):
+    """
+    Crea el almacenamiento de la agenda
+    Args:
+        filepath (str): Ruta de agenda.json; con 'sqlite' se usa el .db hermano
+                        y el JSON existente se migra la primera vez
+        backend (str): 'sqlite' o 'json'
+    """
+    if backend == 'json':
+        return JSONAgendaStore(filepath)
+    if backend != 'sqlite':
+        raise ValueError(f"Backend de agenda desconocido: {backend}")
+
+    ruta = Path(filepath)
+    db_path = ruta.with_suffix('.db') if ruta.suffix == '.json' else ruta
+    store = SQLiteAgendaStore(db_path)
+    if ruta.suffix == '.json':
+        store.migrar_desde_json(ruta)
+    return store
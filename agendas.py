@@ -0,0 +1,163 @@
+import contextlib
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from agenda_manager import AgendaManager
+
+DIRECTORIO_USUARIOS = Path(__file__).parent / 'data' / 'usuarios'
+
+def ruta_agenda(usuario_id, directorio=DIRECTORIO_USUARIOS):
+    """
+    Shard SQLite de un usuario: <directorio>/<2 primeros hex>/<sha1>.db
+    El hash admite cualquier id (correos, UUID...) y reparte los ficheros en 256 carpetas.
+    """
+    digest = hashlib.sha1(str(usuario_id).encode('utf-8')).hexdigest()
+    return Path(directorio) / digest[:2] / f'{digest}.db'
+
+class _Entrada:
+    __slots__ = ('agenda', 'ultimo_uso', 'en_uso')
+
+    def __init__(self, agenda):
+        self.agenda = agenda
+        self.ultimo_uso = time.monotonic()
+        self.en_uso = 0
+
+class AgendaPool:
+    """
+    Agendas por usuario cargadas bajo demanda, con LRU acotada por número de
+    agendas abiertas y por eventos en memoria. Las agendas inactivas más de
+    `ttl` segundos se cierran con purgar_inactivas().
+    """
+
+    def __init__(self, directorio=DIRECTORIO_USUARIOS, max_abiertas=256, max_eventos=1_000_000, ttl=900):
+        self.directorio = Path(directorio)
+        self.max_abiertas = max_abiertas
+        self.max_eventos = max_eventos
+        self.ttl = ttl
+        # usuario -> _Entrada, de la usada hace más tiempo a la más reciente
+        self._abiertas = OrderedDict()
+        self._lock = threading.Lock()
+        self._carga_locks = {}
+        # Funciones f(usuario_id, agenda) llamadas cada vez que se abre una agenda (recordatorios)
+        self.al_abrir = []
+
+    def __len__(self):
+        return len(self._abiertas)
+
+    def __contains__(self, usuario_id):
+        return usuario_id in self._abiertas
+
+    @contextlib.contextmanager
+    def usar(self, usuario_id):
+        """
+        Agenda del usuario mientras dure el bloque; no se desaloja mientras está en uso
+        Yields:
+            AgendaManager
+        """
+        entrada = self._adquirir(usuario_id)
+        try:
+            yield entrada.agenda
+        finally:
+            with self._lock:
+                entrada.en_uso -= 1
+                entrada.ultimo_uso = time.monotonic()
+                # Si se superó el límite mientras todas estaban en uso, se ajusta ahora
+                cerradas = self._desalojar() if len(self._abiertas) > self.max_abiertas else []
+            for agenda in cerradas:
+                agenda.cerrar()
+
+    def _adquirir(self, usuario_id):
+        with self._lock:
+            entrada = self._abiertas.get(usuario_id)
+            if entrada is not None:
+                self._abiertas.move_to_end(usuario_id)
+                entrada.en_uso += 1
+                return entrada
+            carga_lock = self._carga_locks.setdefault(usuario_id, threading.Lock())
+
+        # La carga (E/S) se hace fuera del lock global; solo se serializa por usuario
+        with carga_lock:
+            with self._lock:
+                entrada = self._abiertas.get(usuario_id)
+                if entrada is not None:
+                    self._abiertas.move_to_end(usuario_id)
+                    entrada.en_uso += 1
+                    return entrada
+            ruta = ruta_agenda(usuario_id, self.directorio)
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            entrada = _Entrada(AgendaManager(str(ruta)))
+            # El nombre del shard es un hash: el id se guarda dentro para recorrer_guardadas()
+            if entrada.agenda.store.leer_meta('usuario') is None:
+                entrada.agenda.store.escribir_meta('usuario', str(usuario_id))
+            for funcion in self.al_abrir:
+                funcion(usuario_id, entrada.agenda)
+            with self._lock:
+                entrada.en_uso = 1
+                self._abiertas[usuario_id] = entrada
+                self._carga_locks.pop(usuario_id, None)
+                cerradas = self._desalojar()
+        for agenda in cerradas:
+            agenda.cerrar()
+        return entrada
+
+    def _desalojar(self):
+        """Saca de la LRU las agendas libres más antiguas hasta cumplir los límites (con el lock tomado)"""
+        total = sum(len(e.agenda) for e in self._abiertas.values())
+        cerradas = []
+        for usuario_id, entrada in list(self._abiertas.items()):
+            if len(self._abiertas) <= self.max_abiertas and total <= self.max_eventos:
+                break
+            if entrada.en_uso:
+                continue
+            del self._abiertas[usuario_id]
+            total -= len(entrada.agenda)
+            cerradas.append(entrada.agenda)
+        return cerradas
+
+    def recorrer_guardadas(self):
+        """
+        Agendas de todos los usuarios con shard en disco, abiertas de una en una y
+        cerradas al pasar a la siguiente; no entran en la LRU. Se omiten los shards
+        creados antes de guardar el id del usuario.
+        Yields:
+            tuple: (usuario_id, AgendaManager)
+        """
+        for ruta in sorted(self.directorio.glob('*/*.db')):
+            agenda = AgendaManager(str(ruta))
+            try:
+                usuario_id = agenda.store.leer_meta('usuario')
+                if usuario_id is not None:
+                    yield usuario_id, agenda
+            finally:
+                agenda.cerrar()
+
+    def purgar_inactivas(self):
+        """
+        Cierra las agendas sin uso durante más de ttl segundos
+        Returns:
+            int: agendas cerradas
+        """
+        limite = time.monotonic() - self.ttl
+        with self._lock:
+            inactivas = [u for u, e in self._abiertas.items() if not e.en_uso and e.ultimo_uso < limite]
+            cerradas = [self._abiertas.pop(u).agenda for u in inactivas]
+        for agenda in cerradas:
+            agenda.cerrar()
+        return len(cerradas)
+
+    def cerrar(self):
+        with self._lock:
+            cerradas = [e.agenda for e in self._abiertas.values()]
+            self._abiertas.clear()
+        for agenda in cerradas:
+            agenda.cerrar()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'abiertas': len(self._abiertas),
+                'en_uso': sum(1 for e in self._abiertas.values() if e.en_uso),
+                'eventos_en_memoria': sum(len(e.agenda) for e in self._abiertas.values()),
+            }
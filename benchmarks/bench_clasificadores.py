@@ -0,0 +1,107 @@
+"""
+Compara los backends de clasificación de intenciones: exactitud, tiempo de carga
+y latencia p50/p99 por mensaje a través de IntentPredictor.predict.
+
+Backends: red Keras (modelo_chatbot.h5, si TensorFlow está instalado), red plegada
+en NumPy (modelo_chatbot.npz), centroide coseno y TF-IDF + regresión logística.
+
+Uso:
+    python benchmarks/bench_clasificadores.py [--iteraciones 2000]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from model.predict_intent import IntentPredictor
+
+# Frases que no aparecen en intents.json, etiquetadas a mano
+FRASES_EVALUACION = [
+    ("buenas tardes", "saludo"),
+    ("hola qué tal", "saludo"),
+    ("buen día, bot", "saludo"),
+    ("hey", "saludo"),
+    ("nos vemos luego", "despedida"),
+    ("hasta pronto", "despedida"),
+    ("me voy, chao", "despedida"),
+    ("agenda una llamada con Ana el lunes a las 10", "agregar_evento"),
+    ("reserva hora en la peluquería para el sábado", "agregar_evento"),
+    ("crea un evento de cumpleaños el 3 de julio", "agregar_evento"),
+    ("programa la revisión del coche para mañana", "agregar_evento"),
+    ("añade clase de yoga el jueves a las 7pm", "agregar_evento"),
+    ("qué tengo mañana", "consultar_evento"),
+    ("muéstrame mi agenda de la semana", "consultar_evento"),
+    ("tengo algo el viernes?", "consultar_evento"),
+    ("cuáles son mis próximos eventos", "consultar_evento"),
+    ("elimina la reunión del lunes", "eliminar_evento"),
+    ("borra la cita con el dentista", "eliminar_evento"),
+    ("cancela el evento de mañana", "eliminar_evento"),
+    ("qué puedes hacer", "ayuda"),
+    ("necesito ayuda con la agenda", "ayuda"),
+    ("cómo funciona esto", "ayuda"),
+    ("muchas gracias", "agradecimiento"),
+    ("te lo agradezco", "agradecimiento"),
+    ("genial, gracias", "agradecimiento"),
+]
+
+BACKENDS = {
+    'keras (h5)': dict(engine='keras', backend='mlp'),
+    'mlp (npz)': dict(engine='npz', backend='mlp'),
+    'centroide': dict(backend='centroide'),
+    'logistico': dict(backend='logistico'),
+}
+
+
+def exactitud(predictor, frases, umbral):
+    """Fracción de aciertos; una predicción bajo el umbral cuenta como fallo"""
+    predicciones = predictor.predict_batch([f for f, _ in frases], umbral)
+    return float(np.mean([tag == esperado for (tag, _), (_, esperado) in zip(predicciones, frases)]))
+
+
+def latencias(predictor, frases, iteraciones):
+    tiempos = np.empty(iteraciones)
+    for i in range(iteraciones):
+        frase = frases[i % len(frases)][0]
+        inicio = time.perf_counter()
+        predictor.predict(frase)
+        tiempos[i] = time.perf_counter() - inicio
+    return np.percentile(tiempos, [50, 99]) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iteraciones', type=int, default=2000)
+    parser.add_argument('--umbral', type=float, default=0.7)
+    args = parser.parse_args()
+
+    with open(BASE_DIR/'data'/'intents.json', encoding='utf-8') as f:
+        patrones = [(p, i['tag']) for i in json.load(f)['intents'] for p in i['patterns']]
+
+    print(f"{'Backend':<14}{'carga':>10}{'exact. eval':>13}{'exact. patrones':>17}"
+          f"{'p50':>10}{'p99':>10}")
+    for nombre, opciones in BACKENDS.items():
+        inicio = time.perf_counter()
+        try:
+            # Sin la ruta rápida por reglas: se mide solo el clasificador
+            predictor = IntentPredictor(rules=False, **opciones)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"{nombre:<14}no disponible ({e.__class__.__name__}: {e})")
+            continue
+        carga = time.perf_counter() - inicio
+
+        predictor.predict("calentamiento")
+        p50, p99 = latencias(predictor, FRASES_EVALUACION, args.iteraciones)
+        print(f"{nombre:<14}{carga * 1000:>8.0f}ms"
+              f"{exactitud(predictor, FRASES_EVALUACION, args.umbral):>13.1%}"
+              f"{exactitud(predictor, patrones, args.umbral):>17.1%}"
+              f"{p50:>8.0f}µs{p99:>8.0f}µs")
+
+
+if __name__ == "__main__":
+    main()
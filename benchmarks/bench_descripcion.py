@@ -0,0 +1,80 @@
+"""
+Compara la extracción de descripciones original (varias pasadas de re.sub con
+patrones construidos en cada llamada) con utils.event_extraction (una pasada
+con patrones precompilados y tramos de fecha del extractor).
+
+Uso:
+    python benchmarks/bench_descripcion.py [--frases 2000] [--repeticiones 5]
+"""
+import argparse
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.corpus import frases_alta
+from utils.date_utils import DateExtractor
+from utils.event_extraction import extract_description
+
+def descripcion_original(text, date_str):
+    """Réplica de utils.date_utils.extract_event_description antes del extractor compartido"""
+    if not date_str:
+        return text.capitalize()
+    date_obj = datetime.strptime(date_str, "%d/%m/%Y %H:%M")
+    patterns = [
+        r'\b(?:el|para|a las?|el día|el|la|los|mi|una|agenda|agendar|programa)\b',
+        date_str,
+        date_obj.strftime("%d de %B").lower(),
+        date_obj.strftime("%A").lower(),
+        r'\d{1,2}(?::\d{2})?\s?(?:am|pm|de la mañana|de la tarde)?',
+        r'\b(?:próximo|próxima|siguiente)\b'
+    ]
+    clean_text = text.lower()
+    for pattern in patterns:
+        clean_text = re.sub(pattern, '', clean_text, flags=re.IGNORECASE)
+    clean_text = re.sub(r'[^\w\s]', '', clean_text)
+    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+    return clean_text.capitalize() if clean_text else "Evento sin descripción"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frases', type=int, default=2000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = frases_alta(args.frases)
+    base = datetime.now()
+    extractor = DateExtractor()
+    # La fecha se extrae antes y fuera de la medición: solo se compara la descripción
+    fechas = [extractor.extract(frase, base) for frase in corpus]
+    entradas = [(frase, f.fecha.strftime("%d/%m/%Y %H:%M") if f else None, f.spans if f else ())
+                for frase, f in zip(corpus, fechas)]
+
+    print(f"{'Frase':<60}{'original':<34}{'nueva'}")
+    for frase, date_str, spans in entradas[:8]:
+        print(f"{frase[:58]:<60}{descripcion_original(frase, date_str)[:32]:<34}"
+              f"{extract_description(frase, spans).descripcion}")
+
+    inicio = time.perf_counter()
+    for _ in range(args.repeticiones):
+        for frase, date_str, _spans in entradas:
+            descripcion_original(frase, date_str)
+    original = (time.perf_counter() - inicio) / (args.repeticiones * len(entradas))
+
+    inicio = time.perf_counter()
+    for _ in range(args.repeticiones):
+        for frase, _date_str, spans in entradas:
+            extract_description(frase, spans)
+    nueva = (time.perf_counter() - inicio) / (args.repeticiones * len(entradas))
+
+    print(f"\nPor frase ({len(entradas)} frases x {args.repeticiones} repeticiones):")
+    print(f"- original (re.sub encadenados): {original * 1e6:8.1f} µs")
+    print(f"- una pasada con tramos:         {nueva * 1e6:8.1f} µs  ({original / nueva:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
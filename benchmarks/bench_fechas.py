@@ -0,0 +1,106 @@
+"""
+Compara la extracción de fechas original (dateparser.parse en cada mensaje) con
+DateExtractor (gramática rápida + dateparser precompilado + caché LRU).
+
+Antes de medir comprueba que las frases de SIN_FECHA no producen fecha.
+
+Uso:
+    python benchmarks/bench_fechas.py [--repeticiones 50]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from model.predict_intent import TEST_PHRASES
+from utils.date_utils import DateExtractor
+
+# Mensajes sin fecha: el alta debe preguntarla en vez de guardar una fecha inventada
+SIN_FECHA = [
+    "Agenda ir a la playa",
+    "Agregar visita a Madrid",
+    "Programa una llamada a Juan",
+    "Llamar a mamá",
+]
+
+
+def comprobar_sin_fecha(extractor, base):
+    """Regresión: falla si alguna frase de SIN_FECHA produce una fecha"""
+    errores = [(frase, resultado.fecha) for frase in SIN_FECHA
+               if (resultado := extractor.extract(frase, base)) is not None]
+    if errores:
+        raise SystemExit("Fechas falsas en frases sin fecha:\n" +
+                         "\n".join(f"- {frase!r}: {fecha}" for frase, fecha in errores))
+
+
+def extraer_original(text):
+    """
+    Réplica de IntentPredictor.extract_datetime antes del extractor con caché.
+    El original pasaba 'LANGUAGE' en settings (inválido en dateparser, por lo que
+    siempre fallaba); aquí se usa el equivalente válido languages=['es'].
+    """
+    import dateparser
+    settings = {
+        'DATE_ORDER': 'DMY',
+        'PREFER_DAY_OF_MONTH': 'first',
+        'PREFER_DATES_FROM': 'future',
+        'RELATIVE_BASE': datetime.now()
+    }
+    date = dateparser.parse(text, languages=['es'], settings=settings)
+    if date:
+        if "pm" in text.lower() and date.hour < 12:
+            date = date.replace(hour=date.hour + 12)
+        elif "am" in text.lower() and date.hour == 12:
+            date = date.replace(hour=0)
+        return date.strftime("%d/%m/%Y %H:%M")
+    return None
+
+
+def cronometrar(funcion, frases, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for frase in frases:
+            funcion(frase)
+    return (time.perf_counter() - inicio) / (repeticiones * len(frases))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    frases = list(TEST_PHRASES)
+    base = datetime.now()
+    extractor = DateExtractor()
+    comprobar_sin_fecha(extractor, base)
+
+    print(f"{'Frase':<68}{'original':<20}{'extractor'}")
+    for frase in frases:
+        nuevo = extractor.extract(frase, base)
+        print(f"{frase[:66]:<68}{str(extraer_original(frase)):<20}"
+              f"{nuevo.fecha.strftime('%d/%m/%Y %H:%M') if nuevo else None}")
+
+    # Calentamiento de dateparser (carga de idiomas) fuera de las mediciones
+    extraer_original(frases[0])
+
+    original = cronometrar(extraer_original, frases, args.repeticiones)
+
+    sin_cache = DateExtractor(cache_size=0)
+    rapida = cronometrar(lambda f: sin_cache.extract(f, base), frases, args.repeticiones)
+
+    con_cache = DateExtractor()
+    cacheada = cronometrar(lambda f: con_cache.extract(f, base), frases, args.repeticiones)
+
+    print(f"\nPor mensaje ({len(frases)} frases x {args.repeticiones} repeticiones):")
+    print(f"- dateparser.parse original: {original * 1e6:10.1f} µs")
+    print(f"- extractor sin caché:       {rapida * 1e6:10.1f} µs  ({original / rapida:.0f}x)")
+    print(f"- extractor con caché:       {cacheada * 1e6:10.1f} µs  ({original / cacheada:.0f}x)")
+    print(f"\nEstadísticas sin caché: {sin_cache.stats()}")
+    print(f"Estadísticas con caché: {con_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
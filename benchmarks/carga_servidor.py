@@ -0,0 +1,83 @@
+"""
+Generador de carga para server.py: N usuarios concurrentes, cada uno con su
+conexión keep-alive, envían mensajes y se mide latencia y rendimiento.
+
+Uso:
+    python server.py &
+    python benchmarks/carga_servidor.py [--usuarios 200] [--mensajes 20] [--puerto 8080]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+MENSAJES = [
+    "Hola, cómo estás?",
+    "Qué tengo programado para el viernes?",
+    "Agenda una reunión para mañana a las 3pm",
+    "gracias",
+    "qué eventos tengo esta semana",
+    "ayuda",
+    "adiós",
+]
+
+
+async def usuario(host, puerto, indice, n_mensajes, latencias, errores):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    rnd = random.Random(indice)
+    try:
+        for _ in range(n_mensajes):
+            cuerpo = json.dumps({"sesion": f"carga-{indice}", "mensaje": rnd.choice(MENSAJES)}).encode()
+            inicio = time.perf_counter()
+            writer.write(
+                f"POST /chat HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(cuerpo)}\r\n\r\n".encode() + cuerpo
+            )
+            await writer.drain()
+
+            estado = await reader.readline()
+            longitud = 0
+            while (linea := await reader.readline()) not in (b'\r\n', b''):
+                nombre, _, valor = linea.decode('latin-1').partition(':')
+                if nombre.lower() == 'content-length':
+                    longitud = int(valor)
+            await reader.readexactly(longitud)
+            latencias.append(time.perf_counter() - inicio)
+            if b' 200 ' not in estado:
+                errores.append(estado.decode().strip())
+    finally:
+        writer.close()
+
+
+async def ejecutar(args):
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        usuario(args.host, args.puerto, i, args.mensajes, latencias, errores)
+        for i in range(args.usuarios)
+    ))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    percentil = lambda p: latencias[min(len(latencias) - 1, int(p / 100 * len(latencias)))] * 1000
+    print(f"Usuarios concurrentes: {args.usuarios}, mensajes: {len(latencias)}, errores: {len(errores)}")
+    print(f"Rendimiento: {len(latencias) / duracion:.0f} mensajes/s en {duracion:.1f} s")
+    print(f"Latencia: media {statistics.mean(latencias) * 1000:.1f} ms, p50 {percentil(50):.1f} ms, "
+          f"p95 {percentil(95):.1f} ms, p99 {percentil(99):.1f} ms")
+    if errores:
+        print(f"Primeros errores: {errores[:3]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--mensajes', type=int, default=20)
+    asyncio.run(ejecutar(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Mide el tiempo de arranque en frío (proceso nuevo) de los módulos del chatbot.
+
+Uso:
+    python benchmarks/cold_start.py [--repeticiones 5] [--engine auto|npz|numpy|keras]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+
+ESCENARIOS = {
+    'import utils.preprocessing': "import utils.preprocessing",
+    'import model.predict_intent': "import model.predict_intent",
+    'import chat': "import chat",
+    'IntentPredictor()': (
+        "from model.predict_intent import IntentPredictor\n"
+        "IntentPredictor(engine='{engine}')"
+    ),
+    'IntentPredictor() + predict': (
+        "from model.predict_intent import IntentPredictor\n"
+        "IntentPredictor(engine='{engine}').predict('Hola, cómo estás?')"
+    ),
+}
+
+
+def medir(codigo, repeticiones):
+    """Ejecuta el código en procesos nuevos y devuelve los tiempos en segundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, '-c', codigo], cwd=BASE_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--engine', default='auto')
+    args = parser.parse_args()
+
+    base = statistics.median(medir("pass", args.repeticiones))
+    print(f"Intérprete vacío: {base * 1000:.0f} ms (se resta de cada escenario)\n")
+    print(f"{'Escenario':<32}{'mediana':>10}{'mín':>10}")
+    for nombre, codigo in ESCENARIOS.items():
+        tiempos = medir(codigo.format(engine=args.engine), args.repeticiones)
+        print(f"{nombre:<32}{(statistics.median(tiempos) - base) * 1000:>8.0f}ms"
+              f"{(min(tiempos) - base) * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Generadores deterministas de corpus sintéticos para los benchmarks: frases en
+español de alta, consulta y borrado de eventos, y agendas de N eventos.
+"""
+import random
+from datetime import datetime, timedelta
+from evento import Evento
+
+VERBOS = ["Agenda", "Crea", "Programa", "Reserva", "agendar", "Quiero"]
+OBJETOS = ["una reunión con el equipo", "una cita con el dentista", "hora con el doctor",
+           "clase de yoga", "cena con Ana", "llamada con el cliente", "mi entrenamiento",
+           "una cita de spa", "la revisión del coche"]
+FECHAS = ["mañana a las 3pm", "el viernes a las 4pm", "el 31 de mayo a las 10:30",
+          "el 15 de junio", "pasado mañana a las 9 de la mañana", "el 3/11 a las 21:00",
+          "el próximo lunes a las 8am", "hoy a las 6 de la tarde"]
+
+CONSULTAS = ["Qué tengo {periodo}?", "Muéstrame mis eventos de {periodo}",
+             "¿Tengo algo {periodo}?", "Qué hay programado para {periodo}",
+             "Dime mis actividades de {periodo}"]
+PERIODOS = ["hoy", "mañana", "el viernes", "esta semana", "la próxima semana",
+            "pasado mañana", "el lunes", "el 31 de mayo"]
+
+BORRADOS = ["Borra {objeto} de {periodo}", "Elimina {objeto}", "Cancela {objeto} de {periodo}",
+            "Quita {objeto}", "Anula {objeto} de {periodo}"]
+OBJETOS_BORRADO = ["la reunión", "la cita con el dentista", "la clase de yoga",
+                   "la llamada", "el evento"]
+
+CHARLA = [("Hola", "saludo"), ("Buenas tardes", "saludo"), ("gracias", "agradecimiento"),
+          ("muchas gracias", "agradecimiento"), ("adiós", "despedida"), ("nos vemos", "despedida"),
+          ("ayuda", "ayuda"), ("qué puedes hacer", "ayuda")]
+
+
+def _alta(rnd):
+    return f"{rnd.choice(VERBOS)} {rnd.choice(OBJETOS)} para {rnd.choice(FECHAS)}"
+
+
+def _consulta(rnd):
+    return rnd.choice(CONSULTAS).format(periodo=rnd.choice(PERIODOS))
+
+
+def _borrado(rnd):
+    return rnd.choice(BORRADOS).format(objeto=rnd.choice(OBJETOS_BORRADO), periodo=rnd.choice(PERIODOS))
+
+
+def frases_alta(n, semilla=0):
+    """Frases de alta de eventos"""
+    rnd = random.Random(semilla)
+    return [_alta(rnd) for _ in range(n)]
+
+
+def frases_consulta(n, semilla=0):
+    rnd = random.Random(semilla)
+    return [_consulta(rnd) for _ in range(n)]
+
+
+def frases_borrado(n, semilla=0):
+    rnd = random.Random(semilla)
+    return [_borrado(rnd) for _ in range(n)]
+
+
+def frases_mixtas(n, semilla=0):
+    """
+    Tráfico mixto etiquetado: 40% altas, 25% consultas, 10% borrados, 25% charla
+    Returns:
+        list[tuple]: (frase, intención esperada)
+    """
+    rnd = random.Random(semilla)
+    generadores = [
+        lambda: (_alta(rnd), 'agregar_evento'),
+        lambda: (_consulta(rnd), 'consultar_evento'),
+        lambda: (_borrado(rnd), 'eliminar_evento'),
+        lambda: rnd.choice(CHARLA),
+    ]
+    return [rnd.choices(generadores, (0.40, 0.25, 0.10, 0.25))[0]() for _ in range(n)]
+
+
+def eventos_sinteticos(n, semilla=0, inicio=None, dias=365):
+    """
+    Agenda de n eventos repartidos en `dias` días desde `inicio`, a horas en punto o y media
+    Returns:
+        list[Evento]: con ids consecutivos desde 1
+    """
+    rnd = random.Random(semilla)
+    inicio = inicio or datetime(2025, 1, 1)
+    creado = inicio - timedelta(days=1)
+    minutos = dias * 24 * 2
+    return [
+        Evento(id=i, descripcion=rnd.choice(OBJETOS).capitalize(),
+               fecha=inicio + timedelta(minutes=30 * rnd.randrange(minutos)), creado_en=creado)
+        for i in range(1, n + 1)
+    ]
@@ -0,0 +1,287 @@
+"""
+Suite reproducible de rendimiento: intención, fechas, descripciones, agenda,
+importación/exportación y pipeline completo sobre corpus sintéticos deterministas.
+Funciona sin red (no descarga recursos de NLTK) y guarda los resultados en JSON
+para comparar commits.
+
+Uso:
+    python benchmarks/suite.py [--perfil rapido|completo] [--salida ruta.json]
+                               [--comparar resultados_previos.json] [--solo intencion,fechas,...]
+
+Perfiles: 'rapido' usa agendas de 1k/10k/100k eventos (~1 min); 'completo'
+añade 1M eventos y más repeticiones.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.corpus import eventos_sinteticos, frases_alta, frases_mixtas
+
+PERFILES = {
+    'rapido': {'frases': 2000, 'agendas': [1_000, 10_000, 100_000], 'altas': 500, 'importar': 10_000},
+    'completo': {'frases': 10000, 'agendas': [1_000, 10_000, 100_000, 1_000_000], 'altas': 2000,
+                 'importar': 100_000},
+}
+
+# Fecha de referencia fija: las expresiones relativas dan siempre el mismo resultado
+BASE_FECHAS = datetime(2025, 6, 2, 9, 0)
+
+
+def resultado(nombre, tiempos, unidades=None, **extra):
+    """
+    Resume tiempos por operación (segundos)
+    Args:
+        unidades (int): elementos procesados por cada tiempo (lotes); por defecto 1
+    """
+    tiempos = np.asarray(tiempos)
+    unidades = unidades or 1
+    total = tiempos.sum()
+    return {
+        'nombre': nombre,
+        'n': int(len(tiempos) * unidades),
+        'media_us': float(tiempos.mean() * 1e6),
+        'p50_us': float(np.percentile(tiempos, 50) * 1e6),
+        'p99_us': float(np.percentile(tiempos, 99) * 1e6),
+        'ops_s': float(len(tiempos) * unidades / total) if total else float('inf'),
+        **extra,
+    }
+
+
+def cronometrar(funcion, entradas):
+    """Tiempo de cada llamada funcion(entrada)"""
+    tiempos = np.empty(len(entradas))
+    reloj = time.perf_counter
+    for i, entrada in enumerate(entradas):
+        inicio = reloj()
+        funcion(entrada)
+        tiempos[i] = reloj() - inicio
+    return tiempos
+
+
+def bench_intencion(config):
+    from model.predict_intent import IntentPredictor
+
+    frases = [f for f, _ in frases_mixtas(config['frases'], semilla=1)]
+    resultados = []
+    for reglas in (False, True):
+        predictor = IntentPredictor(rules=reglas)
+        predictor.predict("calentamiento")
+        sufijo = 'con_reglas' if reglas else 'sin_reglas'
+        resultados.append(resultado(f'intencion.predict.{sufijo}', cronometrar(predictor.predict, frases)))
+        lotes = [frases[i:i + 64] for i in range(0, len(frases) - 63, 64)]
+        resultados.append(resultado(f'intencion.predict_batch64.{sufijo}',
+                                    cronometrar(predictor.predict_batch, lotes), unidades=64))
+    return resultados
+
+
+def bench_fechas(config):
+    from utils.date_utils import DateExtractor, extract_datetime, get_date_extractor
+
+    frases = [f for f, _ in frases_mixtas(config['frases'], semilla=2)]
+    resultados = []
+
+    # Sin caché: cada frase se analiza de verdad (gramática rápida o dateparser)
+    extractor = DateExtractor(cache_size=0)
+    extractor.extract("mañana a las 3pm", BASE_FECHAS)
+    resultados.append(resultado('fechas.extract.sin_cache',
+                                cronometrar(lambda f: extractor.extract(f, BASE_FECHAS), frases),
+                                rutas=extractor.stats()))
+
+    # API pública con la caché compartida caliente (tráfico repetitivo)
+    get_date_extractor().clear_cache()
+    for frase in frases:
+        extract_datetime(frase, BASE_FECHAS)
+    resultados.append(resultado('fechas.extract_datetime.cache_caliente',
+                                cronometrar(lambda f: extract_datetime(f, BASE_FECHAS), frases)))
+    return resultados
+
+
+def bench_descripciones(config):
+    from utils.date_utils import extract_datetime, extract_event_description
+    from utils.event_extraction import extract_event_details
+
+    frases = frases_alta(config['frases'], semilla=3)
+    # Como tras un extract_datetime con la misma base: la fecha de cada frase ya está en la
+    # caché del extractor, así que se mide la descripción más un acierto de caché
+    for frase in frases:
+        extract_datetime(frase, BASE_FECHAS)
+    return [
+        resultado('descripcion.extract_event_description',
+                  cronometrar(lambda f: extract_event_description(f, base=BASE_FECHAS), frases)),
+        resultado('descripcion.extract_event_details',
+                  cronometrar(lambda f: extract_event_details(f, BASE_FECHAS), frases)),
+    ]
+
+
+def bench_agenda(config, directorio):
+    from agenda_manager import AgendaManager
+    from agenda_store import SQLiteAgendaStore
+
+    resultados = []
+    for n in config['agendas']:
+        ruta = Path(directorio) / f'agenda_{n}.db'
+        inicio = time.perf_counter()
+        store = SQLiteAgendaStore(ruta)
+        store.guardar(eventos_sinteticos(n))
+        store.cerrar()
+        preparacion = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        agenda = AgendaManager(str(ruta))
+        carga = time.perf_counter() - inicio
+        resultados.append(resultado(f'agenda.cargar.{n}', [carga], eventos=n,
+                                    preparacion_s=preparacion))
+
+        semana = [BASE_FECHAS.replace(month=1 + i % 12) for i in range(200)]
+        resultados.append(resultado(f'agenda.eventos_de_la_semana.{n}',
+                                    cronometrar(agenda.eventos_de_la_semana, semana), eventos=n))
+
+        resultados.append(resultado(f'agenda.conflictos.{n}',
+                                    cronometrar(lambda f: agenda.conflictos(f, 90), semana), eventos=n))
+        resultados.append(resultado(f'agenda.siguiente_hueco.{n}',
+                                    cronometrar(lambda f: agenda.siguiente_hueco(120, desde=f), semana),
+                                    eventos=n))
+
+        fechas = [e.fecha for e in eventos_sinteticos(config['altas'], semilla=n)]
+        resultados.append(resultado(f'agenda.agregar_evento.{n}',
+                                    cronometrar(lambda f: agenda.agregar_evento("Benchmark", f), fechas),
+                                    eventos=n))
+        agenda.store.cerrar()
+        del agenda
+    return resultados
+
+
+def bench_importacion(config, directorio):
+    from agenda_io import exportar, importar
+    from agenda_manager import AgendaManager
+
+    n = config['importar']
+    origen = AgendaManager(str(Path(directorio) / 'origen.db'))
+    origen.agregar_eventos(eventos_sinteticos(n), omitir_duplicados=False)
+    resultados = []
+    for formato in ('ics', 'csv'):
+        archivo = Path(directorio) / f'agenda.{formato}'
+        inicio = time.perf_counter()
+        exportar(origen, archivo)
+        resultados.append(resultado(f'io.exportar.{formato}', [time.perf_counter() - inicio], unidades=n))
+
+        destino = AgendaManager(str(Path(directorio) / f'importada_{formato}.db'))
+        inicio = time.perf_counter()
+        importar(destino, archivo)
+        resultados.append(resultado(f'io.importar.{formato}', [time.perf_counter() - inicio], unidades=n))
+        # Segunda importación: todo son duplicados
+        inicio = time.perf_counter()
+        importar(destino, archivo)
+        resultados.append(resultado(f'io.reimportar.{formato}', [time.perf_counter() - inicio], unidades=n))
+        destino.cerrar()
+    origen.cerrar()
+    return resultados
+
+
+def bench_extremo_a_extremo(config, directorio):
+    from agenda_manager import AgendaManager
+    from model.predict_intent import IntentPredictor
+    from pipeline import MessagePipeline, Sesion
+
+    # Agenda temporal: nunca se toca data/agenda.db
+    pipeline = MessagePipeline(IntentPredictor(), AgendaManager(str(Path(directorio) / 'e2e.db')))
+    frases = [f for f, _ in frases_mixtas(config['frases'], semilla=4)]
+    sesion = Sesion(id='benchmark')
+
+    def procesar(frase):
+        sesion.evento_pendiente = None
+        pipeline.procesar(frase, sesion)
+
+    procesar("calentamiento")
+    return [resultado('e2e.procesar_mensaje', cronometrar(procesar, frases))]
+
+
+GRUPOS = {
+    'intencion': bench_intencion,
+    'fechas': bench_fechas,
+    'descripciones': bench_descripciones,
+    'agenda': bench_agenda,
+    'io': bench_importacion,
+    'e2e': bench_extremo_a_extremo,
+}
+
+
+def metadatos(perfil):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'perfil': perfil,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpu': platform.processor() or platform.machine(),
+    }
+
+
+def comparar(actual, previo):
+    anteriores = {r['nombre']: r for r in previo['resultados']}
+    print(f"\nComparación con {previo['meta'].get('commit')} ({previo['meta'].get('fecha')}):")
+    print(f"{'Caso':<48}{'p50 antes':>12}{'p50 ahora':>12}{'cambio':>10}")
+    for r in actual['resultados']:
+        antes = anteriores.get(r['nombre'])
+        if antes and antes['p50_us']:
+            print(f"{r['nombre']:<48}{antes['p50_us']:>10.1f}µs{r['p50_us']:>10.1f}µs"
+                  f"{r['p50_us'] / antes['p50_us']:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--perfil', choices=PERFILES, default='rapido')
+    parser.add_argument('--solo', default=','.join(GRUPOS),
+                        help=f"grupos separados por comas ({', '.join(GRUPOS)})")
+    parser.add_argument('--salida', help="JSON de resultados (por defecto benchmarks/resultados/<commit>.json)")
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    # Las métricas por etapa añadirían ruido a las mediciones
+    os.environ.pop('CHATBOT_METRICS', None)
+    config = PERFILES[args.perfil]
+    salida = {'meta': metadatos(args.perfil), 'config': config, 'resultados': []}
+
+    print(f"{'Caso':<48}{'n':>9}{'media':>11}{'p50':>11}{'p99':>11}{'ops/s':>12}")
+    with tempfile.TemporaryDirectory(prefix='chatbot_bench_') as directorio:
+        for grupo in args.solo.split(','):
+            grupo = grupo.strip()
+            funcion = GRUPOS[grupo]
+            argumentos = (config, directorio) if grupo in ('agenda', 'io', 'e2e') else (config,)
+            for r in funcion(*argumentos):
+                salida['resultados'].append(r)
+                print(f"{r['nombre']:<48}{r['n']:>9}{r['media_us']:>9.1f}µs{r['p50_us']:>9.1f}µs"
+                      f"{r['p99_us']:>9.1f}µs{r['ops_s']:>12.0f}")
+
+    ruta = Path(args.salida) if args.salida else (
+        BASE_DIR / 'benchmarks' / 'resultados' / f"{salida['meta']['commit'] or 'local'}_{args.perfil}.json")
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {ruta}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            comparar(salida, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,36 @@
 import random
-import json
-import pickle
-import numpy as np
-import tensorflow as tf
-from utils.preprocessing import tokenize, stem, bag_of_words
+from model.predict_intent import IntentPredictor
+from pipeline import NO_ENTENDI
+
+# Confianza mínima del modelo; estricta (> y no >=) como en las versiones anteriores del chatbot
+UMBRAL = 0.7
 
 class ChatbotAgenda:
-    def __init__(self):
-        # Cargar modelo y recursos
-        self.model = tf.keras.models.load_model('./model/modelo_chatbot.h5')
-        with open('./model/palabras.pkl', 'rb') as f:
-            self.palabras = pickle.load(f)
-        with open('./model/tags.pkl', 'rb') as f:
-            self.tags = pickle.load(f)
-        with open('./data/intents.json', 'r', encoding='utf-8') as f:
-            self.intents = json.load(f)
+    """
+    Chatbot de respuestas estándar (sin agenda). El backend, las reglas y la
+    recarga en caliente de versiones son los de IntentPredictor.
+    """
+
+    def __init__(self, vigilar_modelo=False, backend=None, reglas=True):
+        self.predictor = IntentPredictor(watch=vigilar_modelo, backend=backend, rules=reglas)
 
     def predecir_intencion(self, mensaje):
-        tokens = tokenize(mensaje)
-        X = bag_of_words(tokens, self.palabras)
-        X = np.array([X])
-        
-        prediccion = self.model.predict(X)[0]
-        intencion_idx = np.argmax(prediccion)
-        intencion = self.tags[intencion_idx]
-        confianza = prediccion[intencion_idx]
-        
-        return intencion if confianza > 0.7 else None
+        return self.predecir_intenciones([mensaje])[0]
 
-    def generar_respuesta(self, mensaje):
-        intencion = self.predecir_intencion(mensaje)
-        
-        if not intencion:
-            return "No entendí bien. ¿Puedes reformularlo?"
+    def predecir_intenciones(self, mensajes):
+        """Predice la intención de varios mensajes con una única pasada del modelo"""
+        resultados = self.predictor.predict_batch(mensajes, confidence_threshold=0.0)
+        return [intencion if confianza > UMBRAL else None for intencion, confianza in resultados]
+
+    def generar_respuesta(self, mensaje, intencion=None):
+        """Respuesta estándar; acepta la intención ya predicha para no volver a clasificar"""
+        if intencion is None:
+            intencion = self.predecir_intencion(mensaje)
         
-        # Respuestas estándar
-        for intent in self.intents['intents']:
-            if intent['tag'] == intencion:
-                return random.choice(intent['responses'])
+        respuestas = self.predictor.responses.get(intencion)
+        if not respuestas:
+            return NO_ENTENDI
+        return random.choice(respuestas)
 
 if __name__ == "__main__":
     bot = ChatbotAgenda()
@@ -47,4 +40,4 @@ if __name__ == "__main__":
         mensaje = input("Tú: ")
         if mensaje.lower() == 'salir':
             break
-        print("Bot:", bot.generar_respuesta(mensaje))
\ No newline at end of file
+        print("Bot:", bot.generar_respuesta(mensaje))
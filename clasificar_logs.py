@@ -0,0 +1,212 @@
+"""
+Clasificación offline de registros de mensajes en JSON Lines.
+
+El archivo de entrada se lee en bloques de líneas (nunca entero) que se reparten
+entre procesos; cada proceso carga el modelo una sola vez y clasifica su bloque
+en una pasada. Los resultados se escriben en el mismo orden que la entrada, con
+la intención, la confianza, la ruta que la resolvió y los detalles de evento.
+
+Cada línea de entrada es un objeto JSON con el mensaje en --campo (o una cadena JSON).
+
+Uso:
+    python clasificar_logs.py registros.jsonl resultados.jsonl [--procesos 8] [--lote 2000]
+    python clasificar_logs.py requests.jsonl - --campo body --conservar request_id
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+LOTE_POR_DEFECTO = 2000
+# Segundos entre informes de progreso (stderr)
+INTERVALO_PROGRESO = 5.0
+
+# Estado de cada proceso: predictor y opciones, fijados una vez en el inicializador
+_worker = {}
+
+
+def _iniciar_worker(campo, conservar, campo_fecha, umbral, backend, precision):
+    from model.predict_intent import IntentPredictor
+    from utils.date_utils import get_date_extractor
+
+    _worker.update(
+        predictor=IntentPredictor(backend=backend, precision=precision),
+        campo=campo, conservar=conservar, campo_fecha=campo_fecha, umbral=umbral,
+    )
+    # El extractor de fechas también se construye antes del primer bloque
+    get_date_extractor()
+
+
+def _fecha_base(datos, campo_fecha):
+    """Fecha del registro para interpretar 'mañana', 'el lunes'... como cuando se envió"""
+    if not campo_fecha or not isinstance(datos, dict):
+        return None
+    try:
+        return datetime.fromisoformat(datos[campo_fecha])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def procesar_bloque(primera, lineas):
+    """
+    Clasifica un bloque de líneas (en un proceso del pool)
+    Args:
+        primera (int): Número de línea de la primera del bloque (desde 1)
+        lineas (list[str]): Líneas JSON sin decodificar
+    Returns:
+        tuple: (líneas de salida ya serializadas, Counter de intenciones, errores)
+    """
+    from utils.event_extraction import extract_event_details
+
+    campo, conservar, umbral = _worker['campo'], _worker['conservar'], _worker['umbral']
+    registros = []
+    validos = []
+    errores = 0
+    for numero, linea in enumerate(lineas, primera):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+            mensaje = datos if isinstance(datos, str) else datos[campo]
+            if not isinstance(mensaje, str):
+                raise TypeError(f"'{campo}' no es una cadena")
+        except (ValueError, KeyError, TypeError) as e:
+            errores += 1
+            registros.append({'linea': numero, 'error': f"{type(e).__name__}: {e}"})
+            continue
+        registro = {'linea': numero}
+        if isinstance(datos, dict):
+            registro.update((clave, datos[clave]) for clave in conservar if clave in datos)
+        registro['mensaje'] = mensaje
+        registros.append(registro)
+        validos.append((registro, mensaje, _fecha_base(datos, _worker['campo_fecha'])))
+
+    # Una sola pasada del modelo por bloque
+    clasificaciones = _worker['predictor'].classify_batch([m for _, m, _ in validos],
+                                                          confidence_threshold=umbral)
+    intenciones = Counter()
+    for (registro, mensaje, base), (intencion, confianza, ruta) in zip(validos, clasificaciones):
+        detalles = extract_event_details(mensaje, base)
+        intenciones[intencion] += 1
+        registro.update(
+            intencion=intencion,
+            confianza=round(float(confianza), 4),
+            ruta=ruta,
+            fecha=detalles.fecha.isoformat(timespec='minutes') if detalles.fecha else None,
+            descripcion=detalles.descripcion,
+            duracion=detalles.duracion,
+            regla=detalles.regla,
+        )
+    salida = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in registros)
+    return salida, intenciones, errores
+
+
+def leer_bloques(archivo, tamano=LOTE_POR_DEFECTO):
+    """
+    Bloques consecutivos de líneas del archivo
+    Yields:
+        tuple: (número de la primera línea, list[str])
+    """
+    numero = 1
+    while True:
+        lineas = list(itertools.islice(archivo, tamano))
+        if not lineas:
+            return
+        yield numero, lineas
+        numero += len(lineas)
+
+
+def clasificar(entrada, salida, campo='mensaje', conservar=(), campo_fecha=None, umbral=0.7,
+               backend=None, precision=None, procesos=None, lote=LOTE_POR_DEFECTO, progreso=None):
+    """
+    Clasifica un archivo JSON Lines completo en paralelo manteniendo el orden
+    Args:
+        entrada, salida: Archivos de texto ya abiertos
+        procesos (int): Procesos del pool (por defecto, uno por núcleo)
+        progreso (callable): f(estadisticas) llamada cada INTERVALO_PROGRESO segundos
+    Returns:
+        dict: lineas, mensajes, errores, segundos, mensajes_por_segundo e intenciones
+    """
+    procesos = procesos or os.cpu_count()
+    stats = {'lineas': 0, 'mensajes': 0, 'errores': 0, 'intenciones': Counter()}
+    inicio = ultimo_informe = time.perf_counter()
+
+    def escribir(futuro):
+        nonlocal ultimo_informe
+        texto, intenciones, errores = futuro.result()
+        salida.write(texto)
+        stats['mensajes'] += sum(intenciones.values())
+        stats['errores'] += errores
+        stats['intenciones'].update(intenciones)
+        ahora = time.perf_counter()
+        if progreso is not None and ahora - ultimo_informe >= INTERVALO_PROGRESO:
+            ultimo_informe = ahora
+            progreso(_resumen(stats, ahora - inicio))
+
+    with ProcessPoolExecutor(procesos, initializer=_iniciar_worker,
+                             initargs=(campo, tuple(conservar), campo_fecha, umbral, backend, precision)) as pool:
+        # Ventana acotada de bloques en vuelo: la memoria no depende del tamaño del archivo
+        pendientes = deque()
+        for primera, lineas in leer_bloques(entrada, lote):
+            stats['lineas'] += len(lineas)
+            pendientes.append(pool.submit(procesar_bloque, primera, lineas))
+            if len(pendientes) >= 2 * procesos:
+                escribir(pendientes.popleft())
+        while pendientes:
+            escribir(pendientes.popleft())
+    return _resumen(stats, time.perf_counter() - inicio)
+
+
+def _resumen(stats, segundos):
+    return dict(stats, segundos=segundos,
+                mensajes_por_segundo=stats['mensajes'] / segundos if segundos else 0.0)
+
+
+def _imprimir_progreso(stats):
+    print(f"... {stats['mensajes']} mensajes en {stats['segundos']:.1f} s "
+          f"({stats['mensajes_por_segundo']:.0f} mensajes/s)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clasifica registros de mensajes en JSON Lines",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument('entrada', help="archivo .jsonl ('-' para la entrada estándar)")
+    parser.add_argument('salida', help="archivo .jsonl de resultados ('-' para la salida estándar)")
+    parser.add_argument('--campo', default='mensaje', help="campo con el texto del mensaje")
+    parser.add_argument('--conservar', default='',
+                        help="campos de la entrada que se copian a la salida, separados por comas")
+    parser.add_argument('--campo-fecha',
+                        help="campo con la fecha ISO del mensaje (base de las fechas relativas)")
+    parser.add_argument('--umbral', type=float, default=0.7)
+    parser.add_argument('--backend', help="'mlp', 'centroide' o 'logistico' (CHATBOT_BACKEND)")
+    parser.add_argument('--precision', help="pesos de la red: float32, float16 o int8 (CHATBOT_PRECISION)")
+    parser.add_argument('--procesos', type=int, default=None, help="por defecto, uno por núcleo")
+    parser.add_argument('--lote', type=int, default=LOTE_POR_DEFECTO, help="líneas por bloque")
+    args = parser.parse_args(argv)
+
+    conservar = [c for c in args.conservar.split(',') if c]
+    entrada = sys.stdin if args.entrada == '-' else open(args.entrada, encoding='utf-8')
+    salida = sys.stdout if args.salida == '-' else open(args.salida, 'w', encoding='utf-8')
+    try:
+        stats = clasificar(entrada, salida, args.campo, conservar, args.campo_fecha, args.umbral,
+                           args.backend, args.precision, args.procesos, args.lote,
+                           progreso=_imprimir_progreso)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+
+    print(f"Clasificados {stats['mensajes']} mensajes ({stats['errores']} líneas con error) "
+          f"en {stats['segundos']:.2f} s: {stats['mensajes_por_segundo']:.0f} mensajes/s", file=sys.stderr)
+    for intencion, n in stats['intenciones'].most_common():
+        print(f"- {intencion or 'sin clasificar'}: {n}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from functools import lru_cache
+from dateutil.rrule import rrulestr
+
+FORMATO_FECHA = "%d/%m/%Y %H:%M"
+# Formatos encontrados en agendas antiguas (algunas sin año)
+FORMATOS_LEGADOS = (FORMATO_FECHA, "%d/%m %H:%M", "%d/%m/%Y", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M")
+# Duración (minutos) de los eventos que no la indican, incluidos los de agendas antiguas
+DURACION_POR_DEFECTO = int(os.environ.get('CHATBOT_DURACION_MIN', '60'))
+
+
+@dataclass(slots=True)
+class Evento:
+    """Evento de la agenda con la fecha ya interpretada (sin diccionarios de cadenas)"""
+    id: int
+    descripcion: str
+    fecha: datetime
+    creado_en: datetime | None = None
+    # Minutos
+    duracion: int = DURACION_POR_DEFECTO
+    # Regla RRULE ("FREQ=WEEKLY;BYDAY=MO") si el evento se repite; fecha es la primera ocurrencia
+    regla: str | None = None
+
+    @property
+    def fecha_str(self):
+        return self.fecha.strftime(FORMATO_FECHA)
+
+    @property
+    def fin(self):
+        return self.fecha + timedelta(minutes=self.duracion)
+
+    def ocurrencias(self, desde, hasta=None):
+        """
+        Ocurrencias con inicio en [desde, hasta), generadas bajo demanda: una serie
+        sin fin se recorre solo hasta donde llegue el consumidor
+        Yields:
+            Evento: el propio evento o una copia con la fecha de la ocurrencia
+        """
+        if self.regla is None:
+            fechas = (self.fecha,) if self.fecha >= desde else ()
+        else:
+            fechas = regla_recurrencia(self.regla, self.fecha).xafter(desde, inc=True)
+        for fecha in fechas:
+            if hasta is not None and fecha >= hasta:
+                return
+            yield self if fecha == self.fecha else replace(self, fecha=fecha)
+
+    def to_dict(self):
+        """Representación JSON con el formato histórico de agenda.json"""
+        datos = {"id": self.id, "descripcion": self.descripcion, "fecha": self.fecha_str}
+        if self.creado_en is not None:
+            datos["creado_en"] = self.creado_en.isoformat()
+        if self.duracion != DURACION_POR_DEFECTO:
+            datos["duracion"] = self.duracion
+        if self.regla is not None:
+            datos["regla"] = self.regla
+        return datos
+
+    @classmethod
+    def from_dict(cls, datos, evento_id=None):
+        """
+        Normaliza una entrada (posiblemente antigua) de agenda.json
+        Args:
+            datos (dict): Entrada con 'descripcion'/'descripción', 'fecha' y opcionalmente 'id',
+                          'creado_en', 'duracion' y 'regla'
+            evento_id (int): Id a usar si la entrada no trae uno
+        Returns:
+            Evento o None si la fecha no se puede interpretar
+        """
+        creado_en = _parsear_iso(datos.get("creado_en"))
+        fecha = parsear_fecha(datos.get("fecha"), referencia=creado_en)
+        if fecha is None:
+            return None
+        descripcion = datos.get("descripcion", datos.get("descripción", "")) or "Evento sin descripción"
+        return cls(
+            id=datos.get("id", evento_id),
+            descripcion=descripcion,
+            fecha=fecha,
+            creado_en=creado_en,
+            duracion=int(datos.get("duracion") or DURACION_POR_DEFECTO),
+            regla=datos.get("regla"),
+        )
+
+
+@lru_cache(maxsize=1024)
+def regla_recurrencia(regla, inicio):
+    """
+    Interpreta una regla RRULE a partir de `inicio` (analizada una vez por serie)
+    Raises:
+        ValueError: si la regla no es válida
+    """
+    return rrulestr(regla, dtstart=inicio)
+
+
+def primera_ocurrencia(regla, inicio):
+    """Primera fecha de la serie en o después de `inicio` (None si la regla no genera ninguna)"""
+    return regla_recurrencia(regla, inicio).after(inicio, inc=True)
+
+
+def parsear_fecha(fecha, referencia=None):
+    """
+    Convierte una fecha de agenda en datetime
+    Args:
+        fecha (str | datetime): 'dd/mm/aaaa HH:MM' o variantes antiguas
+        referencia (datetime): De ella se toma el año cuando la fecha no lo incluye
+    Returns:
+        datetime o None si no se reconoce
+    """
+    if isinstance(fecha, datetime):
+        return fecha
+    for formato in FORMATOS_LEGADOS:
+        try:
+            fecha_obj = datetime.strptime(fecha, formato)
+        except (TypeError, ValueError):
+            continue
+        if '%Y' not in formato:
+            fecha_obj = fecha_obj.replace(year=(referencia or datetime.now()).year)
+        return fecha_obj
+    return None
+
+
+def _parsear_iso(valor):
+    try:
+        return datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        return None
@@ -1,27 +1,105 @@
 import sys
 from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
+BASE_DIR = Path(__file__).parent.parent
+sys.path.append(str(BASE_DIR))
 
 import tkinter as tk
 from tkinter import scrolledtext, ttk, messagebox
-import json
 import os
-import random
-from datetime import datetime
-from utils.date_utils import extract_datetime, extract_event_description
-import re
+import queue
+import threading
+import time
+from agenda_manager import AgendaManager
+from agendas import ruta_agenda
+from pipeline import MessagePipeline, ContextoMensaje, Sesion
+from recordatorios import PlanificadorRecordatorios, texto_recordatorio
+
+# Cada cuánto se revisa la cola de resultados y cuánto tiempo por tick se dedica a aplicarlos
+POLL_MS = 15
+PRESUPUESTO_UI_S = 0.008
+# Filas del Treeview insertadas por tick al cargar agendas grandes
+LOTE_FILAS = 300
 
 class ChatbotGUI:
-    def __init__(self, root):
+    def __init__(self, root, usuario=None):
         self.root = root
+        self.predictor = None
+        self.agenda = None
+        self.pipeline = None
+        self.recordatorios = None
+        # Con usuario se abre su agenda en data/usuarios/; sin él, la agenda única
+        self.sesion = Sesion(id="gui", usuario=usuario)
+        # Inferencia, fechas y E/S de la agenda corren en un hilo de trabajo;
+        # los cambios de interfaz vuelven al hilo de Tk a través de acciones_ui
+        self.tareas = queue.Queue()
+        self.acciones_ui = queue.Queue()
+        self._carga_actual = 0
         self.setup_ui()
+        threading.Thread(target=self._worker, name='chatbot-worker', daemon=True).start()
+        self.en_segundo_plano(self._inicializar)
+        self.root.after(POLL_MS, self._procesar_acciones_ui)
+
+    def _inicializar(self):
+        """Carga modelo y agenda en el hilo de trabajo"""
         try:
             from model.predict_intent import IntentPredictor
-            self.predictor = IntentPredictor()
-            self.load_agenda()
+            self.predictor = IntentPredictor(watch=True)
+            if self.sesion.usuario:
+                ruta = ruta_agenda(self.sesion.usuario)
+                ruta.parent.mkdir(parents=True, exist_ok=True)
+                self.agenda = AgendaManager(str(ruta))
+            else:
+                self.agenda = AgendaManager(os.path.join(BASE_DIR, 'data', 'agenda.json'))
+            self.pipeline = MessagePipeline(self.predictor, self.agenda)
+            # Los avisos llegan desde el hilo del planificador y se muestran en el de Tk
+            self.recordatorios = PlanificadorRecordatorios(
+                lambda recordatorio: self.en_ui(self.display_message,
+                                                f"Bot: {texto_recordatorio(recordatorio)}", 'bot'))
+            self.recordatorios.vigilar(self.agenda, self.sesion.usuario or self.sesion.id)
+            self.recordatorios.iniciar()
+            eventos = list(self.agenda)
         except Exception as e:
-            messagebox.showerror("Error", f"No se pudo iniciar el chatbot:\n{str(e)}")
-            self.root.destroy()
+            self.en_ui(self._error_inicio, e)
+            return
+        self.en_ui(self.load_agenda, eventos)
+
+    def _error_inicio(self, e):
+        messagebox.showerror("Error", f"No se pudo iniciar el chatbot:\n{str(e)}")
+        self.root.destroy()
+
+    def en_segundo_plano(self, funcion, *args):
+        """Encola trabajo para el hilo de trabajo (se ejecuta en orden de llegada)"""
+        self.tareas.put((funcion, args))
+
+    def en_ui(self, funcion, *args):
+        """Encola una actualización de la interfaz para el hilo de Tk"""
+        self.acciones_ui.put((funcion, args))
+
+    def notify(self, message, sender):
+        """display_message seguro desde el hilo de trabajo"""
+        self.en_ui(self.display_message, message, sender)
+
+    def _worker(self):
+        while True:
+            funcion, args = self.tareas.get()
+            try:
+                funcion(*args)
+            except Exception as e:
+                self.notify(f"Bot: Error procesando tu mensaje - {str(e)}", 'error')
+
+    def _procesar_acciones_ui(self):
+        """Aplica resultados pendientes sin exceder el presupuesto de un frame"""
+        inicio = time.perf_counter()
+        try:
+            while time.perf_counter() - inicio < PRESUPUESTO_UI_S:
+                funcion, args = self.acciones_ui.get_nowait()
+                funcion(*args)
+        except queue.Empty:
+            pass
+        try:
+            self.root.after(POLL_MS, self._procesar_acciones_ui)
+        except tk.TclError:
+            pass  # ventana destruida
 
     def setup_ui(self):
         self.root.title("Chatbot de Agenda Inteligente")
@@ -91,67 +169,39 @@ class ChatbotGUI:
             
         self.display_message(f"Tú: {user_text}", 'user')
         self.user_input.delete(0, tk.END)
-        
-        try:
-            intent, confidence = self.predictor.predict(user_text)
-            
-            if intent == "agregar_evento":
-                self.handle_add_event(user_text)
-            elif intent == "consultar_evento":
-                self.handle_consult_events()
-            elif intent == "eliminar_evento":
-                self.handle_delete_event(user_text)
-            else:
-                response = self.predictor.get_response(intent)
-                self.display_message(f"Bot: {response}", 'bot')
-                
-        except Exception as e:
-            self.display_message(f"Bot: Error procesando tu mensaje - {str(e)}", 'error')
+        # La selección se lee aquí: el Treeview solo se toca desde el hilo de Tk
+        self.en_segundo_plano(self._procesar_mensaje, user_text, self.agenda_tree.selection())
 
-    def handle_add_event(self, user_text):
-        """Maneja la adición automática de eventos"""
+    def _procesar_mensaje(self, user_text, selected=()):
+        """Procesa el mensaje con el pipeline en una sola pasada (hilo de trabajo)"""
         try:
-        # Extraer fecha y descripción
-            date_str = extract_datetime(user_text)
-            desc = extract_event_description(user_text, date_str) if date_str else None
-        
-            if not date_str:
-                self.display_message("Bot: No pude entender la fecha. Por favor usa formato: '25 de mayo a las 3pm'", 'bot')
+            contexto = ContextoMensaje(user_text, self.sesion)
+            self.pipeline.clasificar([contexto])
+            # Con eventos seleccionados en el Treeview se eliminan esos; si no, el pipeline busca por el texto
+            if contexto.intencion == "eliminar_evento" and selected:
+                self.handle_delete_event(user_text, selected)
                 return
-        
-        # Limpieza de la descripción
-            desc = re.sub(r'\b(?:agenda|agendar|programa|crea|reserva)\b', '', desc or '', flags=re.IGNORECASE)
-            desc = re.sub(r'\s+', ' ', desc).strip()
-            desc = desc.capitalize() or "Evento sin descripción"
-        
-        # Agregar a la agenda
-            self.add_event(desc, date_str)
-            response = random.choice([
-                f"Evento agregado: {desc} el {date_str}",
-                f"Agendado: {desc} para {date_str}",
-                f"Listo: {desc} - {date_str}"
-            ])
-            self.display_message(f"Bot: {response}", 'bot')
-        
+            
+            self.pipeline.completar(contexto)
+            if contexto.evento is not None:
+                if contexto.intencion == "eliminar_evento":
+                    self.en_ui(self._eliminar_filas, [str(contexto.evento.id)])
+                else:
+                    self.en_ui(self._insertar_filas, [contexto.evento])
+            self.notify(f"Bot: {contexto.respuesta}", 'bot')
+                
         except Exception as e:
-            self.display_message(f"Bot: Error al procesar - {str(e)}", 'error')
-
-    def handle_consult_events(self):
-        """Muestra los eventos agendados"""
-        if not self.agenda_tree.get_children():
-            self.display_message("Bot: No tienes eventos agendados aún.", 'bot')
-        else:
-            self.display_message("Bot: Estos son tus eventos:", 'bot')
+            self.notify(f"Bot: Error procesando tu mensaje - {str(e)}", 'error')
 
-    def handle_delete_event(self, user_text):
-        """Maneja la eliminación de eventos"""
-        selected = self.agenda_tree.selection()
+    def handle_delete_event(self, user_text, selected=()):
+        """Maneja la eliminación de eventos seleccionados en la lista"""
         if selected:
-            self.agenda_tree.delete(selected)
-            self.save_agenda()
-            self.display_message("Bot: Evento eliminado correctamente", 'bot')
+            for item in selected:
+                self.agenda.eliminar_evento(int(item))
+            self.en_ui(self._eliminar_filas, selected)
+            self.notify("Bot: Evento eliminado correctamente", 'bot')
         else:
-            self.display_message("Bot: Selecciona un evento de la lista para eliminar", 'bot')
+            self.notify("Bot: Selecciona un evento de la lista para eliminar", 'bot')
 
     def show_event_dialog(self, user_text=""):
         """Muestra diálogo para confirmar/editar eventos"""
@@ -171,73 +221,48 @@ class ChatbotGUI:
             desc = desc_entry.get()
             date = date_entry.get()
             if desc and date:
-                self.add_event(desc, date)
+                self.en_segundo_plano(self.add_event, desc, date)
                 self.display_message(f"Bot: Confirmado: {desc} - {date}", 'bot')
             dialog.destroy()
         
         tk.Button(dialog, text="Guardar", command=save_and_close).pack(pady=5)
 
     def add_event(self, description, date_str):
-        """Añade evento a la agenda"""
+        """Añade evento a la agenda (hilo de trabajo) y solo su fila al Treeview"""
         try:
-            agenda_file = os.path.join(BASE_DIR, 'data', 'agenda.json')
-            
-            if os.path.exists(agenda_file):
-                with open(agenda_file, 'r', encoding='utf-8') as f:
-                    agenda = json.load(f)
-            else:
-                agenda = {"eventos": []}
-            
-            agenda["eventos"].append({
-                "descripcion": description,
-                "fecha": date_str,
-                "creado_en": datetime.now().isoformat()
-            })
-            
-            with open(agenda_file, 'w', encoding='utf-8') as f:
-                json.dump(agenda, f, indent=2, ensure_ascii=False)
-            
-            self.load_agenda()
+            evento = self.agenda.agregar_evento(description, date_str)
+            self.en_ui(self._insertar_filas, [evento])
+            return evento
             
         except Exception as e:
-            self.display_message(f"Bot: Error al guardar - {str(e)}", 'error')
+            self.notify(f"Bot: Error al guardar - {str(e)}", 'error')
 
-    def load_agenda(self):
-        """Carga los eventos en el Treeview"""
+    def load_agenda(self, eventos):
+        """Carga los eventos en el Treeview por lotes para no bloquear la ventana"""
         self.agenda_tree.delete(*self.agenda_tree.get_children())
-        
-        try:
-            agenda_file = os.path.join(BASE_DIR, 'data', 'agenda.json')
-            if os.path.exists(agenda_file):
-                with open(agenda_file, 'r', encoding='utf-8') as f:
-                    agenda = json.load(f)
-                
-                for evento in agenda.get("eventos", []):
-                    self.agenda_tree.insert('', 'end', values=(
-                        evento.get("fecha", "Sin fecha"),
-                        evento.get("descripcion", "Sin descripción")
-                    ))
-        except Exception as e:
-            print(f"Error cargando agenda: {str(e)}")
+        self._carga_actual += 1
+        self._cargar_lote(eventos, 0, self._carga_actual)
 
-    def save_agenda(self):
-        """Guarda los cambios en agenda.json"""
-        try:
-            agenda_file = os.path.join(BASE_DIR, 'data', 'agenda.json')
-            eventos = []
-            
-            for item in self.agenda_tree.get_children():
-                valores = self.agenda_tree.item(item)['values']
-                eventos.append({
-                    "descripcion": valores[1],
-                    "fecha": valores[0]
-                })
-            
-            with open(agenda_file, 'w', encoding='utf-8') as f:
-                json.dump({"eventos": eventos}, f, indent=2, ensure_ascii=False)
-                
-        except Exception as e:
-            self.display_message(f"Bot: Error guardando agenda - {str(e)}", 'error')
+    def _cargar_lote(self, eventos, inicio, carga):
+        if carga != self._carga_actual:
+            return  # una carga posterior reemplazó a esta
+        self._insertar_filas(eventos[inicio:inicio + LOTE_FILAS])
+        if inicio + LOTE_FILAS < len(eventos):
+            self.root.after(1, self._cargar_lote, eventos, inicio + LOTE_FILAS, carga)
+
+    def _insertar_filas(self, eventos):
+        for evento in eventos:
+            iid = str(evento.id)
+            if not self.agenda_tree.exists(iid):
+                self.agenda_tree.insert('', 'end', iid=iid, values=(
+                    evento.fecha_str,
+                    evento.descripcion
+                ))
+
+    def _eliminar_filas(self, iids):
+        existentes = [iid for iid in iids if self.agenda_tree.exists(iid)]
+        if existentes:
+            self.agenda_tree.delete(*existentes)
 
     def display_message(self, message, sender):
         """Muestra mensaje en el chat con estilo"""
@@ -258,8 +283,11 @@ class ChatbotGUI:
         self.chat_history.see(tk.END)
 
 if __name__ == "__main__":
-    BASE_DIR = Path(__file__).parent.parent
-    
+    import argparse
+    parser = argparse.ArgumentParser(description="Interfaz gráfica del chatbot de agenda")
+    parser.add_argument('--usuario', help="abre la agenda de este usuario (data/usuarios/)")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = ChatbotGUI(root)
+    app = ChatbotGUI(root, usuario=args.usuario)
     root.mainloop()
\ No newline at end of file
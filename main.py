@@ -1,39 +1,44 @@
-from chat import ChatbotAgenda
+from model.predict_intent import IntentPredictor
 from agenda_manager import AgendaManager
+from pipeline import MessagePipeline, Sesion
+from recordatorios import PlanificadorRecordatorios, texto_recordatorio
 
 class ChatbotCompleto:
-    def __init__(self):
-        self.chatbot = ChatbotAgenda()
-        self.agenda = AgendaManager()
+    def __init__(self, agenda=None, recordatorios=None):
+        """
+        Args:
+            agenda (AgendaManager | AgendaPool): por defecto, la agenda única de data/agenda.json
+            recordatorios (PlanificadorRecordatorios): si se indica, vigila la agenda (o cada agenda del pool)
+        """
+        # Recoge en caliente las versiones que publique train_model.py --incremental
+        self.predictor = IntentPredictor(watch=True)
+        self.agenda = agenda if agenda is not None else AgendaManager()
+        self.pipeline = MessagePipeline(self.predictor, self.agenda)
+        self.sesion = Sesion()
+        self.recordatorios = recordatorios
+        if recordatorios is not None:
+            if hasattr(self.agenda, 'al_abrir'):
+                recordatorios.vigilar_pool(self.agenda)
+            else:
+                recordatorios.vigilar(self.agenda, self.sesion.id)
+            recordatorios.iniciar()
 
     def iniciar(self):
         print("Chatbot de Agenda - Comandos: agenda, agregar, salir")
         while True:
             mensaje = input("Tú: ")
-            
+
             if mensaje.lower() == 'salir':
                 break
-                
+
             respuesta = self.procesar_mensaje(mensaje)
             print("Bot:", respuesta)
 
-    def procesar_mensaje(self, mensaje):
-        intencion = self.chatbot.predecir_intencion(mensaje)
-        
-        if intencion == "agregar_evento":
-            return self.manejar_agregar_evento(mensaje)
-        elif intencion == "consultar_evento":
-            return f"Tienes {len(self.agenda.agenda['eventos'])} eventos en tu agenda"
-        else:
-            return self.chatbot.generar_respuesta(mensaje)
-
-    def manejar_agregar_evento(self, mensaje):
-        # Implementar lógica para extraer fecha y descripción
-        descripcion = input("Bot: ¿Qué evento quieres agregar? ")
-        fecha = input("Bot: ¿Para qué fecha? (ej: 15/05/2023) ")
-        self.agenda.agregar_evento(descripcion, fecha)
-        return "Evento agregado correctamente"
+    def procesar_mensaje(self, mensaje, sesion=None):
+        """Una sola pasada del pipeline por mensaje"""
+        return self.pipeline.procesar(mensaje, sesion or self.sesion).respuesta
 
 if __name__ == "__main__":
-    bot = ChatbotCompleto()
-    bot.iniciar()
\ No newline at end of file
+    bot = ChatbotCompleto(recordatorios=PlanificadorRecordatorios(
+        lambda recordatorio: print(f"\nBot: {texto_recordatorio(recordatorio)}\nTú: ", end='', flush=True)))
+    bot.iniciar()
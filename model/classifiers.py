@@ -0,0 +1,193 @@
+import os
+from pathlib import Path
+import numpy as np
+from model.numpy_engine import PRECISIONES, NumpyIntentModel, _softmax
+
+MODEL_DIR = Path(__file__).parent
+
+# Backend -> bundle .npz que genera train_model.py
+BUNDLES = {
+    'mlp': 'modelo_chatbot.npz',
+    'centroide': 'modelo_centroide.npz',
+    'logistico': 'modelo_logistico.npz',
+}
+
+
+def default_backend():
+    """Backend configurado para el despliegue (variable de entorno CHATBOT_BACKEND, 'mlp' por defecto)"""
+    backend = os.environ.get('CHATBOT_BACKEND', 'mlp')
+    if backend not in BUNDLES:
+        raise ValueError(f"Backend de clasificación desconocido: {backend}")
+    return backend
+
+
+def default_precision():
+    """Precisión de los pesos de la red (CHATBOT_PRECISION: 'float32' por defecto, 'float16' o 'int8')"""
+    precision = os.environ.get('CHATBOT_PRECISION', 'float32')
+    if precision not in PRECISIONES:
+        raise ValueError(f"Precisión desconocida: {precision}")
+    return precision
+
+
+def bundle_name(backend, precision='float32'):
+    """Nombre del bundle; las variantes cuantizadas de la red son modelo_chatbot_<precisión>.npz"""
+    if backend != 'mlp' or precision == 'float32':
+        return BUNDLES[backend]
+    return BUNDLES[backend].replace('.npz', f'_{precision}.npz')
+
+
+def bundle_path(backend, model_dir=MODEL_DIR, precision='float32'):
+    return Path(model_dir) / bundle_name(backend, precision)
+
+
+def _l2_normalize(X):
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+
+class NearestCentroidModel:
+    """
+    Centroide normalizado por intención; la similitud coseno con cada centroide,
+    escalada por una temperatura, pasa por softmax para obtener confianzas
+    comparables con el umbral de la red.
+    """
+
+    kind = 'centroide'
+
+    def __init__(self, centroids, temperature=10.0):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.temperature = float(temperature)
+
+    @property
+    def input_dim(self):
+        return self.centroids.shape[1]
+
+    @property
+    def output_dim(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def fit(cls, X, y, n_tags=None, temperature=10.0):
+        """
+        Args:
+            X (np.ndarray): bag-of-words (n_muestras, n_palabras)
+            y (np.ndarray): índice del tag por muestra
+            n_tags (int): Número total de tags (puede haber tags sin muestras en y)
+        """
+        X = _l2_normalize(np.asarray(X, dtype=np.float32))
+        n_tags = n_tags or int(y.max()) + 1
+        # Un tag sin muestras queda con centroide nulo (similitud 0 con cualquier mensaje)
+        centroids = np.zeros((n_tags, X.shape[1]), dtype=np.float32)
+        for k in np.unique(y):
+            centroids[k] = X[y == k].mean(axis=0)
+        return cls(_l2_normalize(centroids), temperature)
+
+    def predict(self, X):
+        x = _l2_normalize(np.atleast_2d(np.asarray(X, dtype=np.float32)))
+        scores = x @ self.centroids.T
+        scores *= self.temperature
+        return _softmax(scores)
+
+    def arrays(self):
+        return {'centroids': self.centroids, 'temperature': np.float32(self.temperature)}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data['centroids'], float(data['temperature']))
+
+
+class LogisticModel:
+    """Regresión logística multinomial sobre el bag-of-words ponderado por TF-IDF"""
+
+    kind = 'logistico'
+
+    def __init__(self, idf, coef, intercept):
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.coef = np.ascontiguousarray(coef, dtype=np.float32)
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+
+    @property
+    def input_dim(self):
+        return self.coef.shape[0]
+
+    @property
+    def output_dim(self):
+        return self.coef.shape[1]
+
+    @classmethod
+    def fit(cls, X, y, n_tags=None, C=10.0):
+        """
+        Entrena con scikit-learn; solo se guardan idf, coeficientes y sesgo
+        Args:
+            n_tags (int): Número total de tags (puede haber tags sin muestras en y)
+        """
+        from sklearn.feature_extraction.text import TfidfTransformer
+        from sklearn.linear_model import LogisticRegression
+
+        tfidf = TfidfTransformer(sublinear_tf=True)
+        features = tfidf.fit_transform(X)
+        clf = LogisticRegression(C=C, max_iter=1000)
+        clf.fit(features, y)
+        coef, intercept = clf.coef_, clf.intercept_
+        if len(clf.classes_) == 2:
+            # Caso binario: scikit-learn da un único logit, equivalente a los logits (0, z)
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0.0], intercept])
+        # Columnas por índice de tag (clf.classes_); los tags sin muestras nunca ganan
+        n_tags = n_tags or int(y.max()) + 1
+        full_coef = np.zeros((X.shape[1], n_tags), dtype=np.float32)
+        full_intercept = np.full(n_tags, -1e4, dtype=np.float32)
+        full_coef[:, clf.classes_] = coef.T
+        full_intercept[clf.classes_] = intercept
+        return cls(tfidf.idf_, full_coef, full_intercept)
+
+    def predict(self, X):
+        x = _l2_normalize(np.atleast_2d(np.asarray(X, dtype=np.float32)) * self.idf)
+        logits = x @ self.coef
+        logits += self.intercept
+        return _softmax(logits)
+
+    def arrays(self):
+        return {'idf': self.idf, 'coef': self.coef, 'intercept': self.intercept}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data['idf'], data['coef'], data['intercept'])
+
+
+CLASIFICADORES = {
+    NearestCentroidModel.kind: NearestCentroidModel,
+    LogisticModel.kind: LogisticModel,
+}
+
+# Modelos que se evalúan con NumPy (cualquier otro se trata como modelo Keras)
+MODELOS_NUMPY = (NumpyIntentModel, NearestCentroidModel, LogisticModel)
+
+
+def save_bundle(model, path, words, tags):
+    """Guarda un clasificador ligero con vocabulario y tags, en el mismo formato que el bundle de la red"""
+    if isinstance(model, NumpyIntentModel):
+        model.save_npz(path, words, tags)
+        return
+    np.savez_compressed(
+        path,
+        kind=np.array(model.kind),
+        words=np.array(words, dtype=str),
+        tags=np.array(tags, dtype=str),
+        **model.arrays()
+    )
+
+
+def load_bundle(path):
+    """
+    Carga cualquier bundle .npz (red plegada o clasificador ligero)
+    Returns:
+        tuple: (modelo, palabras, tags)
+    """
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data['kind']) if 'kind' in data.files else 'mlp'
+        if kind == 'mlp':
+            return NumpyIntentModel.load_npz(path)
+        model = CLASIFICADORES[kind].from_arrays(data)
+        return model, data['words'].tolist(), data['tags'].tolist()
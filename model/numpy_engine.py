@@ -0,0 +1,204 @@
+import json
+import numpy as np
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _softmax(x):
+    x = x - x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+def _linear(x):
+    return x
+
+
+ACTIVACIONES = {
+    'relu': _relu,
+    'softmax': _softmax,
+    'linear': _linear,
+}
+
+# Precisiones de los pesos: int8 lleva una escala float32 por neurona de salida (columna)
+PRECISIONES = ('float32', 'float16', 'int8')
+
+
+class NumpyIntentModel:
+    """
+    Red densa evaluada con NumPy puro (sin TensorFlow).
+    Las capas BatchNormalization se pliegan en la capa Dense siguiente y
+    las capas Dropout se ignoran, igual que en inferencia con Keras.
+    Los pesos float16/int8 se quedan así en memoria y cada capa se
+    descuantiza solo mientras se multiplica.
+    """
+
+    def __init__(self, layers):
+        # layers: lista de (kernel, bias, nombre_activación[, escala por columna si el kernel es int8])
+        self.layers = []
+        for W, b, act, *escala in layers:
+            W = np.asarray(W)
+            dtype = W.dtype if W.dtype in (np.float16, np.int8) else np.float32
+            escala = np.asarray(escala[0], dtype=np.float32) if escala and escala[0] is not None else None
+            self.layers.append((np.ascontiguousarray(W, dtype=dtype), np.asarray(b, dtype=np.float32),
+                                act, escala))
+
+    @property
+    def input_dim(self):
+        return self.layers[0][0].shape[0]
+
+    @property
+    def output_dim(self):
+        return self.layers[-1][0].shape[1]
+
+    @property
+    def precision(self):
+        return self.layers[0][0].dtype.name
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los pesos"""
+        return sum(W.nbytes + b.nbytes + (0 if e is None else e.nbytes) for W, b, _, e in self.layers)
+
+    def cuantizar(self, precision):
+        """
+        Copia del modelo con los kernels en `precision` (los sesgos siguen en float32)
+        Args:
+            precision (str): 'float32', 'float16' o 'int8' (simétrica, una escala por columna)
+        """
+        if precision not in PRECISIONES:
+            raise ValueError(f"Precisión desconocida: {precision}")
+        layers = []
+        for W, b, act, escala in self.layers:
+            W = W.astype(np.float32) if escala is None else W * escala
+            if precision == 'int8':
+                escala = np.abs(W).max(axis=0) / 127
+                escala[escala == 0] = 1.0
+                layers.append((np.rint(W / escala).astype(np.int8), b, act, escala))
+            else:
+                layers.append((W.astype(precision), b, act))
+        return type(self)(layers)
+
+    @classmethod
+    def from_h5(cls, path):
+        """Extrae los pesos de un modelo Keras Sequential guardado en .h5"""
+        import h5py
+
+        with h5py.File(path, 'r') as f:
+            config = f.attrs['model_config']
+            if isinstance(config, bytes):
+                config = config.decode('utf-8')
+            config = json.loads(config)['config']
+            layer_configs = config['layers'] if isinstance(config, dict) else config
+            weights_group = f['model_weights'] if 'model_weights' in f else f
+
+            specs = []
+            for layer in layer_configs:
+                class_name = layer['class_name']
+                if class_name in ('InputLayer', 'Dropout'):
+                    continue
+                name = layer['config']['name']
+                specs.append((class_name, layer['config'], _read_layer_weights(weights_group[name])))
+
+        return cls(_fold_layers(specs))
+
+    def save_npz(self, path, words, tags):
+        """Guarda pesos, vocabulario y tags en un único .npz (cargable sin TensorFlow)"""
+        arrays = {
+            'words': np.array(words, dtype=str),
+            'tags': np.array(tags, dtype=str),
+            'activations': np.array([act for _, _, act, _ in self.layers], dtype=str),
+        }
+        for i, (W, b, _, escala) in enumerate(self.layers):
+            arrays[f'W{i}'] = W
+            arrays[f'b{i}'] = b
+            if escala is not None:
+                arrays[f's{i}'] = escala
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load_npz(cls, path):
+        """
+        Carga un bundle generado por save_npz
+        Returns:
+            tuple: (modelo, palabras, tags)
+        """
+        with np.load(path, allow_pickle=False) as data:
+            layers = [
+                (data[f'W{i}'], data[f'b{i}'], str(act), data[f's{i}'] if f's{i}' in data.files else None)
+                for i, act in enumerate(data['activations'])
+            ]
+            words = data['words'].tolist()
+            tags = data['tags'].tolist()
+        return cls(layers), words, tags
+
+    def predict(self, X):
+        """
+        Ejecuta la red sobre una matriz (n_muestras, n_palabras)
+        Returns:
+            np.ndarray: probabilidades (n_muestras, n_tags)
+        """
+        x = np.asarray(X, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[np.newaxis, :]
+        for W, b, act, escala in self.layers:
+            if W.dtype != np.float32:
+                # Descuantización por capa: el temporal float32 se libera al pasar a la siguiente
+                W = W.astype(np.float32)
+            x = x @ W
+            if escala is not None:
+                x *= escala
+            x += b
+            x = ACTIVACIONES[act](x)
+        return x
+
+
+def _read_layer_weights(group):
+    """Devuelve {nombre: array} para los datasets de una capa (formato Keras 2 y 3)"""
+    weights = {}
+
+    def visit(name, obj):
+        if hasattr(obj, 'shape'):
+            key = name.rsplit('/', 1)[-1].split(':')[0]
+            weights[key] = obj[()]
+
+    group.visititems(visit)
+    return weights
+
+
+def _fold_layers(specs):
+    """Convierte la secuencia Dense/BatchNormalization en capas afines con BN plegada"""
+    layers = []
+    scale = shift = None  # BN pendiente de plegar en la siguiente Dense
+
+    for class_name, config, w in specs:
+        if class_name == 'Dense':
+            W = w['kernel'].astype(np.float64)
+            b = w['bias'].astype(np.float64) if 'bias' in w else np.zeros(W.shape[1])
+            if scale is not None:
+                # (x*s + t) @ W + b = x @ (diag(s) W) + (t @ W + b)
+                b = shift @ W + b
+                W = scale[:, np.newaxis] * W
+                scale = shift = None
+            layers.append((W, b, config.get('activation', 'linear')))
+        elif class_name == 'BatchNormalization':
+            eps = config.get('epsilon', 1e-3)
+            gamma = w.get('gamma', np.ones_like(w['moving_mean'])).astype(np.float64)
+            beta = w.get('beta', np.zeros_like(w['moving_mean'])).astype(np.float64)
+            s = gamma / np.sqrt(w['moving_variance'].astype(np.float64) + eps)
+            t = beta - w['moving_mean'].astype(np.float64) * s
+            if scale is None:
+                scale, shift = s, t
+            else:
+                scale, shift = scale * s, shift * s + t
+        else:
+            raise ValueError(f"Capa no soportada por el motor NumPy: {class_name}")
+
+    if scale is not None:
+        # BN final sin Dense posterior: se aplica como capa afín diagonal
+        layers.append((np.diag(scale), shift, 'linear'))
+
+    return layers
@@ -1,42 +1,110 @@
 import pickle
 import numpy as np
-import tensorflow as tf
 from pathlib import Path
 import json
 import os
 import random
-import re
-from datetime import datetime
-import dateparser
-from utils.preprocessing import tokenize, stem, bag_of_words
+from utils.preprocessing import tokenize
+from utils.vocabulary import Vocabulary
+from utils.date_utils import extract_datetime, extract_event_description, get_date_extractor
+from utils.event_extraction import extract_event_details
+from utils import metrics
+from model.numpy_engine import NumpyIntentModel
+from model.classifiers import (MODELOS_NUMPY, bundle_path as backend_bundle_path,
+                               default_backend, default_precision, load_bundle)
+from model.rules import RuleMatcher
+from model.versioning import ModelWatcher, load_version, read_manifest
 
 class IntentPredictor:
-    def __init__(self, model_path=None, words_path=None, tags_path=None):
+    def __init__(self, model_path=None, words_path=None, tags_path=None, engine='auto',
+                 bundle_path=None, watch=False, backend=None, rules=True, precision=None):
+        # Clasificador: 'mlp' (red de train_model.py), 'centroide' o 'logistico'
+        self.backend = backend or default_backend()
+        # Pesos de la red: 'float32', 'float16' o 'int8' (bundles cuantizados de train_model.py)
+        self.precision = precision or default_precision()
         # Cargar rutas por defecto si no se especifican
         base_dir = Path(__file__).parent.parent
         self.model_path = model_path or os.path.join(base_dir, 'model', 'modelo_chatbot.h5')
         self.words_path = words_path or os.path.join(base_dir, 'model', 'palabras.pkl')
         self.tags_path = tags_path or os.path.join(base_dir, 'model', 'tags.pkl')
+        self.bundle_path = bundle_path or str(backend_bundle_path(self.backend, base_dir / 'model', self.precision))
+        if not os.path.exists(self.bundle_path) and bundle_path is None and self.precision != 'float32':
+            print(f"No hay bundle {self.precision} del modelo: se usan los pesos float32")
+            self.precision = 'float32'
+            self.bundle_path = str(backend_bundle_path(self.backend, base_dir / 'model'))
         self.intents_path = os.path.join(base_dir, 'data', 'intents.json')
+        # Los clasificadores ligeros solo existen como bundle .npz
+        if self.backend != 'mlp':
+            engine = 'npz'
+        # 'auto': usa el bundle .npz (sin TensorFlow) si existe, si no el .h5 con Keras
+        if engine == 'auto':
+            engine = 'npz' if os.path.exists(self.bundle_path) else 'keras'
+        self.engine = engine
+        self.use_rules = rules
+        # Versión publicada antes de cargar: si se publica otra durante la carga, el watcher la recoge
+        self.version = read_manifest().get('version', 0)
         
         # Cargar recursos
         self.load_model()
         self.load_resources()
+        # Estado de inferencia como una única tupla: se sustituye de golpe al recargar
+        self._state = (self.model, self.vocabulary, self.tags, self.rules)
+        
+        self.watcher = None
+        if watch:
+            self.watch_versions()
 
     def load_model(self):
-        """Carga el modelo de TensorFlow"""
-        self.model = tf.keras.models.load_model(self.model_path)
+        """Carga el modelo con el motor seleccionado ('npz', 'numpy' o 'keras')"""
+        if self.engine == 'npz':
+            # El bundle incluye vocabulario y tags: no hace falta leer los .pkl
+            self.model, self.words, self.tags = load_bundle(self.bundle_path)
+        elif self.engine == 'numpy':
+            self.model = NumpyIntentModel.from_h5(self.model_path)
+        elif self.engine == 'keras':
+            import tensorflow as tf
+            self.model = tf.keras.models.load_model(self.model_path)
+        else:
+            raise ValueError(f"Motor de inferencia desconocido: {self.engine}")
 
     def load_resources(self):
         """Carga vocabulario y etiquetas"""
-        with open(self.words_path, 'rb') as f:
-            self.words = pickle.load(f)
-        
-        with open(self.tags_path, 'rb') as f:
-            self.tags = pickle.load(f)
+        if self.engine != 'npz':
+            with open(self.words_path, 'rb') as f:
+                self.words = pickle.load(f)
+            with open(self.tags_path, 'rb') as f:
+                self.tags = pickle.load(f)
+        self.vocabulary = Vocabulary(self.words)
         
         with open(self.intents_path, 'r', encoding='utf-8') as f:
             self.intents = json.load(f)
+        self.responses = self._responses_by_tag(self.intents)
+        self.rules = RuleMatcher(self.intents) if self.use_rules else None
+
+    def reload_version(self, manifest):
+        """
+        Carga una versión publicada por train_model.py y la pone en servicio.
+        Las peticiones en curso terminan con la tupla de estado que ya leyeron.
+        """
+        engine = 'keras' if self.engine == 'keras' else 'npz'
+        model, words, tags = load_version(manifest, engine, self.backend, self.precision)
+        vocabulary = Vocabulary(words)
+        with open(self.intents_path, 'r', encoding='utf-8') as f:
+            intents = json.load(f)
+        rules = RuleMatcher(intents) if self.use_rules else None
+        
+        self._state = (model, vocabulary, tags, rules)
+        self.model, self.words, self.tags, self.vocabulary = model, words, tags, vocabulary
+        self.intents, self.rules = intents, rules
+        self.responses = self._responses_by_tag(intents)
+        self.version = manifest['version']
+
+    def watch_versions(self, interval=2.0):
+        """Arranca un hilo que recarga el modelo al publicarse una versión nueva"""
+        if self.watcher is None:
+            self.watcher = ModelWatcher(self.reload_version, interval=interval, version=self.version)
+            self.watcher.start()
+        return self.watcher
 
     def predict(self, sentence, confidence_threshold=0.7):
         """
@@ -47,85 +115,118 @@ class IntentPredictor:
         Returns:
             tuple: (intención, confianza) o (None, 0) si no supera el umbral
         """
-        # Preprocesamiento
-        tokens = tokenize(sentence)
-        bow = bag_of_words(tokens, self.words)
-        bow = np.array([bow])
-        
+        return self.predict_batch([sentence], confidence_threshold)[0]
+
+    def predict_batch(self, sentences, confidence_threshold=0.7):
+        """
+        Predice la intención de varios mensajes con una única pasada del modelo
+        Args:
+            sentences (list[str]): Mensajes de los usuarios
+            confidence_threshold (float): Umbral de confianza mínimo
+        Returns:
+            list[tuple]: (intención, confianza) por mensaje, (None, 0) si no supera el umbral
+        """
+        return [(tag, confidence) for tag, confidence, _ in
+                self.classify_batch(sentences, confidence_threshold=confidence_threshold)]
+
+    def classify_batch(self, sentences, token_lists=None, confidence_threshold=0.7):
+        """
+        Clasifica un lote indicando qué ruta resolvió cada mensaje
+        Args:
+            sentences (list[str]): Mensajes de los usuarios
+            token_lists (list[list[str]]): Tokens ya calculados de cada mensaje (opcional)
+            confidence_threshold (float): Umbral de confianza mínimo
+        Returns:
+            list[tuple]: (intención, confianza, ruta) con ruta 'exacta', 'disparador' o 'modelo'
+        """
+        if not sentences:
+            return []
+        # Una sola lectura del estado: modelo, vocabulario y tags siempre de la misma versión
+        model, vocabulary, tags, rules = self._state
+
+        # Ruta rápida: los mensajes que resuelven las reglas no pasan por el modelo
+        if rules is not None:
+            with metrics.medir('reglas'):
+                results, pending = rules.split_batch(sentences)
+            if not pending:
+                return results
+        else:
+            results, pending = [None] * len(sentences), range(len(sentences))
+
+        # Preprocesamiento: una matriz bag-of-words para todo el lote
+        with metrics.medir('tokenizar'):
+            if token_lists is None:
+                tokens = [tokenize(sentences[i]) for i in pending]
+            else:
+                tokens = [token_lists[i] for i in pending]
+        with metrics.medir('codificar'):
+            bow = vocabulary.encode_batch(tokens)
+
         # Predicción
-        prediction = self.model.predict(bow)[0]
-        intent_idx = np.argmax(prediction)
-        intent = self.tags[intent_idx]
-        confidence = prediction[intent_idx]
-        
-        return (intent, confidence) if confidence >= confidence_threshold else (None, 0)
+        with metrics.medir('modelo'):
+            predictions = self._forward(model, bow)
+        intent_idx = np.argmax(predictions, axis=1)
+        confidences = predictions[np.arange(len(pending)), intent_idx]
+        # Sin ninguna palabra del vocabulario la salida del modelo no dice nada del mensaje
+        confidences[~bow.any(axis=1)] = 0
+
+        for i, idx, confidence in zip(pending, intent_idx, confidences):
+            if confidence >= confidence_threshold:
+                results[i] = (tags[idx], float(confidence), 'modelo')
+            else:
+                results[i] = (None, 0, 'modelo')
+        return results
+
+    def rule_stats(self):
+        """Contadores por ruta (reglas exactas, disparadores, modelo); None si las reglas están desactivadas"""
+        rules = self._state[3]
+        return rules.stats() if rules is not None else None
+
+    @staticmethod
+    def _forward(model, bow):
+        """Ejecuta el modelo sobre una matriz bag-of-words"""
+        if isinstance(model, MODELOS_NUMPY):
+            return model.predict(bow)
+        # Llamada directa: evita la sobrecarga de model.predict en lotes pequeños
+        return np.asarray(model(bow, training=False))
+
+    @staticmethod
+    def _responses_by_tag(intents):
+        """Mapa tag -> respuestas, para no recorrer intents.json en cada respuesta"""
+        return {intent['tag']: intent['responses'] for intent in intents['intents']}
 
     def get_response(self, intent, event_details=None):
         """Obtiene una respuesta aleatoria para la intención"""
-        for intent_data in self.intents['intents']:
-            if intent_data['tag'] == intent:
-                response = random.choice(intent_data['responses'])
-                if event_details and '{descripcion}' in response:
-                    desc, fecha = event_details
-                    return response.format(descripcion=desc, fecha=fecha)
-                return response
-        return "No entendí eso. ¿Puedes reformularlo?"
+        responses = self.responses.get(intent)
+        if not responses:
+            return "No entendí eso. ¿Puedes reformularlo?"
+        response = random.choice(responses)
+        if event_details and '{descripcion}' in response:
+            desc, fecha = event_details
+            return response.format(descripcion=desc, fecha=fecha)
+        return response
 
     def parse_spanish_date(self, text):
-        """Analiza fechas en español con dateparser"""
-        settings = {
-            'DATE_ORDER': 'DMY',
-            'LANGUAGE': 'es',
-            'PREFER_DAY_OF_MONTH': 'first',
-            'PREFER_DATES_FROM': 'future',
-            'RELATIVE_BASE': datetime.now()
-        }
-        return dateparser.parse(text, settings=settings)
+        """Analiza fechas en español (gramática rápida + dateparser, con caché)"""
+        resultado = get_date_extractor().extract(text)
+        return resultado.fecha if resultado else None
 
     def extract_datetime(self, text):
         """Extrae fecha y hora de un texto en español"""
         try:
-            date = self.parse_spanish_date(text)
-            if date:
-                # Ajustar formato de 12h a 24h si es necesario
-                if "pm" in text.lower() and date.hour < 12:
-                    date = date.replace(hour=date.hour+12)
-                elif "am" in text.lower() and date.hour == 12:
-                    date = date.replace(hour=0)
-                return date.strftime("%d/%m/%Y %H:%M")
-            return None
+            return extract_datetime(text)
         except Exception as e:
             print(f"Error parseando fecha: {str(e)}")
             return None
 
-    def extract_event_description(self, text, date_str):
-        """Extrae la descripción del evento eliminando componentes de fecha"""
+    def extract_event_description(self, text, date_str=None):
+        """
+        Extrae la descripción del evento eliminando componentes de fecha
+        Args:
+            date_str: Obsoleto y sin efecto; se admite para no romper llamadas antiguas
+        """
         try:
-            if not date_str:
-                return text.capitalize()
-                
-            date_obj = datetime.strptime(date_str, "%d/%m/%Y %H:%M")
-            
-            # Palabras y patrones a eliminar
-            remove_patterns = [
-                r'\b(?:el|para|a las?|el día|el|la|los|mi|una|agenda|crea|programa)\b',
-                date_str,
-                date_obj.strftime("%d de %B").lower(),
-                date_obj.strftime("%A").lower(),
-                r'\d{1,2}(?::\d{2})?\s?(?:am|pm|de la mañana|de la tarde)?',
-                r'\b(?:próximo|próxima|siguiente)\b'
-            ]
-            
-            clean_text = text.lower()
-            for pattern in remove_patterns:
-                clean_text = re.sub(pattern, '', clean_text, flags=re.IGNORECASE)
-            
-            # Limpieza final
-            clean_text = re.sub(r'[^\w\s]', '', clean_text)
-            clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-            
-            return clean_text.capitalize() if clean_text else "Evento sin descripción"
-        
+            return extract_event_description(text)
         except Exception as e:
             print(f"Error extrayendo descripción: {str(e)}")
             return text.capitalize()
@@ -137,37 +238,32 @@ class IntentPredictor:
             tuple: (descripción, fecha_str) o (None, None) si no se detecta
         """
         try:
-            # Primero intenta extraer la fecha
-            date_str = self.extract_datetime(message)
-            if not date_str:
+            details = extract_event_details(message)
+            if details.fecha is None:
                 return None, None
-                
-            # Luego extrae la descripción
-            description = self.extract_event_description(message, date_str)
-            
-            return description, date_str
+            return details.descripcion, details.fecha.strftime("%d/%m/%Y %H:%M")
             
         except Exception as e:
             print(f"Error extrayendo detalles del evento: {str(e)}")
             return None, None
 
+TEST_PHRASES = [
+    "Hola, cómo estás?",
+    "Agenda una reunión para mañana a las 3pm",
+    "Qué tengo programado para el viernes?",
+    "Crea una cita para el dentista el 31 de mayo a las 3 de la tarde",
+    "Reserva hora con el doctor para el 15 de junio a las 10:30",
+    "crea una cita para el dentista el 31 de mayo a las 3 de la tarde",
+    "agenda reunión importante para el 25 de junio",
+    "reserva hora con el doctor para mañana a las 10am",
+    "quiero una cita de spa el viernes a las 4pm"
+]
+
 if __name__ == "__main__":
     # Ejemplo de uso mejorado
     predictor = IntentPredictor()
-    test_phrases = [
-        "Hola, cómo estás?",
-        "Agenda una reunión para mañana a las 3pm",
-        "Qué tengo programado para el viernes?",
-        "Crea una cita para el dentista el 31 de mayo a las 3 de la tarde",
-        "Reserva hora con el doctor para el 15 de junio a las 10:30",
-        "crea una cita para el dentista el 31 de mayo a las 3 de la tarde",
-        "agenda reunión importante para el 25 de junio",
-        "reserva hora con el doctor para mañana a las 10am",
-        "quiero una cita de spa el viernes a las 4pm"
-    ]
-    
     print("=== Prueba del sistema ===")
-    for phrase in test_phrases:
+    for phrase in TEST_PHRASES:
         print(f"\nFrase: '{phrase}'")
         
         # 1. Predecir intención
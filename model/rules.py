@@ -0,0 +1,145 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+# Frases disparadoras por intención. '^' exige que la frase abra el mensaje
+# (imperativos como "agenda ..." frente a "mi agenda").
+TRIGGERS = {
+    'saludo': ['^hola', '^hey', '^buenos dias', '^buenas tardes', '^buenas noches', '^saludos'],
+    'despedida': ['^adios', '^chao', '^chau', '^bye', '^hasta luego', '^hasta pronto',
+                  '^nos vemos', 'eso es todo'],
+    'agradecimiento': ['^gracias', '^muchas gracias', '^mil gracias', '^te lo agradezco'],
+    'ayuda': ['^ayuda', '^que puedes hacer', '^como te uso'],
+    'agregar_evento': ['^agenda', '^agendar', '^agrega', '^agregar', '^añade',
+                       '^programa', '^reserva', '^reservar', '^apunta', '^registra',
+                       '^crea', '^pon una'],
+    'consultar_evento': ['^que tengo', '^que hay', '^tengo algo', '^muestrame mis',
+                         '^ver la agenda', '^ver mi agenda', '^revisar mi agenda',
+                         'mis proximos eventos'],
+    'consultar_libre': ['tengo libre', 'estoy libre', 'tiempo libre', 'hueco', 'huecos',
+                        'disponible', 'disponibles'],
+    'eliminar_evento': ['^borra', '^borrar', '^elimina', '^eliminar', '^cancela', '^cancelar',
+                        '^quita', '^quitar', '^anula', '^suprime'],
+}
+
+# Intenciones que prevalecen sobre otras cuando ambas aparecen en el mensaje:
+# "¿qué tengo libre el jueves?" dispara '^que tengo' y 'tengo libre', pero pregunta por huecos.
+PRECEDENCIA = {
+    'consultar_libre': ('consultar_evento',),
+}
+
+EXACT_CONFIDENCE = 1.0
+TRIGGER_CONFIDENCE = 0.9
+
+_RE_NO_PALABRA = re.compile(r"[^\w\s]+")
+
+
+def normalize(text):
+    """Minúsculas, sin tildes ni signos de puntuación y con espacios simples"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(_RE_NO_PALABRA.sub(' ', text).split())
+
+
+class RuleMatcher:
+    """
+    Ruta rápida previa al clasificador:
+      1. tabla hash de patrones normalizados de intents.json (coincidencia exacta);
+      2. trie de tokens con las frases disparadoras, recorrido desde cada posición
+         del mensaje (las frases tienen como mucho tres tokens).
+    Solo se resuelve un mensaje si todas las frases encontradas apuntan a la misma
+    intención (descontando las que ceden según PRECEDENCIA); en caso contrario
+    decide el modelo.
+    """
+
+    def __init__(self, intents, triggers=TRIGGERS, precedence=PRECEDENCIA):
+        known = {intent['tag'] for intent in intents['intents']}
+        # Patrón normalizado -> tag (los patrones ambiguos entre intenciones se descartan)
+        exact = {}
+        for intent in intents['intents']:
+            for pattern in intent['patterns']:
+                key = normalize(pattern)
+                exact[key] = intent['tag'] if exact.get(key, intent['tag']) == intent['tag'] else None
+        self.exact = {k: tag for k, tag in exact.items() if tag is not None}
+
+        self.trie = {}
+        for tag, phrases in triggers.items():
+            if tag not in known:
+                continue
+            for phrase in phrases:
+                anchored = phrase.startswith('^')
+                node = self.trie
+                for token in normalize(phrase.lstrip('^')).split():
+                    node = node.setdefault(token, {})
+                node[None] = (tag, anchored)
+        self.precedence = precedence
+
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def match(self, text):
+        """
+        Returns:
+            tuple: (intención, confianza, ruta) o None si debe decidir el modelo
+        """
+        key = normalize(text)
+        tag = self.exact.get(key)
+        if tag is not None:
+            return tag, EXACT_CONFIDENCE, 'exacta'
+
+        tokens = key.split()
+        tags = set()
+        accepted = set()
+        for start in range(len(tokens)):
+            node = self.trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                if None in node:
+                    tag, anchored = node[None]
+                    tags.add(tag)
+                    if start == 0 or not anchored:
+                        accepted.add(tag)
+        for tag in list(tags):
+            if tag in accepted:
+                tags.difference_update(self.precedence.get(tag, ()))
+        if len(tags) == 1 and tags <= accepted:
+            return next(iter(tags)), TRIGGER_CONFIDENCE, 'disparador'
+        return None
+
+    def split_batch(self, sentences):
+        """
+        Resuelve por reglas lo que se pueda de un lote
+        Returns:
+            tuple: (resultados, pendientes) donde resultados[i] es (tag, confianza, ruta)
+                   o None, y pendientes son los índices que necesitan el modelo
+        """
+        results, pending = [], []
+        paths = Counter()
+        for i, sentence in enumerate(sentences):
+            hit = self.match(sentence)
+            if hit is None:
+                results.append(None)
+                pending.append(i)
+                paths['modelo'] += 1
+            else:
+                results.append(hit)
+                paths[hit[2]] += 1
+        with self._lock:
+            self.counters.update(paths)
+        return results, pending
+
+    def stats(self):
+        """Mensajes por ruta ('exacta', 'disparador', 'modelo') y fracción que evita el modelo"""
+        with self._lock:
+            counters = dict(self.counters)
+        total = sum(counters.values())
+        rules = counters.get('exacta', 0) + counters.get('disparador', 0)
+        return {
+            'exacta': counters.get('exacta', 0),
+            'disparador': counters.get('disparador', 0),
+            'modelo': counters.get('modelo', 0),
+            'fraccion_sin_modelo': rules / total if total else 0.0,
+        }
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from model.classifiers import load_bundle
+
+MODEL_DIR = Path(__file__).parent
+MANIFEST_PATH = MODEL_DIR / 'manifest.json'
+VERSIONS_DIR = MODEL_DIR / 'versiones'
+
+
+def intents_fingerprint(data):
+    """
+    Huella de contenido de intents.json
+    Returns:
+        dict: {tag: sha256 del intent serializado de forma canónica}
+    """
+    return {
+        intent['tag']: hashlib.sha256(
+            json.dumps(intent, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        for intent in data['intents']
+    }
+
+
+def changed_intents(previous, current):
+    """Tags nuevos o modificados entre dos huellas"""
+    return sorted(tag for tag, digest in current.items() if previous.get(tag) != digest)
+
+
+def read_manifest(path=MANIFEST_PATH):
+    """Manifest de la versión publicada; {} si aún no existe"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    """Publica una versión: escritura en temporal + os.replace (los lectores nunca ven un JSON a medias)"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def new_version_dir(manifest):
+    """Crea el directorio de la siguiente versión y devuelve (número, ruta)"""
+    version = manifest.get('version', 0) + 1
+    path = VERSIONS_DIR / f'v{version}'
+    path.mkdir(parents=True, exist_ok=True)
+    return version, path
+
+
+def load_version(manifest, engine='npz', backend='mlp', precision='float32'):
+    """
+    Carga los artefactos de una versión publicada
+    Args:
+        precision (str): Pesos de la red; las versiones sin esa variante cuantizada usan float32
+    Returns:
+        tuple: (modelo, palabras, tags)
+    """
+    if backend != 'mlp':
+        bundle = manifest['bundles'][backend]
+    else:
+        bundle = manifest.get('cuantizados', {}).get(precision, manifest['bundle'])
+    model, words, tags = load_bundle(MODEL_DIR / bundle)
+    if engine == 'keras':
+        import tensorflow as tf
+        model = tf.keras.models.load_model(MODEL_DIR / manifest['modelo'])
+    return model, words, tags
+
+
+class ModelWatcher:
+    """
+    Vigila el manifest y llama a callback(manifest) cuando se publica una versión nueva.
+    Solo consulta el mtime del fichero en cada ciclo; el JSON se lee cuando cambia.
+    """
+
+    def __init__(self, callback, path=MANIFEST_PATH, interval=2.0, version=None):
+        self.callback = callback
+        self.path = Path(path)
+        self.interval = interval
+        self.version = read_manifest(self.path).get('version', 0) if version is None else version
+        self._mtime = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def check(self):
+        """Comprueba una vez si hay versión nueva; devuelve True si se recargó"""
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        manifest = read_manifest(self.path)
+        if manifest.get('version', 0) <= self.version:
+            return False
+        try:
+            self.callback(manifest)
+        except Exception as e:
+            # La versión en servicio sigue activa; se reintentará con la siguiente publicación
+            print(f"Error recargando la versión {manifest.get('version')} del modelo: {e}")
+            return False
+        self.version = manifest['version']
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='model-watcher')
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,299 @@
+import contextlib
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from agenda_manager import describir_regla, formatear_eventos
+from model.rules import normalize
+from utils.date_utils import extract_query_range
+from utils.event_extraction import extract_duration, extract_event_details
+from utils import metrics
+from utils.preprocessing import tokenize
+
+NO_ENTENDI = "No entendí bien. ¿Puedes reformularlo?"
+PEDIR_FECHA = "¿Para qué fecha? (ej: 15/05/2025 10:00 o 'mañana a las 3pm')"
+# Franja (horas) en la que se buscan huecos libres y duración mínima de hueco (minutos)
+HORARIO_LIBRE = (8, 20)
+HUECO_MINIMO = 30
+# Días hacia delante en los que se busca el próximo hueco cuando no se indica periodo
+DIAS_BUSQUEDA_HUECO = 30
+# Palabras de una orden de borrado que no describen el evento
+PALABRAS_BORRADO = {
+    'borra', 'borrar', 'elimina', 'eliminar', 'cancela', 'cancelar', 'quita', 'quitar', 'anula',
+    'anular', 'suprime', 'suprimir', 'el', 'la', 'los', 'las', 'lo', 'de', 'del', 'a', 'al', 'con',
+    'mi', 'mis', 'un', 'una', 'evento', 'eventos', 'agendado', 'agendada', 'programado', 'programada',
+    'diario', 'diaria', 'semanal', 'mensual', 'anual',
+}
+
+@dataclass
+class Sesion:
+    """Estado de la conversación de un usuario"""
+    id: str = "local"
+    # Dueño de la agenda cuando el pipeline sirve a varios usuarios (por defecto, el id de sesión)
+    usuario: str | None = None
+    # Descripción del evento a la espera de que el usuario indique la fecha
+    evento_pendiente: str | None = None
+    # Duración y repetición que ya se dieron en el mensaje sin fecha
+    detalles_pendientes: tuple | None = None
+
+@dataclass(slots=True)
+class ContextoMensaje:
+    """Resultados intermedios de un mensaje; cada etapa se calcula una sola vez"""
+    texto: str
+    sesion: Sesion = field(default_factory=Sesion)
+    # Solo se tokeniza si el mensaje llega al modelo (las reglas trabajan sobre el texto)
+    tokens: list | None = None
+    intencion: str | None = None
+    confianza: float = 0.0
+    # 'exacta', 'disparador', 'modelo' o 'fecha_pendiente'
+    ruta: str | None = None
+    detalles: tuple | None = None
+    periodo: tuple | None = None
+    eventos: list | None = None
+    evento: object | None = None
+    # Eventos que se solapan con el recién añadido
+    conflictos: list | None = None
+    # Huecos libres (inicio, fin) de una consulta de disponibilidad
+    huecos: list | None = None
+    # Agenda del usuario, solo mientras se completa el mensaje
+    agenda: object | None = None
+    respuesta: str | None = None
+
+class _TokensPerezosos:
+    """Vista indexable de los tokens de un lote: tokeniza al acceder y guarda el resultado en el contexto"""
+
+    def __init__(self, contextos):
+        self.contextos = contextos
+
+    def __getitem__(self, i):
+        contexto = self.contextos[i]
+        if contexto.tokens is None:
+            contexto.tokens = tokenize(contexto.texto)
+        return contexto.tokens
+
+class MessagePipeline:
+    """
+    Procesa mensajes en una sola pasada:
+    tokenizar -> codificar -> clasificar -> extraer entidades -> responder.
+    Lo usan la CLI (main.py), la interfaz gráfica y el servidor.
+    """
+
+    def __init__(self, predictor, agenda, umbral=0.7):
+        """
+        Args:
+            predictor (IntentPredictor): Clasificador de intenciones
+            agenda (AgendaManager | AgendaPool): Agenda única o agendas por usuario
+        """
+        self.predictor = predictor
+        self.agenda = agenda
+        self.umbral = umbral
+        # Exportadores de métricas configurados por entorno (CHATBOT_METRICS_*)
+        metrics.iniciar_exportadores()
+        self.manejadores = {
+            'agregar_evento': self._agregar_evento,
+            'consultar_evento': self._consultar_evento,
+            'consultar_libre': self._consultar_libre,
+            'eliminar_evento': self._eliminar_evento,
+        }
+
+    def procesar(self, texto, sesion=None):
+        """
+        Procesa un mensaje completo
+        Returns:
+            ContextoMensaje: con la intención, las entidades extraídas y la respuesta
+        """
+        return self.procesar_lote([ContextoMensaje(texto, sesion or Sesion())])[0]
+
+    def procesar_lote(self, contextos):
+        """Clasifica todo el lote en una pasada del modelo y completa cada mensaje"""
+        with metrics.medir('mensaje'):
+            self.clasificar(contextos)
+            for contexto in contextos:
+                self.completar(contexto)
+        return contextos
+
+    def clasificar(self, contextos):
+        """Etapas tokenizar/codificar/clasificar para los mensajes que no esperan una fecha"""
+        with metrics.medir('clasificar'), metrics.perfilar('clasificar'):
+            return self._clasificar(contextos)
+
+    def _clasificar(self, contextos):
+        pendientes = [c for c in contextos if c.sesion.evento_pendiente is None]
+        for contexto in contextos:
+            if contexto.sesion.evento_pendiente is not None:
+                contexto.ruta = 'fecha_pendiente'
+        resultados = self.predictor.classify_batch(
+            [c.texto for c in pendientes], _TokensPerezosos(pendientes), self.umbral)
+        for contexto, (intencion, confianza, ruta) in zip(pendientes, resultados):
+            contexto.intencion, contexto.confianza, contexto.ruta = intencion, confianza, ruta
+        return contextos
+
+    def completar(self, contexto):
+        """Extracción de entidades y respuesta para un mensaje ya clasificado"""
+        with metrics.medir('completar'), metrics.perfilar('completar'):
+            return self._completar(contexto)
+
+    def _completar(self, contexto):
+        if contexto.ruta == 'fecha_pendiente':
+            manejador = self._fecha_pendiente
+        elif contexto.intencion in self.manejadores:
+            manejador = self.manejadores[contexto.intencion]
+        else:
+            contexto.respuesta = self.respuesta_estandar(contexto.intencion)
+            return contexto
+        # Solo los mensajes que tocan la agenda la cargan (o la reservan en el pool)
+        with self._agenda_de(contexto.sesion) as agenda:
+            contexto.agenda = agenda
+            try:
+                manejador(contexto)
+            finally:
+                contexto.agenda = None
+        return contexto
+
+    def _agenda_de(self, sesion):
+        if hasattr(self.agenda, 'usar'):
+            return self.agenda.usar(sesion.usuario or sesion.id)
+        return contextlib.nullcontext(self.agenda)
+
+    def respuesta_estandar(self, intencion):
+        respuestas = self.predictor.responses.get(intencion)
+        return random.choice(respuestas) if respuestas else NO_ENTENDI
+
+    def _agregar_evento(self, contexto):
+        contexto.detalles = extract_event_details(contexto.texto)
+        if contexto.detalles.fecha is None:
+            # Se pregunta la fecha en el siguiente turno de la conversación
+            contexto.sesion.evento_pendiente = contexto.detalles.descripcion
+            contexto.sesion.detalles_pendientes = contexto.detalles
+            contexto.respuesta = PEDIR_FECHA
+            return
+        self._guardar_evento(contexto, contexto.detalles.descripcion)
+
+    def _fecha_pendiente(self, contexto):
+        contexto.intencion = 'agregar_evento'
+        contexto.detalles = extract_event_details(contexto.texto)
+        if contexto.detalles.fecha is None:
+            contexto.respuesta = "No reconocí la fecha. Usa el formato dd/mm/aaaa HH:MM"
+            return
+        descripcion, contexto.sesion.evento_pendiente = contexto.sesion.evento_pendiente, None
+        previos, contexto.sesion.detalles_pendientes = contexto.sesion.detalles_pendientes, None
+        if previos is not None:
+            contexto.detalles = contexto.detalles._replace(
+                duracion=contexto.detalles.duracion or previos.duracion,
+                regla=contexto.detalles.regla or previos.regla)
+        self._guardar_evento(contexto, descripcion)
+
+    def _guardar_evento(self, contexto, descripcion):
+        try:
+            contexto.evento = contexto.agenda.agregar_evento(
+                descripcion, contexto.detalles.fecha, contexto.detalles.duracion, contexto.detalles.regla)
+        except ValueError as e:
+            contexto.respuesta = f"No pude guardar el evento: {e}"
+            return
+        evento = contexto.evento
+        contexto.respuesta = f"Evento agregado: {evento.descripcion} el {evento.fecha_str}"
+        if evento.regla is not None:
+            contexto.respuesta += f" ({describir_regla(evento.regla)})"
+        contexto.conflictos = contexto.agenda.conflictos(evento.fecha, evento.duracion, excluir=evento.id)
+        if contexto.conflictos:
+            contexto.respuesta += "\nOjo, se solapa con:\n" + formatear_eventos(contexto.conflictos)
+
+    def _consultar_evento(self, contexto):
+        contexto.periodo = extract_query_range(contexto.texto)
+        if contexto.periodo:
+            contexto.eventos = contexto.agenda.eventos_entre(*contexto.periodo)
+            if not contexto.eventos:
+                contexto.respuesta = "No tienes eventos programados para esa fecha"
+            else:
+                contexto.respuesta = "Tienes programado:\n" + formatear_eventos(contexto.eventos)
+            return
+
+        contexto.eventos = contexto.agenda.proximos_eventos(5)
+        if not contexto.eventos:
+            contexto.respuesta = "No tienes eventos próximos en tu agenda"
+        else:
+            contexto.respuesta = "Tus próximos eventos son:\n" + formatear_eventos(contexto.eventos)
+
+    def _consultar_libre(self, contexto):
+        duracion = extract_duration(contexto.texto)
+        minimo = duracion[0] if duracion else HUECO_MINIMO
+        texto = contexto.texto
+        if duracion:
+            # "de 3 horas" es la duración buscada, no el periodo (se leería como "hoy a las 3")
+            inicio, fin = duracion[1]
+            texto = texto[:inicio] + ' ' * (fin - inicio) + texto[fin:]
+        ahora = datetime.now().replace(second=0, microsecond=0)
+        contexto.periodo = extract_query_range(texto)
+        if not contexto.periodo:
+            inicio = self._primer_hueco(contexto.agenda, minimo, ahora)
+            if inicio is None:
+                contexto.respuesta = (f"No hay ningún hueco de {minimo} minutos entre las "
+                                      f"{HORARIO_LIBRE[0]}:00 y las {HORARIO_LIBRE[1]}:00 "
+                                      f"en los próximos {DIAS_BUSQUEDA_HUECO} días")
+            else:
+                contexto.respuesta = f"Tu próximo hueco de {minimo} minutos empieza el {inicio:%d/%m/%Y %H:%M}"
+            return
+
+        contexto.huecos = []
+        lineas = []
+        dia = contexto.periodo[0]
+        while dia < contexto.periodo[1]:
+            inicio = max(dia.replace(hour=HORARIO_LIBRE[0]), ahora)
+            fin = dia.replace(hour=HORARIO_LIBRE[1])
+            huecos = contexto.agenda.huecos_libres(inicio, fin, minimo) if inicio < fin else []
+            contexto.huecos.extend(huecos)
+            if huecos:
+                lineas.append(f"- {dia:%d/%m}: " + ", ".join(f"{a:%H:%M}-{b:%H:%M}" for a, b in huecos))
+            dia += timedelta(days=1)
+        if not lineas:
+            contexto.respuesta = f"No tienes huecos libres de {minimo} minutos en ese periodo"
+        else:
+            contexto.respuesta = "Tienes libre:\n" + "\n".join(lineas)
+
+    def _eliminar_evento(self, contexto):
+        # Se busca por las palabras de la descripción y, si se indica, por el periodo
+        contexto.detalles = extract_event_details(contexto.texto)
+        contexto.periodo = extract_query_range(contexto.texto)
+        terminos = [p for p in normalize(contexto.detalles.descripcion).split()
+                    if p not in PALABRAS_BORRADO and not p.isdigit()]
+        if not terminos and not contexto.periodo:
+            contexto.respuesta = "¿Qué evento quieres eliminar? Indica su descripción o su fecha"
+            return
+
+        if contexto.periodo:
+            candidatos = contexto.agenda.eventos_entre(*contexto.periodo)
+        else:
+            candidatos = contexto.agenda.buscar(terminos[0])
+        for termino in terminos:
+            coinciden = {e.id for e in contexto.agenda.buscar(termino)}
+            candidatos = [e for e in candidatos if e.id in coinciden]
+        # Las ocurrencias de una misma serie son un único evento
+        contexto.eventos = list({e.id: e for e in candidatos}.values())
+
+        if not contexto.eventos:
+            contexto.respuesta = "No encontré ningún evento que coincida"
+        elif len(contexto.eventos) > 1:
+            contexto.respuesta = ("Hay varios eventos que coinciden; indica cuál quieres eliminar:\n"
+                                  + formatear_eventos(contexto.eventos))
+        else:
+            evento = contexto.eventos[0]
+            if not contexto.agenda.eliminar_evento(evento.id):
+                contexto.respuesta = "No encontré ningún evento que coincida"
+                return
+            contexto.evento = evento
+            contexto.respuesta = f"Evento eliminado: {evento.descripcion} el {evento.fecha_str}"
+            if evento.regla is not None:
+                contexto.respuesta += " (toda la serie)"
+
+    @staticmethod
+    def _primer_hueco(agenda, minimo, ahora):
+        """Primer hueco dentro de HORARIO_LIBRE en los próximos DIAS_BUSQUEDA_HUECO días (o None)"""
+        dia = ahora.replace(hour=0, minute=0)
+        for _ in range(DIAS_BUSQUEDA_HUECO):
+            inicio = max(dia.replace(hour=HORARIO_LIBRE[0]), ahora)
+            fin = dia.replace(hour=HORARIO_LIBRE[1])
+            if fin - inicio >= timedelta(minutes=minimo):
+                hueco = agenda.siguiente_hueco(minimo, desde=inicio, hasta=fin)
+                if hueco is not None:
+                    return hueco
+            dia += timedelta(days=1)
+        return None
@@ -0,0 +1,231 @@
+"""
+Recordatorios de eventos con una cola de temporizadores en un min-heap.
+
+Cada evento pendiente ocupa una entrada (momento del aviso, secuencia, agenda, id).
+Programar y cancelar cuestan O(log N); las cancelaciones son perezosas (la entrada
+se descarta al salir del heap) y el heap se compacta cuando la mitad son restos.
+Un hilo duerme en una Condition hasta el siguiente aviso, sin sondear, y las
+series recurrentes solo tienen programada su próxima ocurrencia.
+"""
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+AVISO_POR_DEFECTO = timedelta(minutes=15)
+
+# agenda: clave con la que se registró la agenda (usuario); fecha: la de la ocurrencia avisada
+Recordatorio = namedtuple('Recordatorio', ['agenda', 'evento', 'fecha'])
+
+
+def texto_recordatorio(recordatorio):
+    fecha = recordatorio.fecha
+    return f"Recordatorio: {recordatorio.evento.descripcion} a las {fecha:%H:%M} ({fecha:%d/%m})"
+
+
+class PlanificadorRecordatorios:
+    """
+    Avisa `aviso` antes de cada evento llamando a notificar(Recordatorio) desde su propio hilo.
+    Las agendas se registran con vigilar(); a partir de ahí las altas y bajas llegan
+    como notificaciones de AgendaManager, sin volver a recorrer la agenda.
+    """
+
+    def __init__(self, notificar, aviso=AVISO_POR_DEFECTO, reloj=datetime.now):
+        self.notificar = notificar
+        self.aviso = aviso
+        self.reloj = reloj
+        # (momento, secuencia, clave de agenda, id de evento)
+        self._heap = []
+        # (clave de agenda, id) -> (momento, evento, fecha de la ocurrencia); la entrada viva del heap
+        self._programados = {}
+        self._secuencia = itertools.count()
+        self._condicion = threading.Condition()
+        self._hilo = None
+        self._detenido = False
+
+    def __len__(self):
+        return len(self._programados)
+
+    # --- Registro de agendas ------------------------------------------------
+
+    def vigilar(self, agenda, clave='local'):
+        """
+        Programa los eventos futuros de la agenda y se suscribe a sus cambios
+        Returns:
+            int: recordatorios programados
+        """
+        observador = _Observador(self, clave)
+        if observador not in agenda.observadores:
+            agenda.observadores.append(observador)
+        return self._programar_agenda(agenda, clave)
+
+    def vigilar_pool(self, pool):
+        """
+        Programa los eventos ya guardados de todos los usuarios del pool (sin dejar sus
+        agendas abiertas) y registra cada agenda en cuanto el pool la abre
+        Returns:
+            int: recordatorios programados al arrancar
+        """
+        pool.al_abrir.append(lambda usuario_id, agenda: self.vigilar(agenda, usuario_id))
+        return sum(self._programar_agenda(agenda, usuario_id)
+                   for usuario_id, agenda in pool.recorrer_guardadas())
+
+    def _programar_agenda(self, agenda, clave):
+        """Programa los eventos futuros de la agenda; los ya programados para la misma fecha se omiten"""
+        ahora = self.reloj()
+        # Se lee la agenda antes de tomar la condición: AgendaManager avisa a sus
+        # observadores con su propio lock tomado y el orden de los locks debe ser siempre el mismo
+        futuros = agenda.eventos_futuros(ahora)
+        entradas = []
+        with self._condicion:
+            for evento in futuros:
+                entrada = self._entrada(clave, evento, ahora)
+                if entrada is not None:
+                    entradas.append(entrada)
+            if len(entradas) > len(self._heap):
+                # Carga inicial masiva: heapify es O(N) frente a N inserciones O(log N)
+                self._heap.extend(entradas)
+                heapq.heapify(self._heap)
+            else:
+                for entrada in entradas:
+                    heapq.heappush(self._heap, entrada)
+            self._condicion.notify()
+        return len(entradas)
+
+    # --- Programación ---------------------------------------------------------
+
+    def _entrada(self, clave, evento, desde):
+        """Registra la próxima ocurrencia del evento y devuelve su entrada de heap (con la condición tomada)"""
+        fecha = next(evento.ocurrencias(desde), None)
+        if fecha is None:
+            self._programados.pop((clave, evento.id), None)
+            return None
+        fecha = fecha.fecha
+        anterior = self._programados.get((clave, evento.id))
+        if anterior is not None and anterior[2] == fecha:
+            # Ya programado (la agenda se volvió a abrir)
+            return None
+        momento = fecha - self.aviso
+        self._programados[(clave, evento.id)] = (momento, evento, fecha)
+        return momento, next(self._secuencia), clave, evento.id
+
+    def programar(self, clave, evento):
+        with self._condicion:
+            entrada = self._entrada(clave, evento, self.reloj())
+            if entrada is None:
+                return
+            heapq.heappush(self._heap, entrada)
+            # Solo hace falta despertar al hilo si el nuevo aviso es el más próximo
+            if self._heap[0] is entrada:
+                self._condicion.notify()
+
+    def cancelar(self, clave, evento_id):
+        with self._condicion:
+            if self._programados.pop((clave, evento_id), None) is not None:
+                self._compactar()
+
+    def _compactar(self):
+        """Rehace el heap sin las entradas canceladas cuando son mayoría (coste amortizado O(1))"""
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._programados):
+            self._heap = [e for e in self._heap if self._vigente(e)]
+            heapq.heapify(self._heap)
+
+    def _vigente(self, entrada):
+        momento, _, clave, evento_id = entrada
+        programado = self._programados.get((clave, evento_id))
+        return programado is not None and programado[0] == momento
+
+    def proximo(self):
+        """Momento del próximo aviso o None"""
+        with self._condicion:
+            self._descartar_cancelados()
+            return self._heap[0][0] if self._heap else None
+
+    def _descartar_cancelados(self):
+        while self._heap and not self._vigente(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    # --- Hilo de avisos -------------------------------------------------------
+
+    def vencidos(self, ahora=None):
+        """
+        Saca del heap los avisos cuyo momento ya llegó y reprograma las series
+        Returns:
+            list[Recordatorio]
+        """
+        ahora = ahora or self.reloj()
+        avisos = []
+        with self._condicion:
+            while True:
+                self._descartar_cancelados()
+                if not self._heap or self._heap[0][0] > ahora:
+                    break
+                _, _, clave, evento_id = heapq.heappop(self._heap)
+                _, evento, fecha = self._programados.pop((clave, evento_id))
+                avisos.append(Recordatorio(clave, evento, fecha))
+                if evento.regla is not None:
+                    # Desde ahora: tras una suspensión las ocurrencias perdidas no se avisan en ráfaga
+                    siguiente = self._entrada(clave, evento, max(fecha + timedelta(minutes=1), ahora))
+                    if siguiente is not None:
+                        heapq.heappush(self._heap, siguiente)
+        return avisos
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._detenido = False
+            self._hilo = threading.Thread(target=self._bucle, name='recordatorios', daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        with self._condicion:
+            self._detenido = True
+            self._condicion.notify()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while not self._detenido:
+                    self._descartar_cancelados()
+                    if self._heap:
+                        espera = (self._heap[0][0] - self.reloj()).total_seconds()
+                        if espera <= 0:
+                            break
+                        # Se despierta en el siguiente vencimiento o cuando se programa uno anterior
+                        self._condicion.wait(timeout=espera)
+                    else:
+                        self._condicion.wait()
+                if self._detenido:
+                    return
+            # notificar se llama fuera del lock: puede tardar o volver a programar
+            for recordatorio in self.vencidos():
+                try:
+                    self.notificar(recordatorio)
+                except Exception as e:
+                    print(f"Error al notificar un recordatorio: {e}")
+
+
+class _Observador:
+    """Traslada las altas y bajas de una agenda al planificador"""
+    __slots__ = ('planificador', 'clave')
+
+    def __init__(self, planificador, clave):
+        self.planificador = planificador
+        self.clave = clave
+
+    def __eq__(self, otro):
+        return (isinstance(otro, _Observador) and otro.planificador is self.planificador
+                and otro.clave == self.clave)
+
+    def __hash__(self):
+        return hash((id(self.planificador), self.clave))
+
+    def __call__(self, accion, evento):
+        if accion == 'agregado':
+            self.planificador.programar(self.clave, evento)
+        elif accion == 'eliminado':
+            self.planificador.cancelar(self.clave, evento.id)
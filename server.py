@@ -0,0 +1,286 @@
+"""
+Servidor asíncrono del chatbot de agenda (HTTP/1.1 con keep-alive, solo stdlib).
+
+    POST /chat   {"usuario": "ana", "sesion": "movil", "mensaje": "Agenda una reunión mañana a las 3pm"}
+              -> {"respuesta": "...", "intencion": "agregar_evento", "recordatorios": ["..."]}
+    GET  /salud  -> {"estado": "ok", "sesiones": N, "rutas_intencion": {...}, "agendas": {...}}
+
+Cada usuario tiene su propia agenda SQLite en data/usuarios/ (sin "usuario", se usa el id de sesión).
+Los recordatorios vencidos se entregan con la siguiente respuesta de /chat del usuario.
+
+Uso:
+    python server.py [--host 127.0.0.1] [--puerto 8080] [--hilos 4] [--agendas usuario|compartida]
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from agendas import AgendaPool
+from main import ChatbotCompleto
+from pipeline import ContextoMensaje, Sesion
+from recordatorios import PlanificadorRecordatorios, texto_recordatorio
+
+MAX_CUERPO = 64 * 1024
+
+
+class MicroBatcher:
+    """
+    Agrupa peticiones concurrentes en lotes: espera como mucho `espera_ms` (o hasta
+    `max_lote` elementos) y ejecuta `funcion_lote` una sola vez en el pool de hilos.
+    """
+
+    def __init__(self, funcion_lote, executor, max_lote=64, espera_ms=2.0):
+        self.funcion_lote = funcion_lote
+        self.executor = executor
+        self.max_lote = max_lote
+        self.espera = espera_ms / 1000
+        self._cola = asyncio.Queue()
+        self._tarea = None
+
+    def iniciar(self):
+        self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+
+    async def enviar(self, elemento):
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((elemento, futuro))
+        return await futuro
+
+    async def _bucle(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self._cola.get()]
+            limite = loop.time() + self.espera
+            while len(lote) < self.max_lote:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self._cola.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            elementos = [elemento for elemento, _ in lote]
+            try:
+                resultados = await loop.run_in_executor(self.executor, self.funcion_lote, elementos)
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            for (_, futuro), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
+
+
+class ServidorChat:
+    def __init__(self, bot=None, hilos=4, max_lote=64, espera_ms=2.0, ttl_sesion=1800):
+        self.bot = bot or ChatbotCompleto()
+        self.executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='chatbot')
+        # Solo la clasificación se agrupa; entidades y respuesta se completan por sesión
+        self.batcher = MicroBatcher(self.bot.pipeline.clasificar, self.executor,
+                                    max_lote=max_lote, espera_ms=espera_ms)
+        self.ttl_sesion = ttl_sesion
+        # id -> (Sesion, asyncio.Lock, último uso)
+        self.sesiones = {}
+        # usuario -> recordatorios pendientes de entregar (los más antiguos se descartan)
+        self.avisos = defaultdict(lambda: deque(maxlen=50))
+        self._loop = None
+
+    def avisar(self, recordatorio):
+        """Callback del planificador (otro hilo): encola el aviso en el bucle de eventos"""
+        texto = texto_recordatorio(recordatorio)
+        if self._loop is None:
+            self._encolar(recordatorio.agenda, texto)
+        else:
+            self._loop.call_soon_threadsafe(self._encolar, recordatorio.agenda, texto)
+
+    def _encolar(self, clave, texto):
+        # En el hilo del bucle: la cola se busca aquí para no añadir a una que _recoger_avisos ya sacó
+        self.avisos[clave].append(texto)
+
+    def _clave_avisos(self, sesion):
+        # Misma clave con la que se vigila la agenda: el usuario en el pool, 'local' en la compartida
+        if isinstance(self.bot.agenda, AgendaPool):
+            return sesion.usuario or sesion.id
+        return self.bot.sesion.id
+
+    def _recoger_avisos(self, sesion):
+        pendientes = self.avisos.pop(self._clave_avisos(sesion), None)
+        return list(pendientes) if pendientes else []
+
+    def _sesion(self, sesion_id, usuario=None):
+        # Las sesiones de usuarios distintos no se mezclan aunque repitan el id
+        clave = (usuario, sesion_id)
+        entrada = self.sesiones.get(clave)
+        if entrada is None:
+            entrada = [Sesion(id=sesion_id, usuario=usuario), asyncio.Lock(), 0.0]
+            self.sesiones[clave] = entrada
+        entrada[2] = time.monotonic()
+        return entrada
+
+    async def _purgar_sesiones(self):
+        """Elimina cada minuto las sesiones inactivas y cierra las agendas de usuario sin uso"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(60)
+            limite = time.monotonic() - self.ttl_sesion
+            for clave, (_, lock, ultimo_uso) in list(self.sesiones.items()):
+                if ultimo_uso < limite and not lock.locked():
+                    del self.sesiones[clave]
+            if isinstance(self.bot.agenda, AgendaPool):
+                await loop.run_in_executor(self.executor, self.bot.agenda.purgar_inactivas)
+
+    async def procesar(self, sesion_id, mensaje, usuario=None):
+        """Procesa un mensaje; los mensajes de una misma sesión se atienden en orden"""
+        sesion, lock, _ = self._sesion(sesion_id, usuario)
+        loop = asyncio.get_running_loop()
+        async with lock:
+            contexto = ContextoMensaje(mensaje, sesion)
+            # La inferencia se agrupa con la de otras sesiones en una sola pasada
+            await self.batcher.enviar(contexto)
+            await loop.run_in_executor(self.executor, self.bot.pipeline.completar, contexto)
+            return contexto.respuesta, contexto.intencion, self._recoger_avisos(sesion)
+
+    async def atender(self, reader, writer):
+        """Conexión HTTP/1.1 con keep-alive"""
+        try:
+            while True:
+                # readline() lanza ValueError si una línea supera el límite del stream (MAX_CUERPO)
+                try:
+                    linea = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    await self._responder(writer, 400, {"error": "Línea de petición demasiado larga"}, False)
+                    break
+                if not linea:
+                    break
+                try:
+                    metodo, ruta, _ = linea.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._responder(writer, 400, {"error": "Petición mal formada"}, False)
+                    break
+
+                cabeceras = {}
+                try:
+                    while (linea := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        nombre, _, valor = linea.decode('latin-1').partition(':')
+                        cabeceras[nombre.strip().lower()] = valor.strip()
+                except (ValueError, asyncio.LimitOverrunError):
+                    await self._responder(writer, 431, {"error": "Cabeceras demasiado grandes"}, False)
+                    break
+                mantener = cabeceras.get('connection', '').lower() != 'close'
+
+                longitud = cabeceras.get('content-length', '0') or '0'
+                if not (longitud.isascii() and longitud.isdigit()):
+                    # No se puede saber dónde acaba el cuerpo: se responde y se cierra la conexión
+                    await self._responder(writer, 400, {"error": "Content-Length no válido"}, False)
+                    break
+                longitud = int(longitud)
+                if longitud > MAX_CUERPO:
+                    await self._responder(writer, 413, {"error": "Cuerpo demasiado grande"}, False)
+                    break
+                cuerpo = await reader.readexactly(longitud) if longitud else b''
+
+                estado, datos = await self._enrutar(metodo, ruta, cuerpo)
+                await self._responder(writer, estado, datos, mantener)
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _enrutar(self, metodo, ruta, cuerpo):
+        if metodo == 'GET' and ruta == '/salud':
+            salud = {
+                "estado": "ok",
+                "sesiones": len(self.sesiones),
+                # Fracción del tráfico que resuelven las reglas sin pasar por el modelo
+                "rutas_intencion": self.bot.predictor.rule_stats(),
+            }
+            if isinstance(self.bot.agenda, AgendaPool):
+                salud["agendas"] = self.bot.agenda.stats()
+            if self.bot.recordatorios is not None:
+                salud["recordatorios_programados"] = len(self.bot.recordatorios)
+            return 200, salud
+        if metodo == 'POST' and ruta == '/chat':
+            try:
+                datos = json.loads(cuerpo or b'{}')
+                mensaje = str(datos['mensaje'])
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": "Se esperaba JSON con el campo 'mensaje'"}
+            try:
+                usuario = datos.get('usuario')
+                respuesta, intencion, avisos = await self.procesar(
+                    str(datos.get('sesion', 'anonima')), mensaje, None if usuario is None else str(usuario))
+            except Exception as e:
+                return 500, {"error": str(e)}
+            datos = {"respuesta": respuesta, "intencion": intencion}
+            if avisos:
+                datos["recordatorios"] = avisos
+            return 200, datos
+        return 404, {"error": "Ruta no encontrada"}
+
+    @staticmethod
+    async def _responder(writer, estado, datos, mantener):
+        motivos = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                   413: 'Payload Too Large', 431: 'Request Header Fields Too Large',
+                   500: 'Internal Server Error'}
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {estado} {motivos.get(estado, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n"
+            f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode('latin-1') + cuerpo
+        )
+        await writer.drain()
+
+    async def servir(self, host='127.0.0.1', puerto=8080):
+        self._loop = asyncio.get_running_loop()
+        self.batcher.iniciar()
+        purga = asyncio.create_task(self._purgar_sesiones())
+        servidor = await asyncio.start_server(self.atender, host, puerto, limit=MAX_CUERPO)
+        print(f"Chatbot de Agenda escuchando en http://{host}:{puerto}")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            purga.cancel()
+            await self.batcher.detener()
+            self.executor.shutdown(wait=False)
+            if self.bot.recordatorios is not None:
+                self.bot.recordatorios.detener()
+            if isinstance(self.bot.agenda, AgendaPool):
+                self.bot.agenda.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP del chatbot de agenda")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--max-lote', type=int, default=64)
+    parser.add_argument('--espera-ms', type=float, default=2.0)
+    parser.add_argument('--agendas', choices=('usuario', 'compartida'), default='usuario',
+                        help="una agenda por usuario (data/usuarios) o la agenda única de data/agenda.json")
+    parser.add_argument('--max-agendas', type=int, default=256, help="agendas de usuario abiertas a la vez")
+    args = parser.parse_args()
+
+    agenda = AgendaPool(max_abiertas=args.max_agendas) if args.agendas == 'usuario' else None
+    # El planificador avisa al servidor, que se crea después: se resuelve al llamar
+    recordatorios = PlanificadorRecordatorios(lambda recordatorio: servidor.avisar(recordatorio))
+    servidor = ServidorChat(ChatbotCompleto(agenda, recordatorios), hilos=args.hilos,
+                            max_lote=args.max_lote, espera_ms=args.espera_ms)
+    try:
+        asyncio.run(servidor.servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
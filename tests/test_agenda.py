@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from agenda_manager import AgendaManager
+
+LUNES = datetime(2030, 1, 7)
+
+
+@pytest.fixture
+def agenda(tmp_path):
+    agenda = AgendaManager(str(tmp_path / 'agenda.db'))
+    yield agenda
+    agenda.cerrar()
+
+
+def test_conflictos_detecta_solapes(agenda):
+    reunion = agenda.agregar_evento('Reunión', LUNES.replace(hour=10))
+    comida = agenda.agregar_evento('Comida', LUNES.replace(hour=12), duracion=30)
+
+    assert agenda.conflictos(LUNES.replace(hour=10, minute=30), 60) == [reunion]
+    assert agenda.conflictos(LUNES.replace(hour=9), 4 * 60) == [reunion, comida]
+    # Un evento que empieza justo cuando acaba otro no se solapa con él
+    assert agenda.conflictos(LUNES.replace(hour=11), 60) == []
+    assert agenda.conflictos(reunion.fecha, 60, excluir=reunion.id) == []
+
+
+def test_conflictos_con_una_serie(agenda):
+    yoga = agenda.agregar_evento('Yoga', LUNES.replace(hour=9), regla='FREQ=DAILY')
+
+    solapes = agenda.conflictos(LUNES.replace(day=10, hour=9, minute=30), 30)
+    assert [(e.id, e.fecha) for e in solapes] == [(yoga.id, LUNES.replace(day=10, hour=9))]
+    assert agenda.conflictos(LUNES.replace(day=10, hour=10), 30) == []
+
+
+def test_huecos_libres_alrededor_de_una_serie(agenda):
+    agenda.agregar_evento('Yoga', LUNES.replace(hour=9), regla='FREQ=DAILY')
+    martes = LUNES + timedelta(days=1)
+    agenda.agregar_evento('Dentista', martes.replace(hour=12))
+
+    huecos = agenda.huecos_libres(martes.replace(hour=8), martes.replace(hour=14), minimo=30)
+    assert huecos == [
+        (martes.replace(hour=8), martes.replace(hour=9)),
+        (martes.replace(hour=10), martes.replace(hour=12)),
+        (martes.replace(hour=13), martes.replace(hour=14)),
+    ]
+    # Los huecos más cortos que el mínimo no se devuelven
+    assert agenda.huecos_libres(martes.replace(hour=8), martes.replace(hour=14), minimo=90) == [huecos[1]]
+
+
+def test_siguiente_hueco_salta_las_ocurrencias(agenda):
+    agenda.agregar_evento('Yoga', LUNES.replace(hour=9), regla='FREQ=DAILY')
+
+    assert agenda.siguiente_hueco(60, desde=LUNES.replace(day=9, hour=9)) == LUNES.replace(day=9, hour=10)
+
+
+def test_siguiente_hueco_sin_hasta_esta_acotado(agenda):
+    # Una serie diaria de 24 horas no deja ningún hueco: la búsqueda termina en HORIZONTE_HUECOS
+    agenda.agregar_evento('Guardia', LUNES, duracion=24 * 60, regla='FREQ=DAILY')
+
+    assert agenda.siguiente_hueco(30, desde=LUNES) is None
+
+
+def test_siguiente_hueco_sin_series_ni_hasta(agenda):
+    agenda.agregar_evento('Reunión', LUNES.replace(hour=10))
+
+    assert agenda.siguiente_hueco(30, desde=LUNES.replace(hour=10)) == LUNES.replace(hour=11)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from agenda_manager import AgendaManager
+from agendas import AgendaPool
+from recordatorios import AVISO_POR_DEFECTO, PlanificadorRecordatorios
+
+INICIO = datetime(2030, 1, 7, 8, 0)
+
+
+class Reloj:
+    """Reloj manual para el planificador"""
+
+    def __init__(self, ahora):
+        self.ahora = ahora
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj():
+    return Reloj(INICIO)
+
+
+@pytest.fixture
+def agenda(tmp_path):
+    agenda = AgendaManager(str(tmp_path / 'agenda.db'))
+    yield agenda
+    agenda.cerrar()
+
+
+def test_cancelar_al_eliminar(agenda, reloj):
+    planificador = PlanificadorRecordatorios(lambda r: None, reloj=reloj)
+    planificador.vigilar(agenda, 'ana')
+    reunion = agenda.agregar_evento('Reunión', INICIO.replace(hour=10))
+    dentista = agenda.agregar_evento('Dentista', INICIO.replace(hour=12))
+    assert len(planificador) == 2
+
+    agenda.eliminar_evento(reunion.id)
+
+    assert len(planificador) == 1
+    assert planificador.proximo() == dentista.fecha - AVISO_POR_DEFECTO
+    avisos = planificador.vencidos(INICIO.replace(hour=23))
+    assert [(r.agenda, r.evento.id) for r in avisos] == [('ana', dentista.id)]
+
+
+def test_serie_tras_una_caida(agenda, reloj):
+    planificador = PlanificadorRecordatorios(lambda r: None, reloj=reloj)
+    agenda.agregar_evento('Yoga', INICIO.replace(hour=10), regla='FREQ=DAILY')
+    planificador.vigilar(agenda, 'ana')
+
+    # Tres días sin procesar avisos: solo se avisa una vez y la serie sigue desde ahora
+    reloj.ahora = INICIO + timedelta(days=3, hours=4)
+    avisos = planificador.vencidos()
+
+    assert [r.fecha for r in avisos] == [INICIO.replace(hour=10)]
+    assert planificador.proximo() == INICIO.replace(day=11, hour=10) - AVISO_POR_DEFECTO
+    assert len(planificador) == 1
+
+
+def test_vigilar_pool_programa_las_agendas_guardadas(tmp_path, reloj):
+    pool = AgendaPool(tmp_path)
+    with pool.usar('ana') as agenda:
+        reunion = agenda.agregar_evento('Reunión', INICIO.replace(hour=10))
+    pool.cerrar()
+
+    # Tras reiniciar, los eventos se programan sin esperar a que el usuario escriba
+    pool = AgendaPool(tmp_path)
+    planificador = PlanificadorRecordatorios(lambda r: None, reloj=reloj)
+    assert planificador.vigilar_pool(pool) == 1
+    assert len(pool) == 0
+
+    # Abrir la agenda no duplica el aviso, y las bajas siguen llegando al planificador
+    with pool.usar('ana') as agenda:
+        assert len(planificador) == 1
+        agenda.eliminar_evento(reunion.id)
+    assert len(planificador) == 0
+    pool.cerrar()
@@ -1,14 +1,18 @@
+import argparse
+import itertools
 import json
+import multiprocessing as mp
+import os
 import random
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import shared_memory
 import numpy as np
 import pickle
 import nltk
-from nltk.stem import PorterStemmer
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout, BatchNormalization
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 import sys
 from pathlib import Path
 
@@ -16,87 +20,460 @@ from pathlib import Path
 BASE_DIR = Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR))
 
-from utils.preprocessing import tokenize, stem, bag_of_words, clean_text  # Nueva función clean_text
+from utils.preprocessing import tokenize, stem, clean_tokens
+from utils.vocabulary import Vocabulary
+from model.numpy_engine import PRECISIONES, NumpyIntentModel
+from model.classifiers import BUNDLES, CLASIFICADORES, bundle_name, save_bundle
+from model import versioning
 
-# Descargar recursos de NLTK
-nltk.download('punkt', quiet=True)
+# Rejilla de --search: tamaños de las capas ocultas, dropout y learning rate
+SEARCH_GRID = {
+    'capas': [(256, 128, 64), (128, 64), (64,)],
+    'dropout': [0.3, 0.5],
+    'learning_rate': [0.001, 0.003],
+}
 
-def load_and_preprocess_data():
+def load_intents():
+    with open(BASE_DIR/'data'/'intents.json', encoding='utf-8') as file:
+        return json.load(file)
+
+def load_and_preprocess_data(data=None):
     """Carga y preprocesa los datos de entrenamiento"""
     # Cargar datos
-    with open(BASE_DIR/'data'/'intents.json', encoding='utf-8') as file:
-        data = json.load(file)
+    if data is None:
+        data = load_intents()
     
-    palabras = []
+    palabras = set()
     tags = []
     xy = []
+    token_cache = {}
     
-    # Preprocesamiento mejorado
+    # Cada patrón se tokeniza y limpia una sola vez (los repetidos salen de la caché)
     for intent in data['intents']:
         tag = intent['tag']
         tags.append(tag)
         for pattern in intent['patterns']:
-            # Limpieza adicional del texto
-            cleaned_text = clean_text(pattern)
-            tokens = tokenize(cleaned_text)
-            palabras.extend(tokens)
+            tokens = token_cache.get(pattern)
+            if tokens is None:
+                tokens = token_cache[pattern] = clean_tokens(tokenize(pattern))
+            palabras.update(tokens)
             xy.append((tokens, tag))
     
-    # Stemming y filtrado
-    palabras = [stem(w) for w in palabras if w not in ["?", "!", ".", ","]]
-    palabras = sorted(list(set(palabras)))
+    # Stemming (memorizado) y filtrado
+    palabras = sorted({stem(w) for w in palabras if w not in ["?", "!", ".", ","]})
     tags = sorted(list(set(tags)))
     
     return palabras, tags, xy
 
-def create_model(input_shape, output_shape):
-    """Crea un modelo mejorado de red neuronal"""
-    model = Sequential([
-        Dense(256, input_shape=input_shape, activation='relu'),
-        BatchNormalization(),
-        Dropout(0.6),
-        Dense(128, activation='relu'),
-        BatchNormalization(),
-        Dropout(0.5),
-        Dense(64, activation='relu'),
-        BatchNormalization(),
-        Dropout(0.4),
-        Dense(output_shape, activation='softmax')
-    ])
-    
-    optimizer = Adam(learning_rate=0.001)
+def build_training_data(palabras, tags, xy):
+    """
+    Construye X (bag-of-words) e y (one-hot) con una única dispersión vectorizada
+    Returns:
+        tuple: (X, y) como matrices float32
+    """
+    vocabulary = Vocabulary(palabras)
+    tag_index = {tag: i for i, tag in enumerate(tags)}
+    
+    X = vocabulary.encode_batch([tokens for tokens, _ in xy])
+    y = np.eye(len(tags), dtype=np.float32)[[tag_index[tag] for _, tag in xy]]
+    return X, y
+
+def create_model(input_shape, output_shape, capas=(256, 128, 64), dropout=(0.6, 0.5, 0.4),
+                 learning_rate=0.001):
+    """
+    Crea un modelo mejorado de red neuronal
+    Args:
+        capas (tuple): Unidades de cada capa oculta (Dense + BatchNormalization + Dropout)
+        dropout (float | tuple): Dropout común o uno por capa
+    """
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Dropout, BatchNormalization
+    from tensorflow.keras.optimizers import Adam
+    
+    if isinstance(dropout, (int, float)):
+        dropout = [dropout] * len(capas)
+    layers = []
+    for i, (unidades, tasa) in enumerate(zip(capas, dropout)):
+        extra = {'input_shape': input_shape} if i == 0 else {}
+        layers += [Dense(unidades, activation='relu', **extra), BatchNormalization(), Dropout(tasa)]
+    model = Sequential(layers + [Dense(output_shape, activation='softmax')])
+    
+    optimizer = Adam(learning_rate=learning_rate)
     model.compile(loss='categorical_crossentropy',
                  optimizer=optimizer,
                  metrics=['accuracy'])
     
     return model
 
-def main():
+def train_light_backends(X_train, y_train, X_val, y_val):
+    """
+    Entrena los clasificadores ligeros (centroide, logístico) sobre el mismo split que la red
+    Returns:
+        dict: {backend: (modelo, val_accuracy)}
+    """
+    y_train_idx, y_val_idx = y_train.argmax(axis=1), y_val.argmax(axis=1)
+    resultados = {}
+    for backend, clasificador in CLASIFICADORES.items():
+        modelo = clasificador.fit(X_train, y_train_idx, y_train.shape[1])
+        accuracy = float((modelo.predict(X_val).argmax(axis=1) == y_val_idx).mean())
+        resultados[backend] = (modelo, accuracy)
+    return resultados
+
+def load_previous_resources(manifest):
+    """Vocabulario y tags con los que se entrenó la versión publicada"""
+    if manifest:
+        _, palabras, tags = NumpyIntentModel.load_npz(versioning.MODEL_DIR / manifest['bundle'])
+        return palabras, tags
+    with open(BASE_DIR/'model'/'palabras.pkl', 'rb') as f:
+        palabras = pickle.load(f)
+    with open(BASE_DIR/'model'/'tags.pkl', 'rb') as f:
+        tags = pickle.load(f)
+    return palabras, tags
+
+def warm_start(model, previous_path, previous_words, palabras, previous_tags, tags):
+    """
+    Copia los pesos del modelo anterior en uno con vocabulario/tags ampliados.
+    Las filas de la primera Dense se asignan por palabra y las columnas de la
+    salida por tag; las capas ocultas se copian tal cual. Lo nuevo conserva la
+    inicialización aleatoria.
+    Raises:
+        ValueError: si las capas ocultas del modelo anterior no tienen la misma forma
+    """
+    from tensorflow.keras.models import load_model
+    
+    previous = load_model(previous_path, compile=False)
+    _check_same_architecture(previous, model)
+    word_index = {w: i for i, w in enumerate(palabras)}
+    tag_index = {t: i for i, t in enumerate(tags)}
+    old_rows = [i for i, w in enumerate(previous_words) if w in word_index]
+    new_rows = [word_index[previous_words[i]] for i in old_rows]
+    old_cols = [i for i, t in enumerate(previous_tags) if t in tag_index]
+    new_cols = [tag_index[previous_tags[i]] for i in old_cols]
+    
+    first, last = model.layers[0], model.layers[-1]
+    for previous_layer, layer in zip(previous.layers, model.layers):
+        weights = previous_layer.get_weights()
+        if not weights:
+            continue
+        if layer is first:
+            kernel, _ = layer.get_weights()
+            kernel[new_rows] = weights[0][old_rows]
+            layer.set_weights([kernel, weights[1]])
+        elif layer is last:
+            kernel, bias = layer.get_weights()
+            kernel[:, new_cols] = weights[0][:, old_cols]
+            bias[new_cols] = weights[1][old_cols]
+            layer.set_weights([kernel, bias])
+        else:
+            layer.set_weights(weights)
+    return model
+
+def quantization_report(version_dir, X, y):
+    """
+    Compara los bundles float16/int8 de una versión con el float32 sobre X
+    Returns:
+        list[dict]: precisión, accuracy, acuerdo con float32, error máximo de probabilidad y tamaños
+    """
+    y_idx = y.argmax(axis=1)
+    report = []
+    reference = None
+    for precision in PRECISIONES:
+        path = version_dir/bundle_name('mlp', precision)
+        model, _, _ = NumpyIntentModel.load_npz(path)
+        probs = model.predict(X)
+        if reference is None:
+            reference = probs
+        pred = probs.argmax(axis=1)
+        report.append({
+            'precision': precision,
+            'accuracy': float((pred == y_idx).mean()),
+            'acuerdo_float32': float((pred == reference.argmax(axis=1)).mean()),
+            'error_max_prob': float(np.abs(probs - reference).max()),
+            'pesos_bytes': model.nbytes,
+            'fichero_bytes': path.stat().st_size,
+        })
+    with open(version_dir/'cuantizacion.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def print_quantization_report(report):
+    print("- Cuantización (sobre todo intents.json):")
+    for fila in report:
+        print(f"    {fila['precision']:>7}: accuracy {fila['accuracy']:.4f}, "
+              f"acuerdo con float32 {fila['acuerdo_float32']:.2%}, "
+              f"error máx. prob {fila['error_max_prob']:.4f}, "
+              f"pesos {fila['pesos_bytes'] / 1024:.0f} KiB, fichero {fila['fichero_bytes'] / 1024:.0f} KiB")
+
+def _check_same_architecture(previous, model):
+    """Comprueba capa a capa las formas de los pesos, salvo las que dependen del vocabulario y los tags"""
+    if len(previous.layers) != len(model.layers):
+        raise ValueError(f"{len(previous.layers)} capas en el modelo anterior y {len(model.layers)} en el nuevo")
+    last = len(model.layers) - 1
+    for i, (previous_layer, layer) in enumerate(zip(previous.layers, model.layers)):
+        shapes = [w.shape for w in previous_layer.get_weights()]
+        new_shapes = [w.shape for w in layer.get_weights()]
+        if i == 0 and shapes:
+            shapes[0], new_shapes[0] = shapes[0][1:], new_shapes[0][1:]
+        if i == last and shapes:
+            shapes, new_shapes = [shapes[0][:1]], [new_shapes[0][:1]]
+        if shapes != new_shapes:
+            raise ValueError(f"La capa {layer.name} no coincide con la del modelo anterior")
+
+def model_config(arquitectura):
+    """Argumentos de create_model a partir de la arquitectura guardada en el manifest (listas JSON)"""
+    return {k: tuple(v) if isinstance(v, list) else v for k, v in (arquitectura or {}).items()}
+
+def _replace_file(src, dst):
+    """Copia src sobre dst de forma atómica (un proceso que arranque nunca lee un fichero a medias)"""
+    tmp = Path(f"{dst}.tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+def publish_version(model, palabras, tags, manifest, fingerprint, mode, val_accuracy,
+                    light_models=None, arquitectura=None):
+    """
+    Guarda la versión en model/versiones/vN y la publica en el manifest.
+    `arquitectura` (argumentos de create_model) se guarda para que --incremental
+    reconstruya la misma red; sin ella se asume la de create_model por defecto.
+    También actualiza los artefactos de siempre (modelo_chatbot.h5/.npz y sus
+    variantes float16/int8, .pkl, bundles de los clasificadores ligeros) para
+    los procesos que arranquen después.
+    """
+    version, version_dir = versioning.new_version_dir(manifest)
+    model.save(version_dir/'modelo_chatbot.h5')
+    numpy_model = NumpyIntentModel.from_h5(version_dir/'modelo_chatbot.h5')
+    numpy_model.save_npz(version_dir/BUNDLES['mlp'], palabras, tags)
+    quantized = [precision for precision in PRECISIONES if precision != 'float32']
+    for precision in quantized:
+        numpy_model.cuantizar(precision).save_npz(version_dir/bundle_name('mlp', precision), palabras, tags)
+    for backend, light_model in (light_models or {}).items():
+        save_bundle(light_model, version_dir/BUNDLES[backend], palabras, tags)
+    
+    _replace_file(version_dir/'modelo_chatbot.h5', BASE_DIR/'model'/'modelo_chatbot.h5')
+    for name in [bundle_name('mlp', p) for p in PRECISIONES] + [BUNDLES[b] for b in (light_models or {})]:
+        _replace_file(version_dir/name, BASE_DIR/'model'/name)
+    with open(BASE_DIR/'model'/'palabras.pkl', 'wb') as f:
+        pickle.dump(palabras, f)
+    with open(BASE_DIR/'model'/'tags.pkl', 'wb') as f:
+        pickle.dump(tags, f)
+    
+    # El manifest se escribe el último: los predictores solo ven versiones completas
+    relative = version_dir.relative_to(versioning.MODEL_DIR)
+    versioning.write_manifest({
+        'version': version,
+        'modelo': str(relative/'modelo_chatbot.h5'),
+        'bundle': str(relative/BUNDLES['mlp']),
+        'bundles': {backend: str(relative/BUNDLES[backend]) for backend in (light_models or {})},
+        'cuantizados': {precision: str(relative/bundle_name('mlp', precision)) for precision in quantized},
+        'intents': fingerprint,
+        'modo': mode,
+        **({'arquitectura': arquitectura} if arquitectura else {}),
+        'val_accuracy': val_accuracy,
+        'creado_en': datetime.now().isoformat(timespec='seconds'),
+    })
+    return version, version_dir
+
+# Estado de cada proceso de la búsqueda (vista de X en memoria compartida, etiquetas y folds)
+_search_worker = {}
+
+def _init_search_worker(shm_name, shape, dtype, y_idx, splits):
+    """Inicializador del pool: se engancha a X sin copiarlo y limita TensorFlow a un hilo"""
+    import tensorflow as tf
+
+    # Un proceso por núcleo: con hilos internos de TF se pisarían entre ellos
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    X = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    X.flags.writeable = False
+    _search_worker.update(shm=shm, X=X, y=y_idx, splits=splits)
+
+def _evaluate_fold(config_index, config, fold, epochs):
+    """
+    Entrena una configuración sobre un fold
+    Returns:
+        tuple: (config_index, fold, mejor val_accuracy, época de la mejor, segundos)
+    """
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    X, y = _search_worker['X'], _search_worker['y']
+    train_idx, val_idx = _search_worker['splits'][fold]
+    Y = np.eye(int(y.max()) + 1, dtype=np.float32)[y]
+    model = create_model((X.shape[1],), Y.shape[1], **config)
+    inicio = time.perf_counter()
+    history = model.fit(
+        X[train_idx], Y[train_idx],
+        epochs=epochs,
+        batch_size=16,
+        validation_data=(X[val_idx], Y[val_idx]),
+        callbacks=[EarlyStopping(monitor='val_accuracy', patience=10, restore_best_weights=True)],
+        verbose=0
+    )
+    accuracy = history.history['val_accuracy']
+    best = int(np.argmax(accuracy))
+    return config_index, fold, float(accuracy[best]), best + 1, time.perf_counter() - inicio
+
+def search_hyperparameters(X, y, grid=SEARCH_GRID, folds=5, workers=None, epochs=150):
+    """
+    Validación cruzada estratificada de cada combinación de la rejilla, repartida
+    en procesos. X se copia una sola vez a memoria compartida; a los procesos solo
+    les llegan las etiquetas, los índices de los folds y la configuración de cada tarea.
+    Returns:
+        list[dict]: leaderboard ordenado (mejor accuracy media y, a igualdad, menor desviación)
+    """
+    y_idx = y.argmax(axis=1)
+    # Cada fold necesita al menos un ejemplo de la intención con menos patrones
+    folds = min(folds, int(np.bincount(y_idx).min()))
+    if folds < 2:
+        raise ValueError("Hay intenciones con un solo patrón: no se puede validar en k folds")
+    splits = list(StratifiedKFold(folds, shuffle=True, random_state=42).split(X, y_idx))
+    configs = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    workers = workers or os.cpu_count()
+    resultados = {i: [] for i in range(len(configs))}
+
+    shm = shared_memory.SharedMemory(create=True, size=X.nbytes)
+    try:
+        np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+        # spawn: TensorFlow no es seguro tras un fork y cada proceso lo inicializa limpio
+        with ProcessPoolExecutor(workers, mp_context=mp.get_context('spawn'),
+                                 initializer=_init_search_worker,
+                                 initargs=(shm.name, X.shape, X.dtype.str, y_idx, splits)) as pool:
+            futures = [pool.submit(_evaluate_fold, i, config, fold, epochs)
+                       for i, config in enumerate(configs) for fold in range(folds)]
+            for hechas, future in enumerate(as_completed(futures), 1):
+                i, fold, accuracy, epoca, segundos = future.result()
+                resultados[i].append((accuracy, epoca, segundos))
+                print(f"[{hechas}/{len(futures)}] {configs[i]} fold {fold + 1}: {accuracy:.4f}")
+    finally:
+        shm.close()
+        shm.unlink()
+
+    leaderboard = []
+    for i, config in enumerate(configs):
+        accuracy, epocas, segundos = map(np.array, zip(*resultados[i]))
+        leaderboard.append({
+            'config': {k: list(v) if isinstance(v, tuple) else v for k, v in config.items()},
+            'accuracy_media': float(accuracy.mean()),
+            'accuracy_std': float(accuracy.std()),
+            'accuracy_folds': accuracy.tolist(),
+            # Épocas con las que se reentrena sobre todos los datos si gana esta configuración
+            'epocas': int(np.median(epocas)),
+            'segundos': float(segundos.sum()),
+        })
+    leaderboard.sort(key=lambda fila: (-fila['accuracy_media'], fila['accuracy_std']))
+    return leaderboard
+
+def run_search(args, X, y, palabras, tags, manifest, fingerprint):
+    """--search: leaderboard de la rejilla y publicación del mejor modelo reentrenado con todos los datos"""
+    inicio = time.perf_counter()
+    leaderboard = search_hyperparameters(X, y, folds=args.folds, workers=args.workers,
+                                         epochs=args.epochs or 150)
+    tiempo_busqueda = time.perf_counter() - inicio
+    leaderboard_path = BASE_DIR/'model'/'leaderboard.json'
+    with open(leaderboard_path, 'w', encoding='utf-8') as f:
+        json.dump(leaderboard, f, indent=2)
+
+    print("\nLeaderboard (accuracy media ± desviación en validación cruzada):")
+    for puesto, fila in enumerate(leaderboard, 1):
+        print(f"{puesto:>3}. {fila['accuracy_media']:.4f} ± {fila['accuracy_std']:.4f}  "
+              f"{fila['config']}  ({fila['epocas']} épocas)")
+
+    best = leaderboard[0]
+    model = create_model((X.shape[1],), y.shape[1], **model_config(best['config']))
+    model.fit(X, y, epochs=best['epocas'], batch_size=16, verbose=0)
+    model.save(BASE_DIR/'model'/'best_model.h5')
+    y_idx = y.argmax(axis=1)
+    light = {backend: clasificador.fit(X, y_idx, y.shape[1]) for backend, clasificador in CLASIFICADORES.items()}
+    version, version_dir = publish_version(
+        model, palabras, tags, manifest, fingerprint, 'busqueda', best['accuracy_media'], light,
+        arquitectura=best['config']
+    )
+    shutil.copyfile(leaderboard_path, version_dir/'leaderboard.json')
+    report = quantization_report(version_dir, X, y)
+
+    print("\n✅ Búsqueda completada:")
+    print(f"- Combinaciones: {len(leaderboard)} × {len(best['accuracy_folds'])} folds")
+    print(f"- Búsqueda: {tiempo_busqueda:.2f} s ({args.workers or os.cpu_count()} procesos)")
+    print(f"- Mejor configuración: {best['config']}")
+    print(f"- Accuracy media (CV): {best['accuracy_media']:.4f} ± {best['accuracy_std']:.4f}")
+    print(f"- Versión publicada: v{version} ({version_dir})")
+    print(f"- Leaderboard: {leaderboard_path}")
+    print_quantization_report(report)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena el clasificador de intenciones")
+    parser.add_argument('--incremental', action='store_true',
+                        help="reentrena solo si cambió intents.json, partiendo de best_model.h5")
+    parser.add_argument('--epochs', type=int, default=None,
+                        help="épocas máximas (300 completo, 60 incremental, 150 por fold en --search)")
+    parser.add_argument('--search', action='store_true',
+                        help="validación cruzada en paralelo sobre SEARCH_GRID y publica la mejor red")
+    parser.add_argument('--folds', type=int, default=5, help="folds de --search")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="procesos de --search (por defecto, uno por núcleo)")
+    args = parser.parse_args(argv)
+    if args.search and args.incremental:
+        parser.error("--search y --incremental no se pueden combinar")
+
+    # Descargar recursos de NLTK
+    nltk.download('punkt', quiet=True)
+    from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+    
     # 1. Cargar y preprocesar datos
-    palabras, tags, xy = load_and_preprocess_data()
+    inicio = time.perf_counter()
+    data = load_intents()
+    fingerprint = versioning.intents_fingerprint(data)
+    manifest = versioning.read_manifest()
+    best_model_path = BASE_DIR/'model'/'best_model.h5'
     
-    # 2. Preparar datos de entrenamiento
-    X = []
-    y = []
+    incremental = args.incremental
+    if incremental and not best_model_path.exists():
+        print("No hay best_model.h5 del que partir: se entrena desde cero")
+        incremental = False
+    if incremental and manifest:
+        changed = versioning.changed_intents(manifest.get('intents', {}), fingerprint)
+        removed = sorted(set(manifest.get('intents', {})) - set(fingerprint))
+        if not changed and not removed:
+            print(f"intents.json sin cambios: la versión {manifest['version']} sigue vigente")
+            return
+        print(f"Intenciones modificadas: {', '.join(changed + removed)}")
+    
+    palabras, tags, xy = load_and_preprocess_data(data)
+    if incremental:
+        # Se amplía el vocabulario anterior para no perder lo aprendido con sus palabras
+        previous_words, previous_tags = load_previous_resources(manifest)
+        palabras = sorted(set(palabras) | set(previous_words))
     
-    for (pattern_sentence, tag) in xy:
-        bow = bag_of_words(pattern_sentence, palabras)
-        X.append(bow)
-        y.append(tags.index(tag))
+    # 2. Preparar datos de entrenamiento
+    X, y = build_training_data(palabras, tags, xy)
+    tiempo_preprocesamiento = time.perf_counter() - inicio
     
-    X = np.array(X)
-    y = np.eye(len(tags))[y]  # One-hot encoding
+    if args.search:
+        run_search(args, X, y, palabras, tags, manifest, fingerprint)
+        return
     
     # 3. Dividir en train y validation
+    # Estratificado: todas las intenciones tienen ejemplos en train y en validación
     X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=0.2, random_state=42
+        X, y, test_size=0.2, random_state=42, stratify=y.argmax(axis=1)
     )
     
     # 4. Crear y entrenar el modelo
-    model = create_model((X_train.shape[1],), y_train.shape[1])
+    # Incremental: la misma red que la versión publicada (p. ej. la elegida por --search)
+    arquitectura = manifest.get('arquitectura') if incremental else None
+    model = create_model((X_train.shape[1],), y_train.shape[1], **model_config(arquitectura))
+    if incremental:
+        try:
+            warm_start(model, best_model_path, previous_words, palabras, previous_tags, tags)
+            model.optimizer.learning_rate.assign(0.0005)
+        except ValueError as e:
+            print(f"best_model.h5 no es compatible ({e}): se entrena desde cero")
+            incremental = False
+            model = create_model((X_train.shape[1],), y_train.shape[1], **model_config(arquitectura))
+    epochs = args.epochs or (60 if incremental else 300)
     
     callbacks = [
-        EarlyStopping(patience=10, restore_best_weights=True),
+        EarlyStopping(patience=5 if incremental else 10, restore_best_weights=True),
         ModelCheckpoint(
             str(BASE_DIR/'model'/'best_model.h5'),
             save_best_only=True,
@@ -104,28 +481,41 @@ def main():
         )
     ]
     
+    inicio = time.perf_counter()
     history = model.fit(
         X_train, y_train,
-        epochs=300,
+        epochs=epochs,
         batch_size=16,
         validation_data=(X_val, y_val),
         callbacks=callbacks,
         verbose=1
     )
+    tiempo_entrenamiento = time.perf_counter() - inicio
     
-    # 5. Guardar recursos finales
-    model.save(BASE_DIR/'model'/'modelo_chatbot.h5')
+    # 5. Clasificadores ligeros alternativos (milisegundos de entrenamiento)
+    light = train_light_backends(X_train, y_train, X_val, y_val)
     
-    with open(BASE_DIR/'model'/'palabras.pkl', 'wb') as f:
-        pickle.dump(palabras, f)
-    
-    with open(BASE_DIR/'model'/'tags.pkl', 'wb') as f:
-        pickle.dump(tags, f)
+    # 6. Guardar y publicar la versión (incluye el bundle NumPy con BN plegada)
+    val_accuracy = float(max(history.history['val_accuracy']))
+    version, version_dir = publish_version(
+        model, palabras, tags, manifest, fingerprint,
+        'incremental' if incremental else 'completo', val_accuracy,
+        {backend: modelo for backend, (modelo, _) in light.items()},
+        arquitectura=arquitectura
+    )
+    report = quantization_report(version_dir, X, y)
     
     print("\n✅ Entrenamiento completado:")
+    print(f"- Modo: {'incremental' if incremental else 'completo'} ({len(history.history['loss'])} épocas)")
     print(f"- Vocabulario: {len(palabras)} palabras")
     print(f"- Intenciones: {len(tags)} tags")
-    print(f"- Mejor val_accuracy: {max(history.history['val_accuracy']):.4f}")
+    print(f"- Versión publicada: v{version} ({version_dir})")
+    print(f"- Preprocesamiento: {tiempo_preprocesamiento:.2f} s ({len(xy)} patrones)")
+    print(f"- Entrenamiento (fit): {tiempo_entrenamiento:.2f} s")
+    print(f"- Mejor val_accuracy: {val_accuracy:.4f}")
+    for backend, (_, accuracy) in light.items():
+        print(f"- val_accuracy {backend}: {accuracy:.4f}")
+    print_quantization_report(report)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,45 +1,288 @@
-import dateparser
 import re
-from datetime import datetime
-
-def extract_datetime(text):
-    """Versión simplificada como alternativa"""
-    try:
-        parsed_date = dateparser.parse(text, languages=['es'])
-        if parsed_date:
-            return parsed_date.strftime("%d/%m/%Y %H:%M")
-        return None
-    except:
-        return None
-
-def extract_event_description(text, date_str):
-    """Extrae descripción eliminando componentes de fecha"""
-    try:
-        if not date_str:
-            return text.capitalize()
-            
-        date_obj = datetime.strptime(date_str, "%d/%m/%Y %H:%M")
-        
-        # Expresiones para eliminar
-        patterns = [
-            r'\b(?:el|para|a las?|el día|el|la|los|mi|una|agenda|agendar|programa)\b',
-            date_str,
-            date_obj.strftime("%d de %B").lower(),
-            date_obj.strftime("%A").lower(),
-            r'\d{1,2}(?::\d{2})?\s?(?:am|pm|de la mañana|de la tarde)?',
-            r'\b(?:próximo|próxima|siguiente)\b'
-        ]
-        
-        clean_text = text.lower()
-        for pattern in patterns:
-            clean_text = re.sub(pattern, '', clean_text, flags=re.IGNORECASE)
-        
-        # Limpieza final
-        clean_text = re.sub(r'[^\w\s]', '', clean_text)
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-        
-        return clean_text.capitalize() if clean_text else "Evento sin descripción"
-    
-    except Exception as e:
-        print(f"Error extrayendo descripción: {str(e)}")
-        return text.capitalize()
\ No newline at end of file
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+from evento import FORMATO_FECHA
+from utils import metrics
+
+# Resultado de la extracción: fecha interpretada y tramos (inicio, fin) del texto que la expresan
+FechaExtraida = namedtuple('FechaExtraida', ['fecha', 'spans'])
+
+MESES = {'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+         'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10,
+         'noviembre': 11, 'diciembre': 12}
+
+_DIAS = r'lunes|martes|mi[ée]rcoles|jueves|viernes|s[áa]bado|domingo'
+
+# Día: relativo, día de la semana, "31 de mayo [de 2025]" o "31/05[/2025]"
+_RE_DIA = re.compile(
+    r'(?P<rel>\bpasado\s+mañana\b|(?<!la\s)\bmañana\b|\bhoy\b)'
+    r'|(?:\b(?:el|este)\s+)?(?:\b(?P<prox>próximo|proximo)\s+)?\b(?P<dow>' + _DIAS + r')\b'
+    r'(?:\s+(?P<prox2>próximo|proximo|que\s+viene)\b)?'
+    r'|(?:\bel\s+)?(?:\bd[íi]a\s+)?\b(?P<d>\d{1,2})\s+de\s+(?P<mes>' + '|'.join(MESES) + r')\b'
+    r'(?:\s+(?:de|del)\s+(?P<y>\d{4})\b)?'
+    r'|\b(?P<nd>\d{1,2})/(?P<nm>\d{1,2})(?:/(?P<ny>\d{4}|\d{2}))?\b',
+    re.IGNORECASE
+)
+
+# Hora: "a las 3pm", "10:30", "a las 3 de la tarde", "4 p.m."
+_RE_HORA = re.compile(
+    r'(?P<prefijo>\ba\s+las?\s+)?\b(?P<h>\d{1,2})(?::(?P<min>\d{2}))?'
+    r'(?:\s*(?P<suf>[ap]\.?\s?m\.?(?!\w)|hrs?\b|h\b|de\s+la\s+(?:mañana|tarde|noche)\b))?',
+    re.IGNORECASE
+)
+
+# Una coincidencia de search_dates solo es una fecha si tiene un número, un mes, un día de la
+# semana o una palabra de tiempo ("a", "de", "el" sueltos no lo son)
+_RE_PALABRA_FECHA = re.compile(
+    r'\d|\b(?:' + '|'.join(MESES) + '|' + _DIAS +
+    r'|hoy|mañana|ayer|semanas?|mes(?:es)?|años?|horas?|minutos?|mediod[íi]a|medianoche|noche|tarde)\b',
+    re.IGNORECASE
+)
+# "pm"/"am" como sufijo de hora, no dentro de palabras ("llamar", "programa", "mamá")
+_RE_PM = re.compile(r'(?<![^\W\d_])p\.?m\.?(?!\w)', re.IGNORECASE)
+_RE_AM = re.compile(r'(?<![^\W\d_])a\.?m\.?(?!\w)', re.IGNORECASE)
+
+DIAS_SEMANA = {'lunes': 0, 'martes': 1, 'miercoles': 2, 'miércoles': 2, 'jueves': 3,
+               'viernes': 4, 'sabado': 5, 'sábado': 5, 'domingo': 6}
+
+
+class DateExtractor:
+    """
+    Extracción de fechas en español en dos etapas:
+    1. Gramática de expresiones regulares precompiladas para las formas habituales
+       ("mañana a las 3pm", "31 de mayo a las 10:30", "el viernes a las 4pm").
+    2. dateparser (con el parser construido una vez por fecha de referencia) para el resto.
+    Los resultados se memorizan en un LRU con clave (texto normalizado, referencia al minuto).
+    """
+
+    SETTINGS = {
+        'DATE_ORDER': 'DMY',
+        'PREFER_DAY_OF_MONTH': 'first',
+        'PREFER_DATES_FROM': 'future',
+    }
+
+    def __init__(self, cache_size=4096):
+        self.contadores = Counter()
+        self._extraer_cacheado = lru_cache(maxsize=cache_size)(self._extraer)
+        self._parser = lru_cache(maxsize=4)(self._crear_parser)
+
+    def extract(self, text, base=None):
+        """
+        Args:
+            text (str): Mensaje del usuario
+            base (datetime): Fecha de referencia para expresiones relativas (por defecto, ahora)
+        Returns:
+            FechaExtraida o None si el texto no contiene una fecha
+        """
+        base = (base or datetime.now()).replace(second=0, microsecond=0)
+        clave = text.lower()
+        if len(clave) != len(text):
+            clave = text  # los tramos deben seguir siendo válidos sobre el texto original
+        with metrics.medir('fecha'):
+            return self._extraer_cacheado(clave, base)
+
+    def stats(self):
+        """Aciertos de la caché y número de extracciones resueltas por cada etapa"""
+        info = self._extraer_cacheado.cache_info()
+        consultas = info.hits + info.misses
+        return {
+            'aciertos': info.hits,
+            'fallos': info.misses,
+            'tasa_aciertos': info.hits / consultas if consultas else 0.0,
+            'en_cache': info.currsize,
+            **{f'ruta_{ruta}': n for ruta, n in self.contadores.items()},
+        }
+
+    def clear_cache(self):
+        self._extraer_cacheado.cache_clear()
+        self.contadores.clear()
+
+    def _extraer(self, texto, base):
+        resultado = self._extraer_rapido(texto, base)
+        if resultado is not None:
+            self.contadores['rapida'] += 1
+            return resultado
+        with metrics.medir('fecha.dateparser'):
+            resultado = self._extraer_dateparser(texto, base)
+        self.contadores['dateparser' if resultado else 'sin_fecha'] += 1
+        return resultado
+
+    def _extraer_rapido(self, texto, base):
+        spans = []
+        fecha = None
+        dia = _RE_DIA.search(texto)
+        if dia:
+            fecha = self._resolver_dia(dia, base)
+            if fecha is not None:
+                spans.append(dia.span())
+
+        hora = None
+        for match in _RE_HORA.finditer(texto):
+            if fecha is not None and match.start() < dia.end() and match.end() > dia.start():
+                continue
+            # Un número suelto ("2 personas") no es una hora
+            if not (match.group('prefijo') or match.group('min') or match.group('suf')):
+                continue
+            hora = self._resolver_hora(match)
+            if hora is not None:
+                spans.append(match.span())
+                break
+
+        if fecha is None and hora is None:
+            return None
+        if fecha is None:
+            # Solo hora: hoy, o mañana si esa hora ya pasó
+            fecha = base.replace(hour=hora[0], minute=hora[1])
+            if fecha < base:
+                fecha += timedelta(days=1)
+        else:
+            fecha = fecha.replace(hour=hora[0], minute=hora[1]) if hora else fecha
+        return FechaExtraida(fecha, tuple(sorted(spans)))
+
+    @staticmethod
+    def _resolver_dia(match, base):
+        hoy = base.replace(hour=0, minute=0)
+        rel = match.group('rel')
+        if rel:
+            rel = rel.lower()
+            dias = 0 if rel == 'hoy' else 2 if rel.startswith('pasado') else 1
+            return hoy + timedelta(days=dias)
+
+        dow = match.group('dow')
+        if dow:
+            dias = (DIAS_SEMANA[dow.lower()] - hoy.weekday()) % 7
+            if dias == 0 and (match.group('prox') or match.group('prox2')):
+                dias = 7
+            return hoy + timedelta(days=dias)
+
+        if match.group('mes'):
+            dia, mes, anio = int(match.group('d')), MESES[match.group('mes').lower()], match.group('y')
+        else:
+            dia, mes, anio = int(match.group('nd')), int(match.group('nm')), match.group('ny')
+        if anio is not None:
+            anio = int(anio) + (2000 if len(anio) == 2 else 0)
+        try:
+            fecha = hoy.replace(year=anio or hoy.year, month=mes, day=dia)
+            # Sin año explícito se prefiere la próxima ocurrencia
+            if anio is None and fecha < hoy:
+                fecha = fecha.replace(year=hoy.year + 1)
+        except ValueError:
+            return None
+        return fecha
+
+    @staticmethod
+    def _resolver_hora(match):
+        hora, minuto = int(match.group('h')), int(match.group('min') or 0)
+        sufijo = (match.group('suf') or '').lower().replace('.', '').replace(' ', '')
+        if sufijo in ('pm', 'delatarde', 'delanoche') and hora < 12:
+            hora += 12
+        elif sufijo in ('am', 'delamañana') and hora == 12:
+            hora = 0
+        if hora > 23 or minuto > 59:
+            return None
+        return hora, minuto
+
+    def _crear_parser(self, base):
+        from dateparser.date import DateDataParser  # importación diferida: dateparser tarda en cargar
+        return DateDataParser(languages=['es'], settings={**self.SETTINGS, 'RELATIVE_BASE': base})
+
+    def _extraer_dateparser(self, texto, base):
+        try:
+            fecha = self._parser(base).get_date_data(texto).date_obj
+            if fecha is not None:
+                span = (len(texto) - len(texto.lstrip()), len(texto.rstrip()))
+            else:
+                from dateparser.search import search_dates
+                encontrados = search_dates(texto, languages=['es'],
+                                           settings={**self.SETTINGS, 'RELATIVE_BASE': base})
+                # Se descartan las coincidencias sin contenido de fecha ("a", "de"...)
+                encontrados = [r for r in encontrados or () if _RE_PALABRA_FECHA.search(r[0])]
+                if not encontrados:
+                    return None
+                subtexto, fecha = max(encontrados, key=lambda r: len(r[0]))
+                # Palabra completa: "a" no debe coincidir dentro de "Agenda"
+                match = re.search(r'(?<!\w)' + re.escape(subtexto) + r'(?!\w)', texto, re.IGNORECASE)
+                if match is None:
+                    return None
+                span = match.span()
+        except Exception as e:
+            print(f"Error parseando fecha: {str(e)}")
+            return None
+
+        # Ajustar formato de 12h a 24h si es necesario
+        if _RE_PM.search(texto) and fecha.hour < 12:
+            fecha = fecha.replace(hour=fecha.hour + 12)
+        elif _RE_AM.search(texto) and fecha.hour == 12:
+            fecha = fecha.replace(hour=0)
+        return FechaExtraida(fecha.replace(second=0, microsecond=0, tzinfo=None), (span,))
+
+
+_extractor = None
+
+def get_date_extractor():
+    """Extractor compartido por todo el proceso (y su caché)"""
+    global _extractor
+    if _extractor is None:
+        _extractor = DateExtractor()
+    return _extractor
+
+def extract_datetime(text, base=None):
+    """Extrae la fecha de un texto en español con formato 'dd/mm/aaaa HH:MM'"""
+    resultado = get_date_extractor().extract(text, base)
+    return resultado.fecha.strftime(FORMATO_FECHA) if resultado else None
+
+def extract_event_description(text, *, base=None):
+    """
+    Extrae descripción eliminando componentes de fecha
+    Con la misma `base` que una llamada previa a extract_datetime(text, base), la
+    fecha (y sus tramos) sale de la caché del extractor sin volver a analizarse.
+    """
+    from utils.event_extraction import extract_description
+    resultado = get_date_extractor().extract(text, base)
+    if resultado is None:
+        return text.capitalize()
+    return extract_description(text, resultado.spans).descripcion
+
+_PATRON_DIA = re.compile(r'\b(' + '|'.join(DIAS_SEMANA) + r')\b', re.IGNORECASE)
+_PATRON_SEMANA = re.compile(r'\b(?:(próxima|proxima|siguiente)\s+semana|semana\s+(que\s+viene)|semana)\b',
+                            re.IGNORECASE)
+_PATRON_PASADO_MANANA = re.compile(r'\bpasado\s+mañana\b', re.IGNORECASE)
+_PATRON_MANANA = re.compile(r'(?<!la )\bmañana\b', re.IGNORECASE)
+_PATRON_HOY = re.compile(r'\bhoy\b', re.IGNORECASE)
+
+def extract_query_range(text, base=None):
+    """
+    Interpreta el periodo de una consulta ("el viernes", "mañana", "esta semana"...)
+    Returns:
+        tuple: (inicio, fin) como datetimes con fin exclusivo, o None si no hay periodo
+    """
+    base = base or datetime.now()
+    hoy = datetime(base.year, base.month, base.day)
+    dia = timedelta(days=1)
+
+    if _PATRON_PASADO_MANANA.search(text):
+        return hoy + 2 * dia, hoy + 3 * dia
+    if _PATRON_MANANA.search(text):
+        return hoy + dia, hoy + 2 * dia
+    if _PATRON_HOY.search(text):
+        return hoy, hoy + dia
+
+    match = _PATRON_DIA.search(text)
+    if match:
+        # Próxima ocurrencia del día (hoy incluido)
+        inicio = hoy + ((DIAS_SEMANA[match.group(1).lower()] - hoy.weekday()) % 7) * dia
+        return inicio, inicio + dia
+
+    match = _PATRON_SEMANA.search(text)
+    if match:
+        lunes = hoy - hoy.weekday() * dia
+        if match.group(1) or match.group(2):
+            lunes += 7 * dia
+        return lunes, lunes + 7 * dia
+
+    resultado = get_date_extractor().extract(text, base)
+    if resultado:
+        inicio = datetime(resultado.fecha.year, resultado.fecha.month, resultado.fecha.day)
+        return inicio, inicio + dia
+    return None
@@ -0,0 +1,185 @@
+import re
+import unicodedata
+from collections import namedtuple
+from evento import primera_ocurrencia
+from utils import metrics
+from utils.date_utils import get_date_extractor
+
+# descripcion: texto limpio del evento; spans: tramos (inicio, fin) eliminados del mensaje
+DescripcionExtraida = namedtuple('DescripcionExtraida', ['descripcion', 'spans'])
+# fecha: datetime o None; spans: tramos del mensaje que expresan la fecha; duracion: minutos o None;
+# regla: RRULE si el evento se repite (fecha es entonces la primera ocurrencia)
+DetallesEvento = namedtuple('DetallesEvento', ['descripcion', 'fecha', 'spans', 'duracion', 'regla'],
+                            defaults=(None, None))
+# regla: RRULE sin DTSTART; spans: tramos de la repetición y de su final
+Recurrencia = namedtuple('Recurrencia', ['regla', 'spans'])
+
+DESCRIPCION_VACIA = "Evento sin descripción"
+
+# Una sola alternancia con los verbos de comando, artículos/preposiciones de relleno
+# y la puntuación; las alternativas largas van primero
+_RE_RELLENO = re.compile(
+    r'\b(?:el\s+día|a\s+las?|agendar|agenda|programa|crea|reserva|para|el|la|los|mi|una'
+    r'|próxim[oa]|siguiente)\b|[^\w\s]',
+    re.IGNORECASE
+)
+
+# "de 2 horas", "durante 45 minutos", "por una hora y media", "de media hora", "de 1h"
+_RE_DURACION = re.compile(
+    r'\b(?:de|durante|por)\s+(\d+(?:[.,]\d+)?|una?|media)\s*(horas?|h|minutos?|min)\b(\s+y\s+media)?',
+    re.IGNORECASE
+)
+_CANTIDADES = {'un': 1, 'una': 1, 'media': 0.5}
+
+
+def extract_duration(text):
+    """
+    Duración explícita de un evento
+    Returns:
+        tuple: (minutos, (inicio, fin)) o None si el mensaje no la indica
+    """
+    match = _RE_DURACION.search(text)
+    if match is None:
+        return None
+    cantidad, unidad, y_media = match.groups()
+    cantidad = _CANTIDADES.get(cantidad.lower()) or float(cantidad.replace(',', '.'))
+    minutos = cantidad * (60 if unidad.lower().startswith('h') else 1) + (30 if y_media else 0)
+    if minutos <= 0:
+        return None
+    return round(minutos), match.span()
+
+
+_DIA = r'(?:lunes|martes|mi[ée]rcoles|jueves|viernes|s[áa]bados?|domingos?)'
+# "todos los lunes y jueves", "cada 2 semanas", "diariamente", "de lunes a viernes"
+_RE_REPETICION = re.compile(
+    rf'\b(?:todos\s+los|todas\s+las|cada)\s+(?:(?P<intervalo>\d+)\s+)?'
+    rf'(?P<unidad>d[íi]as?|semanas?|mes(?:es)?|años?|{_DIA}(?:\s*(?:,|y)\s*{_DIA})*)\b'
+    r'|\b(?P<adverbio>diariamente|a\s+diario|semanalmente|mensualmente|anualmente)\b'
+    r'|\b(?P<laborables>de\s+lunes\s+a\s+viernes|(?:los\s+)?d[íi]as\s+laborables|entre\s+semana)\b',
+    re.IGNORECASE
+)
+# "10 veces", "hasta el 30 de junio"
+_RE_FIN_SERIE = re.compile(
+    r'\b(?:durante\s+)?(?P<veces>\d+)\s+veces\b'
+    r'|\bhasta\s+(?P<hasta>.+?)(?=\s+(?:a\s+las?|durante|cada|todos|todas)\b|[,.;]|$)',
+    re.IGNORECASE
+)
+_RE_NOMBRE_DIA = re.compile(_DIA, re.IGNORECASE)
+# "cada mes el día 5"
+_RE_DIA_DEL_MES = re.compile(r'\bel\s+d[íi]a\s+(\d{1,2})\b(?!\s+de\s)', re.IGNORECASE)
+_FRECUENCIAS = {'dia': 'DAILY', 'dias': 'DAILY', 'diariamente': 'DAILY', 'a diario': 'DAILY',
+                'semana': 'WEEKLY', 'semanas': 'WEEKLY', 'semanalmente': 'WEEKLY',
+                'mes': 'MONTHLY', 'meses': 'MONTHLY', 'mensualmente': 'MONTHLY',
+                'ano': 'YEARLY', 'anos': 'YEARLY', 'anualmente': 'YEARLY'}
+_CODIGOS_DIA = {'lunes': 'MO', 'martes': 'TU', 'miercoles': 'WE', 'jueves': 'TH',
+                'viernes': 'FR', 'sabado': 'SA', 'domingo': 'SU'}
+
+
+def _sin_tildes(texto):
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ' '.join(''.join(c for c in texto if not unicodedata.combining(c)).split())
+
+
+def extract_recurrence(text, base=None):
+    """
+    Repetición de un evento ("todos los lunes", "cada 2 semanas hasta el 30 de junio")
+    Returns:
+        Recurrencia o None si el mensaje describe un evento único
+    """
+    match = _RE_REPETICION.search(text)
+    if match is None:
+        return None
+    partes = []
+    if match['laborables']:
+        partes = ['FREQ=WEEKLY', 'BYDAY=MO,TU,WE,TH,FR']
+    elif match['adverbio']:
+        partes = [f"FREQ={_FRECUENCIAS[_sin_tildes(match['adverbio'])]}"]
+    else:
+        unidad = _sin_tildes(match['unidad'])
+        # "sábados" -> "sabado"; "lunes" ya termina en s
+        nombres = [_sin_tildes(d) for d in _RE_NOMBRE_DIA.findall(match['unidad'])]
+        dias = [_CODIGOS_DIA.get(n) or _CODIGOS_DIA[n[:-1]] for n in nombres]
+        if dias:
+            partes = ['FREQ=WEEKLY', f"BYDAY={','.join(dict.fromkeys(dias))}"]
+        else:
+            partes = [f'FREQ={_FRECUENCIAS[unidad]}']
+        if match['intervalo'] and int(match['intervalo']) > 1:
+            partes.insert(1, f"INTERVAL={int(match['intervalo'])}")
+
+    spans = [match.span()]
+    dia_del_mes = _RE_DIA_DEL_MES.search(text) if partes[0] == 'FREQ=MONTHLY' else None
+    if dia_del_mes and 1 <= int(dia_del_mes[1]) <= 31:
+        partes.append(f"BYMONTHDAY={int(dia_del_mes[1])}")
+        spans.append(dia_del_mes.span())
+    fin = _RE_FIN_SERIE.search(text)
+    if fin and fin['veces']:
+        partes.append(f"COUNT={int(fin['veces'])}")
+        spans.append(fin.span())
+    elif fin:
+        hasta = get_date_extractor().extract(fin['hasta'], base)
+        if hasta is not None:
+            partes.append(f"UNTIL={hasta.fecha:%Y%m%d}T235959")
+            spans.append(fin.span())
+    return Recurrencia(';'.join(partes), tuple(spans))
+
+
+def extract_description(text, date_spans=()):
+    """
+    Extrae la descripción de un evento en una única pasada
+    Args:
+        text (str): Mensaje del usuario
+        date_spans (iterable): Tramos (inicio, fin) de la fecha, según el extractor de fechas
+    Returns:
+        DescripcionExtraida: descripción capitalizada y tramos eliminados (fecha y relleno)
+    """
+    eliminados = []
+    partes = []
+    pos = 0
+    for inicio, fin in sorted(date_spans) + [(len(text), len(text))]:
+        # Segmento fuera de la fecha: se quita el relleno sin copiar el texto
+        for match in _RE_RELLENO.finditer(text, pos, max(inicio, pos)):
+            partes.append(text[pos:match.start()])
+            eliminados.append(match.span())
+            pos = match.end()
+        partes.append(text[pos:max(inicio, pos)])
+        if fin > inicio:
+            eliminados.append((inicio, fin))
+        pos = max(pos, fin)
+
+    descripcion = ' '.join(''.join(partes).lower().split())
+    return DescripcionExtraida(
+        descripcion.capitalize() if descripcion else DESCRIPCION_VACIA,
+        tuple(sorted(eliminados)),
+    )
+
+
+def extract_event_details(text, base=None):
+    """
+    Fecha, descripción, duración y repetición de un mensaje para agregar un evento
+    Returns:
+        DetallesEvento: con fecha None (y la descripción del texto completo) si no hay fecha
+    """
+    duracion = extract_duration(text)
+    recurrencia = extract_recurrence(text, base)
+    # Duración y repetición no son la fecha del evento ("de 1h" no es la 1:00, "hasta el 30"
+    # no es el día 30): se tapan con espacios sin mover los tramos
+    extra = ((duracion[1],) if duracion else ()) + (recurrencia.spans if recurrencia else ())
+    texto_fecha = text
+    for inicio, fin in extra:
+        texto_fecha = texto_fecha[:inicio] + ' ' * (fin - inicio) + texto_fecha[fin:]
+    resultado = get_date_extractor().extract(texto_fecha, base)
+    with metrics.medir('descripcion'):
+        minutos = duracion[0] if duracion else None
+        regla = recurrencia.regla if recurrencia else None
+        if resultado is None:
+            return DetallesEvento(extract_description(text, extra).descripcion, None, (), minutos, regla)
+        fecha = resultado.fecha
+        if regla is not None:
+            fecha = primera_ocurrencia(regla, fecha) or fecha
+        return DetallesEvento(
+            extract_description(text, tuple(resultado.spans) + extra).descripcion,
+            fecha,
+            resultado.spans,
+            minutos,
+            regla,
+        )
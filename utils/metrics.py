@@ -0,0 +1,242 @@
+"""
+Instrumentación por etapas del chatbot.
+
+Variables de entorno:
+    CHATBOT_METRICS=1              activa los cronómetros por etapa
+    CHATBOT_METRICS_FILE=ruta      añade un resumen JSON por línea cada CHATBOT_METRICS_INTERVALO s (60)
+    CHATBOT_METRICS_PORT=9100      sirve /metrics en formato de texto de Prometheus (127.0.0.1)
+    CHATBOT_PROFILE=cprofile       perfila con cProfile una fracción de los mensajes
+    CHATBOT_PROFILE=tracemalloc    registra el pico de memoria de una fracción de los mensajes
+    CHATBOT_PROFILE_SAMPLE=0.01    fracción de mensajes muestreados
+    CHATBOT_PROFILE_FILE=ruta      destino de las estadísticas de cProfile (chatbot.prof)
+
+Desactivado, medir() devuelve un nullcontext compartido: el coste es una llamada y un `with`.
+"""
+import atexit
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CUANTILES = (0.5, 0.95, 0.99)
+
+ACTIVADO = os.environ.get('CHATBOT_METRICS', '') not in ('', '0')
+PERFIL = os.environ.get('CHATBOT_PROFILE', '').lower()
+MUESTREO_PERFIL = float(os.environ.get('CHATBOT_PROFILE_SAMPLE', '0.01'))
+
+_NULO = contextlib.nullcontext()
+
+
+class Registro:
+    """Muestras recientes por etapa (ventana deslizante) más contador y suma acumulados"""
+
+    def __init__(self, ventana=4096, unidad='ms', escala=1000):
+        self.ventana = ventana
+        # Unidad del resumen legible (las muestras se guardan en unidades base: s o bytes)
+        self.unidad = unidad
+        self.escala = escala
+        self._muestras = {}
+        self._totales = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, etapa, valor):
+        with self._lock:
+            muestras = self._muestras.get(etapa)
+            if muestras is None:
+                muestras = self._muestras[etapa] = deque(maxlen=self.ventana)
+                self._totales[etapa] = [0, 0.0]
+            muestras.append(valor)
+            totales = self._totales[etapa]
+            totales[0] += 1
+            totales[1] += valor
+
+    def reiniciar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._totales.clear()
+
+    def _instantanea(self):
+        with self._lock:
+            return {etapa: (sorted(m), *self._totales[etapa]) for etapa, m in self._muestras.items()}
+
+    @staticmethod
+    def _cuantil(ordenadas, q):
+        return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))]
+
+    def resumen(self):
+        """
+        Returns:
+            dict: {etapa: {n, media_ms, p50_ms, p95_ms, p99_ms}} (percentiles sobre la ventana)
+        """
+        u, escala = self.unidad, self.escala
+        resumen = {}
+        for etapa, (ordenadas, n, suma) in self._instantanea().items():
+            datos = {'n': n, f'media_{u}': suma / n * escala}
+            for q in CUANTILES:
+                datos[f'p{int(q * 100)}_{u}'] = self._cuantil(ordenadas, q) * escala
+            resumen[etapa] = datos
+        return resumen
+
+    def texto_prometheus(self, prefijo, ayuda):
+        """Exposición en formato de texto de Prometheus (tipo summary)"""
+        lineas = [f'# HELP {prefijo} {ayuda}', f'# TYPE {prefijo} summary']
+        for etapa, (ordenadas, n, suma) in sorted(self._instantanea().items()):
+            for q in CUANTILES:
+                lineas.append(f'{prefijo}{{etapa="{etapa}",quantile="{q}"}} {self._cuantil(ordenadas, q):.9f}')
+            lineas.append(f'{prefijo}_sum{{etapa="{etapa}"}} {suma:.9f}')
+            lineas.append(f'{prefijo}_count{{etapa="{etapa}"}} {n}')
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = Registro()
+# Pico de memoria por llamada muestreada con tracemalloc (bytes, resumen en KB)
+MEMORIA = Registro(unidad='kb', escala=1 / 1024)
+
+
+def texto_prometheus():
+    return (REGISTRO.texto_prometheus('chatbot_etapa_segundos', 'Duración de cada etapa del pipeline')
+            + MEMORIA.texto_prometheus('chatbot_memoria_pico_bytes',
+                                       'Pico de memoria asignada por llamada muestreada'))
+
+
+def exportar_jsonl(ruta):
+    """Añade una línea JSON con la marca de tiempo y el resumen actual"""
+    linea = {'ts': time.time(), 'etapas': REGISTRO.resumen(), 'memoria': MEMORIA.resumen()}
+    with open(ruta, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(linea, ensure_ascii=False) + '\n')
+
+
+class _Cronometro:
+    __slots__ = ('etapa', 'inicio')
+
+    def __init__(self, etapa):
+        self.etapa = etapa
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRO.registrar(self.etapa, time.perf_counter() - self.inicio)
+        return False
+
+
+def medir(etapa):
+    """Context manager que cronometra una etapa (no hace nada si las métricas están desactivadas)"""
+    if not ACTIVADO:
+        return _NULO
+    return _Cronometro(etapa)
+
+
+def activar(valor=True):
+    """Activa o desactiva los cronómetros en caliente (benchmarks, depuración)"""
+    global ACTIVADO
+    ACTIVADO = valor
+
+
+# --- Perfilado muestreado ---------------------------------------------------
+
+_perfil_lock = threading.Lock()
+_perfilador = None
+
+
+def _volcar_perfil():
+    if _perfilador is not None:
+        _perfilador.dump_stats(os.environ.get('CHATBOT_PROFILE_FILE', 'chatbot.prof'))
+
+
+@contextlib.contextmanager
+def _perfilar_muestra(etapa):
+    global _perfilador
+    # cProfile y los picos de tracemalloc no se pueden solapar entre hilos: si otro
+    # hilo ya está perfilando, esta muestra se descarta
+    if not _perfil_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        if PERFIL == 'cprofile':
+            if _perfilador is None:
+                import cProfile
+                _perfilador = cProfile.Profile()
+                atexit.register(_volcar_perfil)
+            _perfilador.enable()
+            try:
+                yield
+            finally:
+                _perfilador.disable()
+        else:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            try:
+                yield
+            finally:
+                MEMORIA.registrar(etapa, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        _perfil_lock.release()
+
+
+def perfilar(etapa='mensaje'):
+    """Perfila una fracción CHATBOT_PROFILE_SAMPLE de las llamadas si CHATBOT_PROFILE está definido"""
+    if PERFIL not in ('cprofile', 'tracemalloc') or random.random() >= MUESTREO_PERFIL:
+        return _NULO
+    return _perfilar_muestra(etapa)
+
+
+# --- Exportadores -------------------------------------------------------------
+
+_exportadores_iniciados = False
+
+
+class _ManejadorPrometheus(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        cuerpo = texto_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def servir_prometheus(puerto, host='127.0.0.1'):
+    """Sirve /metrics en un hilo daemon"""
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorPrometheus)
+    threading.Thread(target=servidor.serve_forever, name='metrics-http', daemon=True).start()
+    return servidor
+
+
+def _exportar_periodicamente(ruta, intervalo):
+    while True:
+        time.sleep(intervalo)
+        exportar_jsonl(ruta)
+
+
+def iniciar_exportadores():
+    """Arranca los exportadores configurados por entorno (idempotente)"""
+    global _exportadores_iniciados
+    if _exportadores_iniciados or not (ACTIVADO or PERFIL):
+        return
+    _exportadores_iniciados = True
+
+    ruta = os.environ.get('CHATBOT_METRICS_FILE')
+    if ruta:
+        intervalo = float(os.environ.get('CHATBOT_METRICS_INTERVALO', '60'))
+        threading.Thread(target=_exportar_periodicamente, args=(ruta, intervalo),
+                         name='metrics-jsonl', daemon=True).start()
+        atexit.register(exportar_jsonl, ruta)
+
+    puerto = os.environ.get('CHATBOT_METRICS_PORT')
+    if puerto:
+        servir_prometheus(int(puerto))
@@ -1,29 +1,63 @@
 import re
-import nltk
+from functools import lru_cache
 import numpy as np  # <-- Esta importación faltaba
-from nltk.stem import PorterStemmer
 
-nltk.download('punkt')
-stemmer = PorterStemmer()
+# NLTK se importa bajo demanda: importarlo (y buscar 'punkt') retrasa el arranque
+_stemmer = None
+_word_tokenize = None
+_REGEX_TOKEN = re.compile(r"\w+(?:['-]\w+)*|[^\w\s]")
+
+TIME_WORDS = frozenset(['enero','febrero','marzo','abril','mayo','junio',
+                        'julio','agosto','septiembre','octubre','noviembre','diciembre',
+                        'lunes','martes','miércoles','jueves','viernes','sábado','domingo',
+                        'am','pm','próximo','próxima','mañana','tarde'])
+
+def clean_tokens(tokens):
+    """Filtra tokens ya tokenizados conservando palabras y palabras clave de tiempo"""
+    return [w for w in tokens if w.lower() in TIME_WORDS or w.isalpha()]
 
 def clean_text(text):
     """Limpia el texto conservando información importante para fechas"""
-    # Conserva palabras clave de tiempo
-    time_words = ['enero','febrero','marzo','abril','mayo','junio',
-                'julio','agosto','septiembre','octubre','noviembre','diciembre',
-                'lunes','martes','miércoles','jueves','viernes','sábado','domingo',
-                'am','pm','próximo','próxima','mañana','tarde']
-    
-    words = tokenize(text)
-    words = [w for w in words if w.lower() in time_words or w.isalpha()]
-    return ' '.join(words)
+    return ' '.join(clean_tokens(tokenize(text)))
+
+def _regex_tokenize(sentence):
+    """Tokenizador de respaldo cuando 'punkt' no está instalado localmente"""
+    return _REGEX_TOKEN.findall(sentence)
+
+def _load_tokenizer():
+    """Usa nltk.word_tokenize si 'punkt' está disponible en disco (sin descargas)"""
+    global _word_tokenize
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt')
+        _word_tokenize = nltk.word_tokenize
+    except LookupError:
+        print("Aviso: recurso 'punkt' de NLTK no encontrado; se usa el tokenizador básico. "
+              "Instálalo con: python -m nltk.downloader punkt")
+        _word_tokenize = _regex_tokenize
+    return _word_tokenize
 
 def tokenize(sentence):
-    return nltk.word_tokenize(sentence.lower())
+    global _word_tokenize
+    word_tokenize = _word_tokenize or _load_tokenizer()
+    try:
+        return word_tokenize(sentence.lower())
+    except LookupError:
+        # Versiones recientes de NLTK necesitan además 'punkt_tab'
+        _word_tokenize = _regex_tokenize
+        return _regex_tokenize(sentence.lower())
 
+@lru_cache(maxsize=65536)
 def stem(word):
-    return stemmer.stem(word.lower())
+    global _stemmer
+    if _stemmer is None:
+        from nltk.stem import PorterStemmer
+        _stemmer = PorterStemmer()
+    return _stemmer.stem(word.lower())
 
 def bag_of_words(tokenized_sentence, all_words):
-    tokenized_sentence = [stem(w) for w in tokenized_sentence]
-    return np.array([1 if w in tokenized_sentence else 0 for w in all_words])  # <-- Aquí se usa np.array
\ No newline at end of file
+    """Vector bag-of-words; acepta una lista de palabras o un Vocabulary compilado"""
+    if hasattr(all_words, 'encode'):
+        return all_words.encode(tokenized_sentence)
+    tokenized_sentence = {stem(w) for w in tokenized_sentence}
+    return np.array([1 if w in tokenized_sentence else 0 for w in all_words])
\ No newline at end of file
@@ -0,0 +1,81 @@
+import pickle
+import numpy as np
+from utils.preprocessing import stem
+
+
+class Vocabulary:
+    """
+    Vocabulario compilado: índice palabra→columna y codificadores bag-of-words.
+    Codificar un mensaje cuesta O(T) (tokens) en lugar de O(V·T).
+    """
+
+    def __init__(self, words):
+        self.words = list(words)
+        self.index = {w: i for i, w in enumerate(self.words)}
+
+    @classmethod
+    def from_pickle(cls, path):
+        """Construye el vocabulario desde palabras.pkl"""
+        with open(path, 'rb') as f:
+            return cls(pickle.load(f))
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def indices(self, tokenized_sentence):
+        """
+        Índices (ordenados y sin repetir) de las palabras presentes en el mensaje
+        Returns:
+            np.ndarray: array int32 de columnas activas
+        """
+        index = self.index
+        found = {index[s] for s in map(stem, tokenized_sentence) if s in index}
+        return np.fromiter(sorted(found), dtype=np.int32, count=len(found))
+
+    def encode(self, tokenized_sentence, out=None):
+        """
+        Vector bag-of-words denso de un mensaje
+        Args:
+            tokenized_sentence (list[str]): Tokens del mensaje
+            out (np.ndarray): Buffer opcional de tamaño len(vocabulario) a reutilizar
+        """
+        if out is None:
+            out = np.zeros(len(self.words), dtype=np.float32)
+        else:
+            out.fill(0)
+        out[self.indices(tokenized_sentence)] = 1
+        return out
+
+    def encode_batch(self, tokenized_sentences, out=None):
+        """
+        Matriz bag-of-words densa (n_mensajes, len(vocabulario))
+        Args:
+            tokenized_sentences (list[list[str]]): Tokens de cada mensaje
+            out (np.ndarray): Buffer opcional de al menos n_mensajes filas a reutilizar
+        """
+        indptr, indices = self.encode_sparse(tokenized_sentences)
+        n = len(indptr) - 1
+        if out is None:
+            out = np.zeros((n, len(self.words)), dtype=np.float32)
+        else:
+            out = out[:n]
+            out.fill(0)
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        out[rows, indices] = 1
+        return out
+
+    def encode_sparse(self, tokenized_sentences):
+        """
+        Codificación dispersa en formato CSR
+        Returns:
+            tuple: (indptr, indices) donde las columnas de la fila i son
+                   indices[indptr[i]:indptr[i + 1]]
+        """
+        rows = [self.indices(tokens) for tokens in tokenized_sentences]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in rows], out=indptr[1:])
+        indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+        return indptr, indices